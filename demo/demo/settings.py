@@ -137,3 +137,75 @@ CACHES = {
         "KEY_PREFIX": f"baserow-{GENERATED_MODEL_CACHE_NAME}-cache",
     },
 }
+
+# Optional read-through cache for `RowHandler.get_row`, `has_row` and
+# `get_row_names`. Entries are stored in the default cache and in an in-process LRU.
+BASEROW_ROW_CACHE_ENABLED = False
+BASEROW_ROW_CACHE_TIMEOUT = 60 * 60
+BASEROW_ROW_CACHE_LOCAL_MAX_SIZE = 1024
+
+# Tables which are expected to contain more rows than this threshold are not counted
+# with a `SELECT COUNT(*)`, the Postgres row estimate is used instead. Set to 0 to
+# always count exactly.
+BASEROW_COUNT_ESTIMATE_THRESHOLD = 1_000_000
+
+# The row count deltas recorded when rows are created, trashed or restored are
+# periodically flushed into `Table.row_count`.
+BASEROW_ROW_COUNT_FLUSH_INTERVAL_SECONDS = 60
+BASEROW_ROW_COUNT_FLUSH_BATCH_SIZE = 10_000
+
+# The periodic row count job splits the tables into shards of this many tables that
+# are counted by separate celery tasks. Set to 0 to count all tables in one task.
+BASEROW_ROW_COUNT_JOB_SHARD_SIZE = 5_000
+
+# Full re-indexes of the tsvector columns are split into row id ranges which are
+# updated by this many workers at the same time. 1 disables the parallel mode.
+TSV_UPDATE_CONCURRENCY = 1
+
+# The ranked full-text search mode only ranks this many of the matching rows found by
+# the search index, so broad queries don't have to read the tsvectors of every match.
+# Set to 0 to rank all matching rows.
+BASEROW_RANKED_SEARCH_MAX_CANDIDATES = 10_000
+
+# When higher than 0, the tsvector updates requested by writes are merged per table
+# and only run once no update has been requested for this many seconds, but never
+# later than the max delay after the first request. 0 runs every update right away.
+TSV_UPDATE_DEBOUNCE_SECONDS = 0
+TSV_UPDATE_MAX_DELAY_SECONDS = 30
+
+# Row writes of at most this many rows update the tsvectors of the rows in the same
+# transaction, so they are searchable right away. Larger writes are updated in the
+# background. 0 always updates them in the background.
+TSV_INLINE_UPDATE_MAX_ROWS = 0
+
+# Updating the tsvectors of all rows of a table requests a vacuum of the table. The
+# pending vacuums are run every interval, at most this many tables per run with the
+# most dead tuples first. Tables with fewer dead tuples or which have been vacuumed
+# by autovacuum in the meantime are skipped.
+AUTO_VACUUM_AFTER_SEARCH_UPDATE = True
+TABLE_VACUUM_INTERVAL_SECONDS = 5 * 60
+TABLE_VACUUM_MAX_TABLES_PER_RUN = 5
+TABLE_VACUUM_MIN_DEAD_TUPLES = 1_000
+
+# Optional cache of the ids of the rows matching a search, invalidated by any write to
+# the rows or the search index of the table. Searches matching more rows than the
+# max are not cached.
+BASEROW_SEARCH_CACHE_ENABLED = False
+BASEROW_SEARCH_CACHE_TIMEOUT = 5 * 60
+BASEROW_SEARCH_CACHE_MAX_IDS = 10_000
+
+# The dependants of the fields are looked up in an in-memory graph of all the field
+# dependencies, which is only rebuilt when the dependencies change, instead of being
+# queried for every row write.
+BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED = True
+
+# When a row change would update more than this many rows of other tables via its
+# dependants, those updates are applied by a background task in chunks of row ids
+# and the rows are marked as needing a background update meanwhile. 0 always applies
+# them right away.
+BASEROW_DEFERRED_CASCADE_MIN_ROWS = 0
+BASEROW_DEFERRED_CASCADE_CHUNK_SIZE = 10_000
+
+# The periodic field updates are dispatched as a separate task per field type and
+# workspace, each with its own time limit, instead of being run in one task.
+PERIODIC_FIELD_UPDATE_FAN_OUT = False
@@ -1,4 +1,5 @@
 import contextlib
+import json
 from collections import defaultdict
 from decimal import Decimal
 from functools import cache
@@ -14,10 +15,12 @@ from typing import (
     Set,
     Tuple,
     TypeVar,
+    Union,
 )
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import EmptyResultSet
 from django.db import DEFAULT_DB_ALIAS, connection, transaction
 from django.db.models import ForeignKey, ManyToManyField, Max, Model, QuerySet
 from django.db.models.functions import Collate
@@ -336,6 +339,79 @@ def recalculate_full_orders(
         cursor.execute(sql_query)
 
 
+def get_estimated_row_count_of_table(
+    table_name: str, using: str = DEFAULT_DB_ALIAS
+) -> Optional[int]:
+    """
+    Returns the number of rows Postgres estimates the table has based on the
+    `pg_class.reltuples` statistic which is maintained by VACUUM and ANALYZE. This is
+    a cheap catalog lookup, but it includes trashed rows and can be outdated.
+
+    :param table_name: The name of the database table.
+    :param using: The database alias to use.
+    :return: The estimated number of rows or None if the table doesn't exist or has
+        never been analyzed.
+    """
+
+    with transaction.get_connection(using).cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [table_name],
+        )
+        result = cursor.fetchone()
+
+    if result is None or result[0] < 0:
+        return None
+    return result[0]
+
+
+def get_estimated_row_count_of_query(
+    query: Union[str, sql.Composable],
+    params: Optional[Iterable[Any]] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Returns the number of rows the Postgres planner expects the provided query to
+    return by running an `EXPLAIN` on it. The query itself is not executed.
+
+    :param query: The SQL query to estimate the count of.
+    :param params: The parameters of the query.
+    :param using: The database alias to use.
+    :return: The estimated number of rows.
+    """
+
+    if isinstance(query, str):
+        explain_query = f"EXPLAIN (FORMAT JSON) {query}"
+    else:
+        explain_query = sql.SQL("EXPLAIN (FORMAT JSON) ") + query
+
+    with transaction.get_connection(using).cursor() as cursor:
+        cursor.execute(explain_query, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_estimated_row_count_of_queryset(queryset: QuerySet) -> int:
+    """
+    Returns the number of rows the Postgres planner expects the provided queryset
+    to return. The query itself is not executed.
+
+    :param queryset: The queryset to estimate the count of.
+    :return: The estimated number of rows, 0 if the queryset can't match any row,
+        like when filtering on an empty list of ids.
+    """
+
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    try:
+        query, params = compiler.as_sql()
+    except EmptyResultSet:
+        return 0
+    return get_estimated_row_count_of_query(query, params, using=queryset.db)
+
+
 @cache
 def get_collation_name() -> Optional[str]:
     """
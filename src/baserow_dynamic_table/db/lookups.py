@@ -0,0 +1,17 @@
+from django.db.models import Lookup
+
+
+class IsDistinctFrom(Lookup):
+    """
+    A null safe inequality. Unlike `<>` it's true if only one of the sides is null
+    and false if both are, so it can be used to check if setting a column to a value
+    changes it.
+    """
+
+    lookup_name = "isdistinctfrom"
+    can_use_none_as_rhs = True
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} IS DISTINCT FROM {rhs}", [*lhs_params, *rhs_params]
@@ -1,6 +1,6 @@
-sql_drop_try_cast = "DROP FUNCTION IF EXISTS pg_temp.try_cast(text, int)"
-sql_create_try_cast = """
-    create or replace function pg_temp.try_cast(
+sql_drop_named_try_cast = "DROP FUNCTION IF EXISTS pg_temp.%(name)s(text, int)"
+sql_create_named_try_cast = """
+    create or replace function pg_temp.%(name)s(
         p_in text,
         p_default int default null
     )
@@ -19,3 +19,6 @@ sql_create_try_cast = """
     $FUNCTION$
     language plpgsql;
 """
+
+sql_drop_try_cast = sql_drop_named_try_cast % {"name": "try_cast"}
+sql_create_try_cast = sql_create_named_try_cast.replace("%(name)s", "try_cast")
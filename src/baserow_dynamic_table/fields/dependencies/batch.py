@@ -0,0 +1,129 @@
+"""
+This file contains `cascade_batch`, which merges the cascades of the row handler
+calls made within it. Actions doing several handler calls in one transaction, like
+imports or duplications, would otherwise look up the same fields and apply the
+updates of the same dependants once per call.
+
+Within a batch the handlers share one `FieldCache`, and one `FieldUpdateCollector`
+per starting table whose starting rows are merged. The updates are only applied when
+the batch exits, once per starting table in the order in which the tables were first
+changed. Until then the cell values of the dependants are not up to date, so the
+batch is meant for writing rows, not for reading the values they affect.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+
+from django.db import transaction
+
+from baserow_dynamic_table.fields.dependencies.update_collector import (
+    FieldUpdateCollector,
+    StartingRowIdsType,
+)
+from baserow_dynamic_table.fields.field_cache import FieldCache
+from baserow_dynamic_table.table.models import Table
+
+_local = threading.local()
+
+
+class CascadeBatch:
+    def __init__(self):
+        self.field_cache = FieldCache()
+        # Dicts keep their insertion order, so the collectors are applied in the order
+        # in which their tables were first changed.
+        self.collectors: Dict[int, FieldUpdateCollector] = {}
+
+    def get_collector(
+        self,
+        table: Table,
+        starting_row_ids: StartingRowIdsType = None,
+        deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+    ) -> FieldUpdateCollector:
+        collector = self.collectors.get(table.id)
+        if collector is None:
+            collector = FieldUpdateCollector(
+                table,
+                starting_row_ids=starting_row_ids,
+                deleted_m2m_rels_per_link_field=deleted_m2m_rels_per_link_field,
+            )
+            collector.batched = True
+            self.collectors[table.id] = collector
+        else:
+            collector.add_starting_rows(
+                starting_row_ids, deleted_m2m_rels_per_link_field
+            )
+        return collector
+
+    def apply(self):
+        for collector in self.collectors.values():
+            collector.batched = False
+            collector.apply_updates_and_get_updated_fields(
+                self.field_cache,
+                starting_field_ids=collector.batched_starting_field_ids,
+            )
+
+
+def get_current_cascade_batch() -> Optional[CascadeBatch]:
+    return getattr(_local, "batch", None)
+
+
+@contextmanager
+def cascade_batch() -> Iterator[CascadeBatch]:
+    """
+    Merges the cascades of all the row handler calls made within the context into
+    one per starting table, which is applied when the context exits. Everything
+    runs in one transaction. Nested batches join the outer one.
+
+    Example:
+        with cascade_batch():
+            for chunk in chunks:
+                RowHandler().create_rows(user, table, chunk)
+    """
+
+    current_batch = get_current_cascade_batch()
+    if current_batch is not None:
+        yield current_batch
+        return
+
+    with transaction.atomic():
+        batch = CascadeBatch()
+        _local.batch = batch
+        try:
+            yield batch
+        finally:
+            _local.batch = None
+        batch.apply()
+
+
+def get_field_update_collector(
+    table: Table,
+    starting_row_ids: StartingRowIdsType = None,
+    deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+) -> FieldUpdateCollector:
+    """
+    Returns the collector of the table shared by the current `cascade_batch`, or a
+    new collector if there is none.
+    """
+
+    batch = get_current_cascade_batch()
+    if batch is not None:
+        return batch.get_collector(
+            table, starting_row_ids, deleted_m2m_rels_per_link_field
+        )
+    return FieldUpdateCollector(
+        table,
+        starting_row_ids=starting_row_ids,
+        deleted_m2m_rels_per_link_field=deleted_m2m_rels_per_link_field,
+    )
+
+
+def get_field_cache() -> FieldCache:
+    """
+    Returns the field cache shared by the current `cascade_batch`, or a new field
+    cache if there is none.
+    """
+
+    batch = get_current_cascade_batch()
+    if batch is not None:
+        return batch.field_cache
+    return FieldCache()
@@ -22,15 +22,130 @@
 # this query so it works with our own database models and structure.
 #
 
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
 from django.conf import settings
+from django.db import connection
 
+from baserow_dynamic_table.fields.dependencies.graph import (
+    field_dependency_graph_enabled,
+    get_field_dependency_graph,
+)
 from baserow_dynamic_table.fields.dependencies.models import (
     FieldDependency,
 )
 
+# A dependency of the field with the first id on the field with the second id.
+CandidateDependency = Tuple[int, int]
+
 
 def will_cause_circular_dep(from_field, to_field):
-    return from_field.id in get_all_field_dependencies(to_field)
+    return bool(get_circular_dependencies([(from_field.id, to_field.id)]))
+
+
+def get_circular_dependencies(
+    candidates: Iterable[CandidateDependency],
+    replaced_dependencies: Optional[Dict[int, Iterable[int]]] = None,
+) -> Set[CandidateDependency]:
+    """
+    Checks many candidate dependencies at once and returns those that would cause a
+    circular reference, because the dependant already is a dependency of the field
+    it would depend on. Like `get_all_field_dependencies`, dependency chains longer
+    than `MAX_FIELD_REFERENCE_DEPTH` are not followed.
+
+    The candidates are checked as if they had all been created already, so that the
+    cycles formed by several of them together are found as well. The check is done
+    against the in-memory dependency graph if it's enabled, otherwise with a single
+    recursive query for all the candidates.
+
+    :param candidates: `(dependant_id, dependency_id)` tuples of the dependencies
+        that would be created.
+    :param replaced_dependencies: The ids of all the dependency fields, keyed by
+        the id of their dependant field, of the dependant fields whose existing
+        dependencies would be replaced.
+    :return: The candidates which would cause a circular reference.
+    """
+
+    candidates = set(candidates)
+    if not candidates:
+        return set()
+
+    added_dependency_ids = defaultdict(set)
+    for dependant_id, dependency_ids in (replaced_dependencies or {}).items():
+        added_dependency_ids[dependant_id].update(dependency_ids)
+    for dependant_id, dependency_id in candidates:
+        added_dependency_ids[dependant_id].add(dependency_id)
+    replaced_dependant_ids = list(replaced_dependencies or [])
+
+    max_depth = settings.MAX_FIELD_REFERENCE_DEPTH
+    if field_dependency_graph_enabled():
+        graph = get_field_dependency_graph().with_dependencies(
+            added_dependency_ids, replaced_dependant_ids=replaced_dependant_ids
+        )
+        return {
+            (dependant_id, dependency_id)
+            for dependant_id, dependency_id in candidates
+            if graph.is_dependency_of(dependant_id, dependency_id, max_depth)
+        }
+
+    dependant_ids, dependency_ids = zip(*candidates)
+    added_dependencies = [
+        (dependant_id, dependency_id)
+        for dependant_id, dependency_ids in added_dependency_ids.items()
+        for dependency_id in dependency_ids
+    ]
+    relationship_table = FieldDependency._meta.db_table
+
+    # Starting from the field every candidate would depend on, the dependencies are
+    # followed until the dependant of the candidate is found. The existing
+    # dependencies of the replaced dependants are left out and the added ones are
+    # followed as well. Only a table name gets formatted in, no user controllable
+    # input, safe.
+    # fmt: off
+    raw_query = (
+        f"""
+        WITH RECURSIVE dependency(dependant_id, dependency_id) AS (
+            SELECT dependant_id, dependency_id
+                FROM {relationship_table}
+            WHERE dependency_id IS NOT NULL
+            AND dependant_id <> ALL(%(replaced_dependant_ids)s::int[])
+        UNION ALL
+            SELECT * FROM unnest(
+                %(added_dependant_ids)s::int[], %(added_dependency_ids)s::int[]
+            )
+        ), traverse(dependant_id, dependency_id, field_id, depth) AS (
+            SELECT candidate.dependant_id, candidate.dependency_id,
+                candidate.dependency_id, 0
+                FROM unnest(%(dependant_ids)s::int[], %(dependency_ids)s::int[])
+                AS candidate(dependant_id, dependency_id)
+        UNION
+            SELECT traverse.dependant_id, traverse.dependency_id,
+                dependency.dependency_id, traverse.depth + 1
+                FROM traverse
+                INNER JOIN dependency
+                ON dependency.dependant_id = traverse.field_id
+            WHERE traverse.depth < %(max_depth)s
+            AND (traverse.depth = 0 OR traverse.field_id <> traverse.dependant_id)
+        )
+        SELECT DISTINCT dependant_id, dependency_id FROM traverse
+        WHERE depth > 0 AND field_id = dependant_id
+        """  # nosec b608
+    )
+    # fmt: on
+    with connection.cursor() as cursor:
+        cursor.execute(
+            raw_query,
+            {
+                "dependant_ids": list(dependant_ids),
+                "dependency_ids": list(dependency_ids),
+                "replaced_dependant_ids": replaced_dependant_ids,
+                "added_dependant_ids": [dep[0] for dep in added_dependencies],
+                "added_dependency_ids": [dep[1] for dep in added_dependencies],
+                "max_depth": max_depth,
+            },
+        )
+        return {tuple(row) for row in cursor.fetchall()}
 
 
 def get_all_field_dependencies(field):
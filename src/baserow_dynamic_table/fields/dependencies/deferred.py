@@ -0,0 +1,194 @@
+"""
+This file is responsible for deferring the cascade of a row change to a background
+task when it would update too many rows in other tables, so that the request which
+changed the row doesn't have to wait for it.
+
+A row change is deferred when the `FieldUpdateCollector` estimates that its pending
+updates of the other tables touch more than `BASEROW_DEFERRED_CASCADE_MIN_ROWS`
+rows. In that case:
+- The updates of the starting table are still applied right away.
+- The rows that would be updated in the other tables are marked with
+  `needs_background_update`.
+- The `run_deferred_cascade` task is enqueued when the transaction commits. It
+  collects the updates of the dependant fields again and applies them in row id
+  chunks of `BASEROW_DEFERRED_CASCADE_CHUNK_SIZE`.
+
+The cascades which haven't been applied yet are counted per affected table in the
+cache, see `get_pending_deferred_cascade_count`.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from loguru import logger
+
+if TYPE_CHECKING:
+    from baserow_dynamic_table.fields.dependencies.update_collector import (
+        PendingUpdate,
+    )
+    from baserow_dynamic_table.fields.field_cache import FieldCache
+    from baserow_dynamic_table.table.models import Table
+
+# The counter expires in case a task is lost, so that a table is not reported as
+# pending forever.
+PENDING_COUNT_TIMEOUT = 24 * 60 * 60
+
+
+def deferred_cascades_enabled() -> bool:
+    return settings.BASEROW_DEFERRED_CASCADE_MIN_ROWS > 0
+
+
+def pending_deferred_cascades_key(table_id: int) -> str:
+    return f"deferred_cascades_pending_{table_id}"
+
+
+def get_pending_deferred_cascade_count(table_id: int) -> int:
+    """
+    Returns the number of deferred cascades that still have to update rows of the
+    table. The cell values of the table are eventually consistent once it's 0.
+    """
+
+    return max(cache.get(pending_deferred_cascades_key(table_id), 0), 0)
+
+
+def _change_pending_count(table_ids: Iterable[int], delta: int):
+    for table_id in table_ids:
+        key = pending_deferred_cascades_key(table_id)
+        cache.add(key, 0, timeout=PENDING_COUNT_TIMEOUT)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # The counter expired in between, so it can't be tracked anymore.
+            pass
+
+
+def estimate_fan_out(
+    pending_updates: List["PendingUpdate"], field_cache: "FieldCache", limit: int
+) -> int:
+    """
+    Counts the rows matched by the row filters of the pending updates. Counting
+    stops as soon as more than `limit` rows have been found, so the returned
+    estimate is at most `limit + 1`.
+    """
+
+    fan_out = 0
+    for pending_update in pending_updates:
+        remaining = limit + 1 - fan_out
+        if remaining <= 0:
+            break
+        fan_out += pending_update.get_queryset(field_cache).values("id")[
+            :remaining
+        ].count()
+    return fan_out
+
+
+def defer_cascade(
+    starting_table: "Table",
+    starting_row_ids: List[int],
+    starting_field_ids: List[int],
+    affected_table_ids: Iterable[int],
+    deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+):
+    """
+    Enqueues the task applying the cascade of the change of the starting rows once
+    the current transaction commits.
+
+    :param starting_table: The table in which the rows have changed.
+    :param starting_row_ids: The ids of the rows that have changed.
+    :param starting_field_ids: The ids of the fields whose cells have changed.
+    :param affected_table_ids: The ids of the tables updated by the cascade.
+    :param deleted_m2m_rels_per_link_field: The link row relations removed by the
+        change, see `FieldUpdateCollector`.
+    """
+
+    from baserow_dynamic_table.fields.tasks import run_deferred_cascade
+
+    affected_table_ids = list(affected_table_ids)
+    deleted_m2m_rels = {
+        link_field_id: list(row_ids)
+        for link_field_id, row_ids in (deleted_m2m_rels_per_link_field or {}).items()
+    }
+
+    def enqueue():
+        _change_pending_count(affected_table_ids, 1)
+        run_deferred_cascade.delay(
+            starting_table.id,
+            starting_row_ids,
+            starting_field_ids,
+            affected_table_ids,
+            deleted_m2m_rels,
+        )
+
+    logger.debug(
+        f"Deferring the cascade of {len(starting_row_ids)} rows of table "
+        f"{starting_table.id} to tables {affected_table_ids}."
+    )
+    transaction.on_commit(enqueue)
+
+
+def apply_deferred_cascade(
+    starting_table: "Table",
+    starting_row_ids: List[int],
+    starting_field_ids: List[int],
+    deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+    chunk_size: Optional[int] = None,
+):
+    """
+    Collects the updates of the dependants of the starting fields again and applies
+    them in row id chunks. The dependants are notified with
+    `row_of_dependency_updated`, also when the rows have been created, moved or
+    deleted, because the update statements only depend on the current values.
+
+    :param starting_table: The table in which the rows have changed.
+    :param starting_row_ids: The ids of the rows that have changed.
+    :param starting_field_ids: The ids of the fields whose cells have changed.
+    :param deleted_m2m_rels_per_link_field: The link row relations removed by the
+        change.
+    :param chunk_size: The number of row ids updated per statement, defaults to
+        `BASEROW_DEFERRED_CASCADE_CHUNK_SIZE`.
+    """
+
+    from baserow_dynamic_table.fields.dependencies.handler import (
+        FieldDependencyHandler,
+    )
+    from baserow_dynamic_table.fields.dependencies.update_collector import (
+        FieldUpdateCollector,
+    )
+    from baserow_dynamic_table.fields.field_cache import FieldCache
+
+    model = starting_table.get_model()
+    field_cache = FieldCache()
+    field_cache.cache_model(model)
+    starting_rows = list(model.objects_and_trash.filter(id__in=starting_row_ids))
+
+    update_collector = FieldUpdateCollector(
+        starting_table,
+        starting_row_ids=starting_row_ids,
+        deleted_m2m_rels_per_link_field=deleted_m2m_rels_per_link_field,
+    )
+    for (
+        dependant_field,
+        dependant_field_type,
+        path_to_starting_table,
+    ) in FieldDependencyHandler.get_dependant_fields_with_type(
+        starting_table.id,
+        starting_field_ids,
+        associated_relations_changed=True,
+        field_cache=field_cache,
+    ):
+        dependant_field_type.row_of_dependency_updated(
+            dependant_field,
+            starting_rows,
+            update_collector,
+            field_cache,
+            path_to_starting_table,
+        )
+    update_collector.apply_updates_and_get_updated_fields(
+        field_cache,
+        chunk_size=chunk_size or settings.BASEROW_DEFERRED_CASCADE_CHUNK_SIZE,
+    )
+
+
+def finish_deferred_cascade(affected_table_ids: Iterable[int]):
+    _change_pending_count(affected_table_ids, -1)
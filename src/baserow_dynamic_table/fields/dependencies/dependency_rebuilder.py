@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, List
 
-from django.db.models import Q
+from django.db.models import F, Q
 
 if TYPE_CHECKING:
     from baserow_dynamic_table.fields import (
@@ -8,11 +8,14 @@ if TYPE_CHECKING:
     )
 
 from baserow_dynamic_table.fields.dependencies.circular_reference_checker import (
-    will_cause_circular_dep,
+    get_circular_dependencies,
 )
 from baserow_dynamic_table.fields.dependencies.exceptions import (
     CircularFieldDependencyError,
 )
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
 from baserow_dynamic_table.fields.dependencies.models import (
     FieldDependency,
 )
@@ -33,10 +36,21 @@ def break_dependencies_for_field(field):
         LinkRowField,
     )
 
+    changed_dependant_ids = {field.id}
+    dependants_query = Q(dependency=field)
+    if isinstance(field, LinkRowField):
+        dependants_query |= Q(via=field)
+    changed_dependant_ids.update(
+        FieldDependency.objects.filter(dependants_query).values_list(
+            "dependant_id", flat=True
+        )
+    )
+
     FieldDependency.objects.filter(dependant=field).delete()
     field.dependants.update(dependency=None, broken_reference_field_name=field.name)
     if isinstance(field, LinkRowField):
         field.vias.all().delete()
+    invalidate_field_dependency_graph(changed_dependant_ids)
 
 
 def update_fields_with_broken_references(field: "field_models.Field"):
@@ -48,27 +62,69 @@ def update_fields_with_broken_references(field: "field_models.Field"):
     :return: True if some fields were found which now depend on field, False otherwise.
     """
 
-    broken_dependencies_fixed_by_fields_name = FieldDependency.objects.filter(
-        Q(
-            dependant__table=field.table,
-            broken_reference_field_name=field.name,
-        )
-        | Q(
-            via__link_row_table=field.table,
-            broken_reference_field_name=field.name,
+    return update_fields_with_broken_references_in_bulk([field])
+
+
+def update_fields_with_broken_references_in_bulk(
+        fields: List["field_models.Field"],
+) -> bool:
+    """
+    Checks to see if there are any fields which should now depend on one of the
+    provided fields because its name matches a broken reference. Fixes all the
+    broken references with one query and one circular dependency check.
+
+    :param fields: The fields that have potentially just been renamed or created.
+    :return: True if some fields were found which now depend on one of the fields,
+        False otherwise.
+    """
+
+    fields_by_reference = {}
+    for field in fields:
+        fields_by_reference.setdefault((field.table_id, field.name), field)
+    if not fields_by_reference:
+        return False
+
+    broken_references = Q()
+    for table_id, name in fields_by_reference.keys():
+        broken_references |= Q(
+            dependant__table_id=table_id,
+            broken_reference_field_name=name,
+        ) | Q(
+            via__link_row_table_id=table_id,
+            broken_reference_field_name=name,
         )
+    broken_dependencies = FieldDependency.objects.filter(broken_references).annotate(
+        dependant_table_id=F("dependant__table_id"),
+        via_link_row_table_id=F("via__link_row_table_id"),
     )
+
     updated_deps = []
-    for dep in broken_dependencies_fixed_by_fields_name:
-        if not will_cause_circular_dep(dep.dependant, field):
+    for dep in broken_dependencies:
+        name = dep.broken_reference_field_name
+        field = fields_by_reference.get(
+            (dep.dependant_table_id, name)
+        ) or fields_by_reference.get((dep.via_link_row_table_id, name))
+        updated_deps.append((dep, field))
+    if not updated_deps:
+        return False
+
+    # The fixed references are checked together, so that the cycles formed by
+    # several of them are found as well. Those stay broken.
+    circular_dependencies = get_circular_dependencies(
+        (dep.dependant_id, field.id) for dep, field in updated_deps
+    )
+    fixed_deps = []
+    for dep, field in updated_deps:
+        if (dep.dependant_id, field.id) not in circular_dependencies:
             dep.dependency = field
             dep.broken_reference_field_name = None
-            updated_deps.append(dep)
+            fixed_deps.append(dep)
     FieldDependency.objects.bulk_update(
-        updated_deps, ["dependency", "broken_reference_field_name"]
+        fixed_deps, ["dependency", "broken_reference_field_name"]
     )
+    invalidate_field_dependency_graph(dep.dependant_id for dep in fixed_deps)
 
-    return len(updated_deps) > 0
+    return len(fixed_deps) > 0
 
 
 def rebuild_field_dependencies(
@@ -86,19 +142,47 @@ def rebuild_field_dependencies(
     :return: Any new dependencies created by the rebuild.
     """
 
+    return rebuild_field_dependencies_in_bulk([field_instance], field_cache)
+
+
+def rebuild_field_dependencies_in_bulk(
+        field_instances: List["field_models.Field"],
+        field_cache: FieldCache,
+) -> List[FieldDependency]:
+    """
+    Resets the dependencies of all the provided fields to the ones defined by their
+    FieldType.get_field_dependencies. The existing dependencies are diffed against
+    the new ones, so that only the changed ones are deleted and created, with one
+    query each for all the fields. Does not affect any dependencies from other
+    fields to these fields.
+
+    :param field_instances: The fields whose dependencies to change.
+    :param field_cache: A cache which will be used to lookup the actual
+        fields referenced by any provided field dependencies.
+    :raises CircularFieldDependencyError: When the new dependencies would cause a
+        circular reference, in which case nothing is changed.
+    :return: Any new dependencies created by the rebuild.
+    """
+
     from baserow_dynamic_table.fields.registries import (
         field_type_registry,
     )
 
-    field_type = field_type_registry.get_by_model(field_instance)
-    new_dependencies = field_type.get_field_dependencies(field_instance, field_cache)
+    if not field_instances:
+        return []
 
-    current_dependencies = field_instance.dependencies.all()
+    current_dependencies = FieldDependency.objects.filter(
+        dependant_id__in=[field_instance.id for field_instance in field_instances]
+    )
 
     # The str of a dependency can be used to compare two dependencies to see if they
     # are functionally the same.
     current_deps_by_str = {str(dep): dep for dep in current_dependencies}
-    new_deps_by_str = {str(dep): dep for dep in new_dependencies}
+    new_deps_by_str = {}
+    for field_instance in field_instances:
+        field_type = field_type_registry.get_by_model(field_instance)
+        for new_dep in field_type.get_field_dependencies(field_instance, field_cache):
+            new_deps_by_str.setdefault(str(new_dep), new_dep)
     new_dependencies_to_create = []
 
     for new_dep_str, new_dep in new_deps_by_str.items():
@@ -111,15 +195,31 @@ def rebuild_field_dependencies(
             # create it.
             new_dependencies_to_create.append(new_dep)
 
-    for dep in new_dependencies_to_create:
-        if dep.dependency is not None and will_cause_circular_dep(
-                field_instance, dep.dependency
-        ):
-            raise CircularFieldDependencyError()
-
-    new_dependencies = FieldDependency.objects.bulk_create(new_dependencies_to_create)
     # All new dependencies will have been removed from current_deps_by_str and so any
-    # remaining ones are old dependencies which should no longer exist. Delete them.
+    # remaining ones are old dependencies which should no longer exist.
     delete_ids = [dep.id for dep in current_deps_by_str.values()]
+
+    # The new dependencies are checked together against the graph in which they
+    # replace the current ones, so that nothing is changed if any is circular.
+    replaced_dependencies = {
+        field_instance.id: set() for field_instance in field_instances
+    }
+    for new_dep in new_deps_by_str.values():
+        if new_dep.dependency_id is not None:
+            replaced_dependencies[new_dep.dependant_id].add(new_dep.dependency_id)
+    if get_circular_dependencies(
+            (
+                (dep.dependant_id, dep.dependency_id)
+                for dep in new_dependencies_to_create
+                if dep.dependency_id is not None
+            ),
+            replaced_dependencies=replaced_dependencies,
+    ):
+        raise CircularFieldDependencyError()
+
     FieldDependency.objects.filter(pk__in=delete_ids).delete()
+    new_dependencies = FieldDependency.objects.bulk_create(new_dependencies_to_create)
+    invalidate_field_dependency_graph(
+        field_instance.id for field_instance in field_instances
+    )
     return new_dependencies
@@ -0,0 +1,391 @@
+"""
+This file is responsible for the in-process graph of all the `FieldDependency` rows,
+which is used to find the dependants of fields without querying the database. The
+dependencies only change when fields change, but the dependants are looked up for
+every row write.
+
+The graph is built with a single query and contains adjacency lists of the
+dependencies keyed by the id of the dependency field, of the via link row field and
+of the field related to the via link row field. It also contains the ids of the
+tables that have dependants, so that writes to the rows of the other tables can
+skip the cascade of updates entirely.
+
+Every process keeps one graph together with the version it was built for. The
+version is stored in the Django cache and is bumped when a transaction that changed
+the dependencies commits. A process rebuilds its graph the first time it's used
+after the version changed.
+
+The code changing the dependencies must call `invalidate_field_dependency_graph`
+with the ids of the dependant fields whose dependencies have changed. There are no
+model signals, so that deleting fields can still use Django's fast delete of the
+cascaded dependencies. The dependencies of deleted fields can stay in the graph
+until it's rebuilt, because their ids are never used again.
+
+Until a transaction that changed the dependencies commits, only that transaction
+can see the changes. It therefore uses its own graph, which is stored in the
+`on_commit` callback registered by the invalidation. That graph is the one of the
+process with the dependencies of the changed dependant fields replaced, so only
+those have to be queried. When the transaction, or the savepoint in which the
+dependencies changed, is rolled back, Django discards the callback and with it the
+changes.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import FieldDependency
+
+GRAPH_VERSION_CACHE_KEY = "field_dependency_graph_version"
+
+
+class DependencyEdge(NamedTuple):
+    id: int
+    dependant_id: int
+    dependant_table_id: int
+    dependency_id: Optional[int]
+    dependency_table_id: Optional[int]
+    via_id: Optional[int]
+    via_table_id: Optional[int]
+    # The id of the link row field related to the via link row field, if any.
+    via_related_field_id: Optional[int]
+    via_related_field_table_id: Optional[int]
+
+
+class FieldDependencyGraph:
+    def __init__(
+        self,
+        edges: Iterable[DependencyEdge],
+        base: Optional["FieldDependencyGraph"] = None,
+        replaced_dependant_ids: Iterable[int] = (),
+    ):
+        """
+        :param edges: The dependencies in the graph.
+        :param base: An optional graph whose dependencies are included as well,
+            except for those of the replaced dependants.
+        :param replaced_dependant_ids: The ids of the dependant fields whose
+            dependencies in the base graph are replaced by the provided edges.
+        """
+
+        self._base = base
+        self._replaced_dependant_ids = set(replaced_dependant_ids)
+        self._by_dependency_id = defaultdict(list)
+        self._by_via_id = defaultdict(list)
+        self._by_via_related_field_id = defaultdict(list)
+        self._dependency_ids_by_dependant_id = defaultdict(set)
+        # The ids of the tables containing a field which other fields depend on,
+        # directly or via a link row field. Tables of replaced dependencies in the
+        # base graph are still included, which at worst causes an empty cascade.
+        self._tables_with_dependants: Set[int] = set()
+
+        for edge in edges:
+            self._tables_with_dependants.update(
+                table_id
+                for table_id in (
+                    edge.dependency_table_id,
+                    edge.via_table_id,
+                    edge.via_related_field_table_id,
+                )
+                if table_id is not None
+            )
+            if edge.dependency_id is not None:
+                self._by_dependency_id[edge.dependency_id].append(edge)
+                self._dependency_ids_by_dependant_id[edge.dependant_id].add(
+                    edge.dependency_id
+                )
+            if edge.via_id is not None:
+                self._by_via_id[edge.via_id].append(edge)
+            if edge.via_related_field_id is not None:
+                self._by_via_related_field_id[edge.via_related_field_id].append(edge)
+
+    @classmethod
+    def build(
+        cls,
+        base: Optional["FieldDependencyGraph"] = None,
+        replaced_dependant_ids: Optional[Iterable[int]] = None,
+    ) -> "FieldDependencyGraph":
+        """
+        Builds the graph of all the dependencies, or only queries the dependencies
+        of the replaced dependant fields if a base graph is provided.
+        """
+
+        queryset = FieldDependency.objects.all()
+        if base is not None:
+            replaced_dependant_ids = set(replaced_dependant_ids or [])
+            queryset = queryset.filter(dependant_id__in=replaced_dependant_ids)
+        return cls(
+            (
+                DependencyEdge(*values)
+                for values in queryset.values_list(
+                    "id",
+                    "dependant_id",
+                    "dependant__table_id",
+                    "dependency_id",
+                    "dependency__table_id",
+                    "via_id",
+                    "via__table_id",
+                    "via__link_row_related_field_id",
+                    "via__link_row_related_field__table_id",
+                )
+            ),
+            base=base,
+            replaced_dependant_ids=replaced_dependant_ids or (),
+        )
+
+    def has_dependants(self, table_id: int) -> bool:
+        """
+        Checks if any field depends on a field of the table, directly or via a
+        link row field.
+        """
+
+        return table_id in self._tables_with_dependants or (
+            self._base is not None and self._base.has_dependants(table_id)
+        )
+
+    def _get_edges(self, index: str, field_id: int) -> List[DependencyEdge]:
+        edges = getattr(self, index).get(field_id, [])
+        if self._base is None:
+            return edges
+        return edges + [
+            edge
+            for edge in self._base._get_edges(index, field_id)
+            if edge.dependant_id not in self._replaced_dependant_ids
+        ]
+
+    def _get_dependency_ids(self, dependant_id: int) -> Set[int]:
+        dependency_ids = self._dependency_ids_by_dependant_id.get(dependant_id, set())
+        if self._base is None or dependant_id in self._replaced_dependant_ids:
+            return dependency_ids
+        base_dependency_ids = self._base._get_dependency_ids(dependant_id)
+        if not dependency_ids:
+            return base_dependency_ids
+        return base_dependency_ids | dependency_ids
+
+    def with_dependencies(
+        self,
+        dependency_ids_by_dependant_id: Dict[int, Iterable[int]],
+        replaced_dependant_ids: Iterable[int] = (),
+    ) -> "FieldDependencyGraph":
+        """
+        Returns a graph in which the provided dependencies are added to the ones of
+        this graph, without changing it. Only the dependency ids are known by that
+        graph, it's used to check dependencies before they are created.
+
+        :param dependency_ids_by_dependant_id: The ids of the dependency fields that
+            are added to the dependencies of each dependant field.
+        :param replaced_dependant_ids: The ids of the dependant fields whose
+            dependencies in this graph are dropped.
+        """
+
+        graph = FieldDependencyGraph(
+            [], base=self, replaced_dependant_ids=replaced_dependant_ids
+        )
+        for dependant_id, dependency_ids in dependency_ids_by_dependant_id.items():
+            graph._dependency_ids_by_dependant_id[dependant_id].update(dependency_ids)
+        return graph
+
+    def get_dependant_edges(
+        self, field_ids: Iterable[int], associated_relations_changed: bool
+    ) -> List[DependencyEdge]:
+        """
+        Returns the dependencies on the provided fields ordered by id, the same as
+        `FieldDependencyHandler.get_dependant_fields_with_type` queries them.
+
+        :param field_ids: The ids of the fields to find the dependencies on.
+        :param associated_relations_changed: If true the dependencies via the
+            provided fields, or via the link row fields related to them, are
+            included as well, except for those of the provided fields themselves.
+        """
+
+        field_ids = set(field_ids)
+        edges = {}
+        for field_id in field_ids:
+            for edge in self._get_edges("_by_dependency_id", field_id):
+                edges[edge.id] = edge
+
+            if associated_relations_changed:
+                for edge in self._get_edges(
+                    "_by_via_id", field_id
+                ) + self._get_edges("_by_via_related_field_id", field_id):
+                    if edge.dependant_id not in field_ids:
+                        edges[edge.id] = edge
+
+        return [edges[edge_id] for edge_id in sorted(edges)]
+
+    def is_dependency_of(
+        self, dependency_id: int, field_id: int, max_depth: int
+    ) -> bool:
+        """
+        Checks if a field depends on another field, directly or via at most
+        `max_depth` fields in between.
+
+        :param dependency_id: The id of the potential dependency.
+        :param field_id: The id of the field whose dependencies are searched.
+        :param max_depth: The maximum length of the dependency chain to follow.
+        """
+
+        visited = set()
+        frontier = {field_id}
+        for _ in range(max_depth):
+            frontier = {
+                next_id
+                for current_id in frontier
+                for next_id in self._get_dependency_ids(current_id)
+                if next_id not in visited
+            }
+            if dependency_id in frontier:
+                return True
+            if not frontier:
+                break
+            visited |= frontier
+        return False
+
+
+class _GraphInvalidation:
+    """
+    The `on_commit` callback registered when the dependencies change in a
+    transaction. It holds the ids of the changed dependant fields and the graph
+    used by that transaction until it commits.
+    """
+
+    def __init__(self):
+        # None if unknown dependencies have changed, which requires a full rebuild.
+        self.changed_dependant_ids: Optional[Set[int]] = set()
+        self.graph: Optional[FieldDependencyGraph] = None
+
+    def add_changed_dependant_ids(self, dependant_ids: Optional[Iterable[int]]):
+        if dependant_ids is None:
+            self.changed_dependant_ids = None
+        elif self.changed_dependant_ids is not None:
+            self.changed_dependant_ids.update(dependant_ids)
+
+    def __call__(self):
+        connection.field_dependency_graph_invalidated = False
+        _bump_graph_version()
+
+
+_process_graph_lock = threading.Lock()
+_process_graph: Optional[Tuple[int, FieldDependencyGraph]] = None
+
+
+def field_dependency_graph_enabled() -> bool:
+    return settings.BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED
+
+
+def _bump_graph_version():
+    try:
+        cache.incr(GRAPH_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(GRAPH_VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def _get_transaction_invalidations() -> List[Tuple[set, _GraphInvalidation]]:
+    # Avoids going through all the `on_commit` callbacks of the transaction for
+    # every lookup if the dependencies haven't changed.
+    if not getattr(connection, "field_dependency_graph_invalidated", False):
+        return []
+
+    invalidations = [
+        (savepoint_ids, func)
+        for savepoint_ids, func, *_ in connection.run_on_commit
+        if isinstance(func, _GraphInvalidation)
+    ]
+    if not invalidations:
+        # The transaction which changed the dependencies has been rolled back.
+        connection.field_dependency_graph_invalidated = False
+    return invalidations
+
+
+def invalidate_field_dependency_graph(dependant_ids: Optional[Iterable[int]] = None):
+    """
+    Must be called after the dependencies have been changed. From then on the
+    current transaction uses a graph containing its changes, and all the processes
+    rebuild their graph after it commits.
+
+    :param dependant_ids: The ids of the dependant fields whose dependencies have
+        changed. If not provided, the graph of the transaction is rebuilt entirely.
+    """
+
+    if dependant_ids is not None:
+        dependant_ids = set(dependant_ids)
+        if not dependant_ids:
+            return
+
+    # The graphs of the previous invalidations of this transaction don't contain
+    # the latest changes. They are used again if the savepoint of this invalidation
+    # is rolled back, in which case they must be rebuilt.
+    invalidations = _get_transaction_invalidations()
+    for _, invalidation in invalidations:
+        invalidation.graph = None
+
+    if invalidations and invalidations[-1][0] == set(connection.savepoint_ids):
+        # Already registered in the current savepoint.
+        invalidations[-1][1].add_changed_dependant_ids(dependant_ids)
+        return
+
+    invalidation = _GraphInvalidation()
+    invalidation.add_changed_dependant_ids(dependant_ids)
+    transaction.on_commit(invalidation)
+    connection.field_dependency_graph_invalidated = True
+
+
+def _get_process_graph() -> FieldDependencyGraph:
+    global _process_graph
+
+    # The version must be read before building, so that a graph is never stored
+    # with a version that is newer than its content.
+    version = cache.get(GRAPH_VERSION_CACHE_KEY, 0)
+    with _process_graph_lock:
+        if _process_graph is not None and _process_graph[0] == version:
+            return _process_graph[1]
+
+    graph = FieldDependencyGraph.build()
+    with _process_graph_lock:
+        _process_graph = (version, graph)
+    return graph
+
+
+def get_field_dependency_graph() -> FieldDependencyGraph:
+    """
+    Returns the dependency graph which is up to date with the dependencies visible
+    to the current transaction. Only queries the database if the graph has to be
+    rebuilt, or for the dependencies changed by the current transaction.
+    """
+
+    invalidations = _get_transaction_invalidations()
+    if not invalidations:
+        return _get_process_graph()
+
+    _, last_invalidation = invalidations[-1]
+    if last_invalidation.graph is None:
+        # The changes of all the savepoints which haven't been rolled back are
+        # visible to the transaction.
+        changed_dependant_ids = set()
+        for _, invalidation in invalidations:
+            if invalidation.changed_dependant_ids is None:
+                changed_dependant_ids = None
+                break
+            changed_dependant_ids |= invalidation.changed_dependant_ids
+
+        if changed_dependant_ids is None:
+            last_invalidation.graph = FieldDependencyGraph.build()
+        else:
+            last_invalidation.graph = FieldDependencyGraph.build(
+                base=_get_process_graph(),
+                replaced_dependant_ids=changed_dependant_ids,
+            )
+    return last_invalidation.graph
+
+
+def clear_field_dependency_graph():
+    """
+    Drops the graph of this process, so that it's rebuilt when used next.
+    """
+
+    global _process_graph
+
+    with _process_graph_lock:
+        _process_graph = None
@@ -4,8 +4,12 @@ from django.db.models import Q
 
 from baserow_dynamic_table.fields.dependencies.dependency_rebuilder import (
     break_dependencies_for_field,
-    rebuild_field_dependencies,
-    update_fields_with_broken_references,
+    rebuild_field_dependencies_in_bulk,
+    update_fields_with_broken_references_in_bulk,
+)
+from baserow_dynamic_table.fields.dependencies.graph import (
+    field_dependency_graph_enabled,
+    get_field_dependency_graph,
 )
 from baserow_dynamic_table.fields.field_cache import FieldCache
 from baserow_dynamic_table.fields.models import Field, LinkRowField
@@ -48,8 +52,27 @@ class FieldDependencyHandler:
         :return: Any new dependencies created by the rebuild.
         """
 
-        update_fields_with_broken_references(field)
-        return rebuild_field_dependencies(field, field_cache)
+        return cls.rebuild_dependencies_in_bulk([field], field_cache)
+
+    @classmethod
+    def rebuild_dependencies_in_bulk(
+            cls, fields: List[Field], field_cache: FieldCache
+    ) -> List[FieldDependency]:
+        """
+        Rebuilds the dependencies of all the provided fields at once, see
+        `rebuild_dependencies`. Faster than rebuilding them one by one when many
+        fields are created or changed together, like when importing or duplicating
+        tables.
+
+        :param fields: The fields to rebuild the field dependencies for.
+        :param field_cache: A field cache which will be used to lookup fields.
+        :raises CircularFieldDependencyError: When the new dependencies of the
+            fields would cause a circular reference.
+        :return: Any new dependencies created by the rebuild.
+        """
+
+        update_fields_with_broken_references_in_bulk(fields)
+        return rebuild_field_dependencies_in_bulk(fields, field_cache)
 
     @classmethod
     def break_dependencies_delete_dependants(cls, field):
@@ -93,6 +116,15 @@ class FieldDependencyHandler:
         if not field_ids:
             return []
 
+        if field_dependency_graph_enabled():
+            return cls._get_dependant_fields_with_type_from_graph(
+                table_id,
+                field_ids,
+                associated_relations_changed,
+                field_cache or FieldCache(),
+                starting_via_path_to_starting_table,
+            )
+
         dependant_filter = Q(dependency_id__in=field_ids)
         if associated_relations_changed:
             # Any m2m relationships associated with the provided field_ids have changed.
@@ -139,6 +171,81 @@ class FieldDependencyHandler:
             )
         return result
 
+    @classmethod
+    def table_has_dependants(cls, table_id: int) -> bool:
+        """
+        Checks if any field depends on a field of the provided table, directly or via
+        a link row field. If not, changing the rows of the table can't affect any
+        other field. Without the dependency graph this can't be answered without a
+        query, so true is returned.
+
+        :param table_id: The id of the table to check.
+        :return: False if no field depends on the fields of the table.
+        """
+
+        if not field_dependency_graph_enabled():
+            return True
+        return get_field_dependency_graph().has_dependants(table_id)
+
+    @classmethod
+    def _get_dependant_fields_with_type_from_graph(
+            cls,
+            table_id: int,
+            field_ids: Iterable[int],
+            associated_relations_changed: bool,
+            field_cache: FieldCache,
+            starting_via_path_to_starting_table: Optional[str] = None,
+    ) -> FieldDependants:
+        """
+        Does the same as `get_dependant_fields_with_type`, but finds the dependencies
+        in the in-memory dependency graph instead of querying them. The dependant and
+        via fields are looked up in the field cache, so no query is needed if they
+        have been cached already.
+        """
+
+        edges = get_field_dependency_graph().get_dependant_edges(
+            field_ids, associated_relations_changed
+        )
+        if not edges:
+            return []
+
+        fields_by_id = field_cache.lookup_specific_by_ids(
+            [edge.dependant_id for edge in edges]
+            + [edge.via_id for edge in edges if edge.via_id is not None]
+        )
+
+        result: FieldDependants = []
+        for edge in edges:
+            dependant_field = fields_by_id.get(edge.dependant_id)
+            if dependant_field is None:
+                # If somehow the dependant is trashed it will be None. We can't really
+                # trigger any updates for it so ignore it.
+                continue
+            dependant_field_type = field_type_registry.get_by_model(dependant_field)
+
+            # See `get_dependant_fields_with_type` for why only some via's are added
+            # to the path.
+            if edge.via_id is not None and (
+                edge.dependant_table_id != table_id
+                or (
+                    edge.dependency_id is not None
+                    and edge.dependency_table_id == table_id
+                )
+            ):
+                via_field = fields_by_id.get(edge.via_id)
+                if via_field is None:
+                    continue
+                via_path_to_starting_table = (
+                    starting_via_path_to_starting_table or []
+                ) + [via_field]
+            else:
+                via_path_to_starting_table = starting_via_path_to_starting_table
+
+            result.append(
+                (dependant_field, dependant_field_type, via_path_to_starting_table)
+            )
+        return result
+
     @classmethod
     def get_via_dependants_of_link_field(cls, field: "LinkRowField") -> FieldDependants:
         broken_via_dep_filter = Q(via_id=field.id) & ~Q(dependant_id=field.id)
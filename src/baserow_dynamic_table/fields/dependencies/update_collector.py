@@ -1,10 +1,20 @@
+import json
 from collections import defaultdict
-from typing import Dict, List, NamedTuple, Optional, Set, Tuple, cast
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, cast
 
-from django.db.models import Expression, Q, Value
+from django.conf import settings
+from django.db.models import Expression, F, Q, Value
+from loguru import logger
 
+from baserow_dynamic_table.db.lookups import IsDistinctFrom
+from baserow_dynamic_table.fields.dependencies.deferred import (
+    defer_cascade,
+    deferred_cascades_enabled,
+    estimate_fan_out,
+)
 from baserow_dynamic_table.fields.field_cache import FieldCache
 from baserow_dynamic_table.fields.models import Field, LinkRowField
+from baserow_dynamic_table.rows.cache import invalidate_table_in_row_cache
 from baserow_dynamic_table.search.handler import SearchHandler
 from baserow_dynamic_table.table.constants import (
     ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME,
@@ -70,8 +80,8 @@ class PathBasedUpdateStatementCollector:
                 )
             else:
                 if update_statement is not None:
-                    # Value(None) is a valid update statement, but it doesn't work
-                    # with the exclude method, so we need to convert it to None.
+                    # Value(None) is a valid update statement, but its type can't be
+                    # resolved when updating, so we need to convert it to None.
                     self.update_statements[field.db_column] = (
                         update_statement if update_statement != Value(None) else None
                     )
@@ -123,65 +133,130 @@ class PathBasedUpdateStatementCollector:
         path_to_starting_table: StartingRowIdsType = None,
         deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
     ) -> int:
-        updated_rows = 0
-        path_to_starting_table = path_to_starting_table or []
-        if self.connection_here is not None:
-            path_to_starting_table = [self.connection_here] + path_to_starting_table
-        updated_rows += self._execute_pending_update_statements(
+        return self.execute_all_and_report(
             field_cache,
+            starting_row_ids,
             path_to_starting_table,
+            deleted_m2m_rels_per_link_field,
+        ).updated_rows
+
+    def execute_all_and_report(
+        self,
+        field_cache: FieldCache,
+        starting_row_ids: StartingRowIdsType = None,
+        path_to_starting_table: StartingRowIdsType = None,
+        deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> "CascadeUpdateReport":
+        """
+        Executes the planned updates of this collector and its sub paths, see
+        `plan_pending_updates`.
+
+        :param chunk_size: If provided, every update is split into statements of
+            this many row ids, see `PendingUpdate.execute`.
+        :return: The number of executed statements and the rows they updated.
+        """
+
+        pending_updates = self.plan_pending_updates(
+            starting_row_ids, path_to_starting_table, deleted_m2m_rels_per_link_field
+        )
+        return execute_pending_updates(pending_updates, field_cache, chunk_size)
+
+    def plan_pending_updates(
+        self,
+        starting_row_ids: StartingRowIdsType = None,
+        path_to_starting_table: StartingRowIdsType = None,
+        deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+    ) -> List["PendingUpdate"]:
+        """
+        Returns the updates of this collector and its sub paths in the order in which
+        they must be executed, a collector before its sub paths. Consecutive updates
+        setting the same columns of the same table to the same expressions are merged
+        into one by combining their row filters. Updates can't be merged across an
+        update of another table, because it could depend on the earlier update or be a
+        dependency of the later one.
+        """
+
+        pending_updates = []
+        self._collect_pending_updates(
+            pending_updates,
             starting_row_ids,
+            path_to_starting_table or [],
             deleted_m2m_rels_per_link_field,
         )
 
-        for sub_path in self.sub_paths.values():
-            updated_rows += sub_path.execute_all(
-                starting_row_ids=starting_row_ids,
-                path_to_starting_table=path_to_starting_table,
-                field_cache=field_cache,
-                deleted_m2m_rels_per_link_field=deleted_m2m_rels_per_link_field,
-            )
-        return updated_rows
+        merged_updates: List[PendingUpdate] = []
+        for pending_update in pending_updates:
+            if merged_updates and merged_updates[-1].can_be_merged_with(
+                pending_update
+            ):
+                merged_updates[-1] = merged_updates[-1].merge(pending_update)
+            else:
+                merged_updates.append(pending_update)
+        return merged_updates
 
-    def _execute_pending_update_statements(
+    def _collect_pending_updates(
         self,
-        field_cache: FieldCache,
-        path_to_starting_table: List[LinkRowField],
+        pending_updates: List["PendingUpdate"],
         starting_row_ids: StartingRowIdsType,
+        path_to_starting_table: List[LinkRowField],
         deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]],
-    ) -> int:
-        model = field_cache.get_model(self.table)
-        qs = model.objects_and_trash
-        # If the connection is broken back to the starting table then there is no
-        # way to join back to these starting rows. So we just update all cells.
-        if starting_row_ids is not None and not self.connection_is_broken:
-            if len(path_to_starting_table) == 0:
-                path_to_starting_table_id_column = "id"
-            else:
-                path_to_starting_table_id_column = (
-                    "__".join([p.db_column for p in path_to_starting_table]) + "__id"
-                )
-            path_to_starting_table_id_column += "__in"
-
-            filter_for_rows_connected_to_starting_row = Q(
-                **{path_to_starting_table_id_column: starting_row_ids}
-            ) | self._include_rows_connected_to_deleted_m2m_relationships(
-                deleted_m2m_rels_per_link_field,
-                path_to_starting_table,
-            )
+    ):
+        if self.connection_here is not None:
+            path_to_starting_table = [self.connection_here] + path_to_starting_table
 
-            qs = qs.filter(filter_for_rows_connected_to_starting_row)
         if starting_row_ids is None:
             # We aren't updating individual rows but instead entire columns, so don't
             # set this per row attribute.
             self.update_statements.pop(ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME, None)
 
-        updated_rows = 0
         if self.update_statements:
-            updated_rows = qs.exclude(**self.update_statements).update(
-                **self.update_statements
+            pending_updates.append(
+                PendingUpdate(
+                    self.table,
+                    dict(self.update_statements),
+                    self._get_row_filter(
+                        path_to_starting_table,
+                        starting_row_ids,
+                        deleted_m2m_rels_per_link_field,
+                    ),
+                    tuple(link_field.id for link_field in path_to_starting_table),
+                )
             )
-        return updated_rows
+
+        for sub_path in self.sub_paths.values():
+            sub_path._collect_pending_updates(
+                pending_updates,
+                starting_row_ids,
+                path_to_starting_table,
+                deleted_m2m_rels_per_link_field,
+            )
+
+    def _get_row_filter(
+        self,
+        path_to_starting_table: List[LinkRowField],
+        starting_row_ids: StartingRowIdsType,
+        deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]],
+    ) -> Optional[Q]:
+        # If the connection is broken back to the starting table then there is no
+        # way to join back to these starting rows. So we just update all cells.
+        if starting_row_ids is None or self.connection_is_broken:
+            return None
+
+        if len(path_to_starting_table) == 0:
+            path_to_starting_table_id_column = "id"
+        else:
+            path_to_starting_table_id_column = (
+                "__".join([p.db_column for p in path_to_starting_table]) + "__id"
+            )
+        path_to_starting_table_id_column += "__in"
+
+        return Q(
+            **{path_to_starting_table_id_column: starting_row_ids}
+        ) | self._include_rows_connected_to_deleted_m2m_relationships(
+            deleted_m2m_rels_per_link_field,
+            path_to_starting_table,
+        )
 
     def _include_rows_connected_to_deleted_m2m_relationships(
         self,
@@ -227,6 +302,170 @@ class PathBasedUpdateStatementCollector:
         return filters
 
 
+class PendingUpdate(NamedTuple):
+    table: Table
+    update_statements: Dict[str, Optional[Expression]]
+    # Only the rows matching the filter are updated, or all if None.
+    row_filter: Optional[Q]
+    # The ids of the link row fields leading from the table to the starting table.
+    via_path_ids: Tuple[int, ...] = ()
+
+    def can_be_merged_with(self, other: "PendingUpdate") -> bool:
+        return (
+            self.table.id == other.table.id
+            and self.update_statements == other.update_statements
+        )
+
+    def merge(self, other: "PendingUpdate") -> "PendingUpdate":
+        if self.row_filter is None or other.row_filter is None:
+            row_filter = None
+        else:
+            row_filter = self.row_filter | other.row_filter
+        return PendingUpdate(
+            self.table,
+            self.update_statements,
+            row_filter,
+            max(self.via_path_ids, other.via_path_ids, key=len),
+        )
+
+    def get_queryset(self, field_cache: FieldCache):
+        """
+        Returns the rows matching the row filter, regardless of whether the update
+        changes them.
+        """
+
+        qs = field_cache.get_model(self.table).objects_and_trash
+        if self.row_filter is not None:
+            qs = qs.filter(self.row_filter)
+        return qs
+
+    def get_changed_rows_queryset(self, field_cache: FieldCache):
+        """
+        Returns the rows matching the row filter where at least one of the columns
+        is changed by the update.
+        """
+
+        changes_value = Q(
+            *[
+                IsDistinctFrom(F(column), update_statement)
+                for column, update_statement in self.update_statements.items()
+            ],
+            _connector=Q.OR,
+        )
+        return self.get_queryset(field_cache).filter(changes_value)
+
+    def explain(self, field_cache: FieldCache) -> "ExplainedUpdate":
+        """
+        Estimates the number of rows changed by the update with `EXPLAIN`, without
+        executing it.
+        """
+
+        explained = json.loads(
+            self.get_changed_rows_queryset(field_cache)
+            .values("id")
+            .explain(format="json")
+        )
+        return ExplainedUpdate(
+            table_id=self.table.id,
+            columns=sorted(self.update_statements.keys()),
+            estimated_rows=explained[0]["Plan"]["Plan Rows"],
+            via_path_ids=list(self.via_path_ids),
+        )
+
+    def execute(self, field_cache: FieldCache, chunk_size: Optional[int] = None) -> int:
+        """
+        Runs the update. Only the rows where at least one of the columns changes are
+        updated.
+
+        :param field_cache: The field cache used to get the model of the table.
+        :param chunk_size: If provided, the rows are updated in a separate statement
+            per range of ids of this many rows matching the row filter, instead of
+            in a single statement.
+        :return: The number of updated rows.
+        """
+
+        qs = self.get_changed_rows_queryset(field_cache)
+        if chunk_size is None:
+            return qs.update(**self.update_statements)
+
+        # The ranges are found by seeking through the ids of the matching rows, so
+        # that rows of the table which aren't updated don't cost any statements.
+        matching_ids = (
+            self.get_queryset(field_cache).order_by("id").values_list("id", flat=True)
+        )
+        updated_rows = 0
+        last_id = None
+        while True:
+            chunk_ids = matching_ids
+            if last_id is not None:
+                chunk_ids = chunk_ids.filter(id__gt=last_id)
+            chunk_ids = list(chunk_ids[:chunk_size])
+            if not chunk_ids:
+                break
+            updated_rows += qs.filter(
+                id__gte=chunk_ids[0], id__lte=chunk_ids[-1]
+            ).update(**self.update_statements)
+            last_id = chunk_ids[-1]
+        return updated_rows
+
+    def mark_rows_as_needing_background_update(self, field_cache: FieldCache) -> int:
+        if not self.table.needs_background_update_column_added:
+            return 0
+        return self.get_queryset(field_cache).update(
+            **{ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME: True}
+        )
+
+
+class ExplainedUpdate(NamedTuple):
+    table_id: int
+    columns: List[str]
+    estimated_rows: int
+    via_path_ids: List[int]
+
+
+class CascadeExplanation(NamedTuple):
+    statement_count: int
+    estimated_rows_per_table: Dict[int, int]
+    # The ids of the link row fields of the longest path from an updated table back
+    # to the starting table.
+    longest_via_path_ids: List[int]
+    updated_field_ids: List[int]
+    updates: List[ExplainedUpdate]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statement_count": self.statement_count,
+            "estimated_rows": sum(self.estimated_rows_per_table.values()),
+            "estimated_rows_per_table": self.estimated_rows_per_table,
+            "longest_via_path_ids": self.longest_via_path_ids,
+            "updated_field_ids": self.updated_field_ids,
+            "updates": [update._asdict() for update in self.updates],
+        }
+
+
+class CascadeUpdateReport(NamedTuple):
+    statement_count: int
+    updated_rows: int
+    updated_rows_per_table: Dict[int, int]
+
+
+def execute_pending_updates(
+    pending_updates: List[PendingUpdate],
+    field_cache: FieldCache,
+    chunk_size: Optional[int] = None,
+) -> CascadeUpdateReport:
+    updated_rows_per_table = defaultdict(int)
+    for pending_update in pending_updates:
+        updated_rows_per_table[pending_update.table.id] += pending_update.execute(
+            field_cache, chunk_size
+        )
+    return CascadeUpdateReport(
+        statement_count=len(pending_updates),
+        updated_rows=sum(updated_rows_per_table.values()),
+        updated_rows_per_table=dict(updated_rows_per_table),
+    )
+
+
 class UpdatedField(NamedTuple):
     field: Field
     send_field_update_signal: bool = True
@@ -265,6 +504,50 @@ class FieldUpdateCollector:
         self._update_statement_collector = PathBasedUpdateStatementCollector(
             self._starting_table, connection_here=None, connection_is_broken=False
         )
+        # The number of statements and updated rows of the last `apply_updates`.
+        self.update_report: Optional[CascadeUpdateReport] = None
+        # Whether the updates of the other tables have been deferred to a background
+        # task by `apply_updates`.
+        self.deferred = False
+        # If set by `cascade_batch`, applying the updates is postponed until the
+        # batch exits.
+        self.batched = False
+        # The union of the starting field ids of the postponed applies, or None if
+        # one of them didn't provide them.
+        self.batched_starting_field_ids: Optional[Set[int]] = set()
+
+    def add_starting_rows(
+        self,
+        starting_row_ids: StartingRowIdsType,
+        deleted_m2m_rels_per_link_field: Optional[Dict[int, Set[int]]] = None,
+    ):
+        """
+        Adds rows to the rows the updates start from, so that the changes of several
+        handler calls can be applied in one cascade.
+
+        :param starting_row_ids: The ids of the additional starting rows. If None,
+            all the rows of the starting table are updated from now on.
+        :param deleted_m2m_rels_per_link_field: The link row relations removed by
+            the change of the additional rows.
+        """
+
+        if self._starting_row_ids is None or starting_row_ids is None:
+            self._starting_row_ids = None
+        else:
+            self._starting_row_ids = list(
+                dict.fromkeys([*self._starting_row_ids, *starting_row_ids])
+            )
+
+        if deleted_m2m_rels_per_link_field:
+            merged_rels = {
+                link_field_id: set(row_ids)
+                for link_field_id, row_ids in (
+                    self._deleted_m2m_rels_per_link_field or {}
+                ).items()
+            }
+            for link_field_id, row_ids in deleted_m2m_rels_per_link_field.items():
+                merged_rels.setdefault(link_field_id, set()).update(row_ids)
+            self._deleted_m2m_rels_per_link_field = merged_rels
 
     def add_field_with_pending_update_statement(
         self,
@@ -327,30 +610,152 @@ class FieldUpdateCollector:
             field, via_path_to_starting_table
         )
 
-    def apply_updates(self, field_cache: FieldCache) -> int:
+    def apply_updates(
+        self,
+        field_cache: FieldCache,
+        starting_field_ids: Optional[List[int]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
         """
         Triggers all update statements to be executed in the correct order in as few
         update queries as possible and return the number of updated rows.
+
+        :param field_cache: The field cache used to get the models of the tables.
+        :param starting_field_ids: The ids of the fields of the starting table whose
+            cells have changed. If provided, the updates of the other tables are
+            deferred to a background task when they would update too many rows, see
+            `baserow_dynamic_table.fields.dependencies.deferred`.
+        :param chunk_size: If provided, every update is split into statements of
+            this many row ids.
         """
 
-        return self._update_statement_collector.execute_all(
-            field_cache,
+        pending_updates = self._update_statement_collector.plan_pending_updates(
+            self._starting_row_ids,
+            deleted_m2m_rels_per_link_field=self._deleted_m2m_rels_per_link_field,
+        )
+        if starting_field_ids is not None:
+            pending_updates = self._defer_large_fan_out(
+                pending_updates, field_cache, starting_field_ids
+            )
+
+        self.update_report = execute_pending_updates(
+            pending_updates, field_cache, chunk_size
+        )
+        logger.debug(
+            f"The cascade from table {self._starting_table.id} ran "
+            f"{self.update_report.statement_count} update statements which "
+            f"updated {self.update_report.updated_rows} rows."
+        )
+        # Cascaded updates can change the cell values of rows in any of the updated
+        # tables, so none of their cached rows can be trusted anymore.
+        for table_id in self._updated_tables.keys():
+            invalidate_table_in_row_cache(table_id)
+        return self.update_report.updated_rows
+
+    def _defer_large_fan_out(
+        self,
+        pending_updates: List[PendingUpdate],
+        field_cache: FieldCache,
+        starting_field_ids: List[int],
+    ) -> List[PendingUpdate]:
+        """
+        Defers the pending updates after those of the starting table to a background
+        task if they would update more than `BASEROW_DEFERRED_CASCADE_MIN_ROWS` rows.
+        The rows they would update are marked as needing a background update.
+
+        :return: The pending updates that must be applied right away.
+        """
+
+        if not deferred_cascades_enabled() or self._starting_row_ids is None:
+            return pending_updates
+
+        split_at = 0
+        while (
+            split_at < len(pending_updates)
+            and pending_updates[split_at].table.id == self._starting_table.id
+        ):
+            split_at += 1
+        immediate_updates = pending_updates[:split_at]
+        deferrable_updates = pending_updates[split_at:]
+
+        min_rows = settings.BASEROW_DEFERRED_CASCADE_MIN_ROWS
+        if (
+            not deferrable_updates
+            or estimate_fan_out(deferrable_updates, field_cache, min_rows) <= min_rows
+        ):
+            return pending_updates
+
+        for pending_update in deferrable_updates:
+            pending_update.mark_rows_as_needing_background_update(field_cache)
+        defer_cascade(
+            self._starting_table,
+            self._starting_row_ids,
+            starting_field_ids,
+            {pending_update.table.id for pending_update in deferrable_updates},
+            self._deleted_m2m_rels_per_link_field,
+        )
+        self.deferred = True
+        return immediate_updates
+
+    def explain(self, field_cache: FieldCache) -> CascadeExplanation:
+        """
+        Plans the pending updates in the same way as `apply_updates`, but instead of
+        executing them estimates the rows they would change with `EXPLAIN`.
+
+        :param field_cache: The field cache used to get the models of the tables.
+        :return: The planned statements with their estimated rows.
+        """
+
+        pending_updates = self._update_statement_collector.plan_pending_updates(
             self._starting_row_ids,
             deleted_m2m_rels_per_link_field=self._deleted_m2m_rels_per_link_field,
         )
+        updates = [
+            pending_update.explain(field_cache) for pending_update in pending_updates
+        ]
+        estimated_rows_per_table = defaultdict(int)
+        for update in updates:
+            estimated_rows_per_table[update.table_id] += update.estimated_rows
+
+        return CascadeExplanation(
+            statement_count=len(updates),
+            estimated_rows_per_table=dict(estimated_rows_per_table),
+            longest_via_path_ids=max(
+                [update.via_path_ids for update in updates], key=len, default=[]
+            ),
+            updated_field_ids=[
+                field_id
+                for fields in self._updated_fields_per_table.values()
+                for field_id in fields.keys()
+            ],
+            updates=updates,
+        )
 
     def apply_updates_and_get_updated_fields(
-        self, field_cache: FieldCache, skip_search_updates=False
+        self,
+        field_cache: FieldCache,
+        skip_search_updates=False,
+        starting_field_ids: Optional[List[int]] = None,
+        chunk_size: Optional[int] = None,
     ) -> List[Field]:
         """
         Triggers all update statements to be executed in the correct order in as few
-        update queries as possible.
+        update queries as possible. See `apply_updates` for the optional parameters.
+        Within a `cascade_batch` this is postponed until the batch exits.
         :return: The list of all fields which have been updated in the starting table.
         """
 
-        self.apply_updates(field_cache)
+        if self.batched:
+            if starting_field_ids is None or self.batched_starting_field_ids is None:
+                self.batched_starting_field_ids = None
+            else:
+                self.batched_starting_field_ids.update(starting_field_ids)
+            return self._for_table(self._starting_table)
+
+        self.apply_updates(field_cache, starting_field_ids, chunk_size)
 
-        if not skip_search_updates:
+        # The search of the other tables is updated by the deferred cascade.
+        if not skip_search_updates and not self.deferred:
             for table in self._updated_tables.values():
                 if not self._starting_table or table.id != self._starting_table.id:
                     if self._starting_row_ids is not None:
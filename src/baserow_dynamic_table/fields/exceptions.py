@@ -235,6 +235,10 @@ class IncompatibleFieldTypeForUniqueValues(Exception):
     """Raised when the unique values of an incompatible field are requested."""
 
 
+class InvalidFacetSamplePercentage(Exception):
+    """Raised when facets are requested for a percentage of the table out of range."""
+
+
 class FailedToLockFieldDueToConflict(LockConflict):
     """
     Raised when a user tried to update a field which was locked by another
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import Optional, Type
+from typing import Dict, Iterable, Optional, Type
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Model
@@ -24,9 +24,11 @@ class FieldCache:
             self._cached_field_by_name_per_table = (
                 existing_cache._cached_field_by_name_per_table
             )
+            self._cached_field_by_id = existing_cache._cached_field_by_id
             self._model_cache = existing_cache._model_cache
         else:
             self._cached_field_by_name_per_table = defaultdict(dict)
+            self._cached_field_by_id = {}
             self._model_cache = {}
 
         if existing_model is not None:
@@ -49,12 +51,14 @@ class FieldCache:
         return self._model_cache[table_id]
 
     def uncache_field(self, field):
+        self._cached_field_by_id.pop(field.id, None)
         return self._cached_field_by_name_per_table[field.table_id].pop(
             field.name, None
         )
 
     def reset_cache(self):
         self._cached_field_by_name_per_table = defaultdict(dict)
+        self._cached_field_by_id = {}
         self._model_cache = {}
 
     def cache_field(self, field):
@@ -67,6 +71,7 @@ class FieldCache:
                 return None
 
             cached_fields[field.name] = specific_field
+            self._cached_field_by_id[specific_field.id] = specific_field
             return specific_field
         else:
             return None
@@ -87,3 +92,32 @@ class FieldCache:
                 return self.cache_field(table.field_set.get(name=field_name))
             except ObjectDoesNotExist:
                 return None
+
+    def lookup_specific_by_ids(self, field_ids: Iterable[int]) -> Dict[int, Model]:
+        """
+        Returns the specific fields matching the provided ids. The fields which are
+        not cached yet are fetched with one query per field type. Trashed or deleted
+        fields are not included in the returned dict.
+
+        :param field_ids: The ids of the fields to look up.
+        :return: A dict containing the specific field per field id.
+        """
+
+        from baserow_dynamic_table.core.db import specific_iterator
+        from baserow_dynamic_table.fields.models import Field
+
+        found = {}
+        missing = []
+        for field_id in set(field_ids):
+            try:
+                found[field_id] = self._cached_field_by_id[field_id]
+            except KeyError:
+                missing.append(field_id)
+
+        if missing:
+            for field in specific_iterator(Field.objects.filter(id__in=missing)):
+                specific_field = self.cache_field(field)
+                if specific_field is not None:
+                    found[field.id] = specific_field
+
+        return found
@@ -127,6 +127,8 @@ class TextFieldMatchingRegexFieldType(FieldType, ABC):
           altering a column to being an email type.
     """
 
+    can_be_trigram_indexed = True
+
     @property
     @abstractmethod
     def regex(self):
@@ -230,6 +232,7 @@ class TextFieldType(CollationSortMixin, FieldType):
     allowed_fields = ["text_default"]
     serializer_field_names = ["text_default"]
     _can_group_by = True
+    can_be_trigram_indexed = True
 
     def get_serializer_field(self, instance, **kwargs):
         required = kwargs.get("required", False)
@@ -266,6 +269,7 @@ class LongTextFieldType(CollationSortMixin, FieldType):
     type = "long_text"
     model_class = LongTextField
     _can_group_by = True
+    can_be_trigram_indexed = True
 
     def get_serializer_field(self, instance, **kwargs):
         required = kwargs.get("required", False)
@@ -1071,6 +1075,8 @@ class LinkRowFieldType(FieldType):
 
     type = "link_row"
     model_class = LinkRowField
+    # The linked rows are serialized in the order of the related table.
+    depends_on_row_order = True
     allowed_fields = [
         "link_row_table_id",
         "link_row_related_field",
@@ -18,6 +18,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import connection
 from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
 from django.db.utils import DatabaseError, DataError, ProgrammingError
 from loguru import logger
 from psycopg2 import sql
@@ -34,7 +35,9 @@ from baserow_dynamic_table.db.schema import (
     safe_django_schema_editor,
 )
 from baserow_dynamic_table.db.sql_queries import (
+    sql_create_named_try_cast,
     sql_create_try_cast,
+    sql_drop_named_try_cast,
     sql_drop_try_cast,
 )
 from baserow_dynamic_table.fields.constants import (
@@ -49,6 +52,7 @@ from baserow_dynamic_table.table.models import Table
 from baserow_dynamic_table.trash.exceptions import RelatedTableTrashedException
 from baserow_dynamic_table.trash.handler import TrashHandler
 from baserow_dynamic_table.trash.models import TrashEntry
+from .dependencies.graph import invalidate_field_dependency_graph
 from .dependencies.handler import FieldDependencyHandler
 from .dependencies.update_collector import FieldUpdateCollector
 from .exceptions import (
@@ -60,6 +64,7 @@ from .exceptions import (
     IncompatibleFieldTypeForUniqueValues,
     IncompatiblePrimaryFieldTypeError,
     InvalidBaserowFieldName,
+    InvalidFacetSamplePercentage,
     MaxFieldLimitExceeded,
     MaxFieldNameLengthExceeded,
     PrimaryFieldAlreadyExists,
@@ -298,7 +303,7 @@ class FieldHandler:
             order=last_order,
             primary=primary,
             pk=primary_key,
-            tsvector_column_created=table.tsvectors_are_supported,
+            tsvector_column_created=table.per_field_tsvectors_are_supported,
             **field_values,
         )
 
@@ -454,6 +459,9 @@ class FieldHandler:
             field.table, updated_fields=[field]
         )
 
+        if baserow_dynamic_table_field_type_changed:
+            SearchHandler.before_field_type_changed(old_field)
+
         # Before a field is updated we are going to call the before_schema_change
         # method of the old field because some cleanup of related instances might
         # need to happen.
@@ -548,6 +556,9 @@ class FieldHandler:
             kwargs,
         )
 
+        if baserow_dynamic_table_field_type_changed:
+            SearchHandler.after_field_type_changed(field)
+
         if after_schema_change_callback:
             after_schema_change_callback(field)
 
@@ -956,6 +967,8 @@ class FieldHandler:
         # We are changing the related fields table so we need to invalidate
         # its old model cache as this will not happen automatically.
         invalidate_table_in_model_cache(original_table_id)
+        # The table of the field is stored in the dependency graph.
+        invalidate_field_dependency_graph()
         SearchHandler.after_field_moved_between_tables(field_to_move, original_table_id)
 
     def get_unique_row_values(
@@ -1076,6 +1089,155 @@ class FieldHandler:
 
         return [x[0] for x in res]
 
+    def get_facets(
+        self,
+        table: Table,
+        field_ids: List[int],
+        queryset: Optional[QuerySet] = None,
+        limit: int = 10,
+        sample_percentage: Optional[float] = None,
+    ) -> Dict[int, List[Tuple[str, int]]]:
+        """
+        Returns the most frequent values of multiple fields at once. Contrary to
+        calling `get_unique_row_values` for every field, the rows are only scanned
+        once. Every row is unnested into one `(field_id, value)` pair per field, which
+        are grouped and ranked per field in a single query.
+
+        :param table: The table where the fields belong to.
+        :param field_ids: The ids of the fields to compute the facets for.
+        :param queryset: An optional queryset of the table model, for example
+            filtered with `filter_by_fields_object` or searched with
+            `search_all_fields`. Only the rows matching it are counted.
+        :param limit: The maximum number of values returned per field.
+        :param sample_percentage: If provided, only this percentage of the table
+            is read using `TABLESAMPLE SYSTEM`, which is a lot faster for huge
+            tables. The counts are scaled accordingly and are approximate.
+        :raises FieldDoesNotExist: When one of the fields is not in the table.
+        :raises IncompatibleFieldTypeForUniqueValues: When the values of one of the
+            fields can't be counted.
+        :raises InvalidFacetSamplePercentage: When the sample percentage is not
+            greater than 0 and at most 100.
+        :return: A dict containing, per field id, a list of `(value, count)` tuples
+            sorted by frequency.
+        """
+
+        if sample_percentage is not None and not 0 < sample_percentage <= 100:
+            raise InvalidFacetSamplePercentage(
+                f"The sample percentage must be greater than 0 and at most 100, "
+                f"got {sample_percentage}."
+            )
+
+        if queryset is None:
+            queryset = table.get_model(field_ids=field_ids).objects.all()
+        model = queryset.model
+
+        columns = []
+        for field_id in field_ids:
+            try:
+                field_object = model._field_objects[field_id]
+            except KeyError:
+                raise FieldDoesNotExist(f"The field {field_id} is not in the table.")
+
+            field_type = field_object["type"]
+            field = field_object["field"]
+            if (
+                not field_type.can_get_unique_values
+                or model._meta.get_field(field_object["name"]).many_to_many
+            ):
+                raise IncompatibleFieldTypeForUniqueValues(
+                    f"The field type `{field_object['type']}`"
+                )
+            columns.append((field, field_type, field_object["name"]))
+
+        if not columns:
+            return {}
+
+        # Every field which can't be cast to text as is gets its own temporary
+        # try cast function, containing the same conversion as used when converting
+        # the field to a text field.
+        values = []
+        with connection.cursor() as cursor:
+            for field, field_type, _ in columns:
+                value = sql.SQL("{base}.{column}::text").format(
+                    base=sql.Identifier("base"), column=sql.Identifier(field.db_column)
+                )
+                prepare_old_value = field_type.get_alter_column_prepare_old_value(
+                    connection, field, TextField()
+                )
+                variables = ()
+                if isinstance(prepare_old_value, tuple):
+                    prepare_old_value, variables = prepare_old_value
+                if prepare_old_value:
+                    function_name = f"facet_try_cast_{field.id}"
+                    cursor.execute(sql_drop_named_try_cast % {"name": function_name})
+                    cursor.execute(
+                        sql_create_named_try_cast
+                        % {
+                            "name": function_name,
+                            "alter_column_prepare_old_value": prepare_old_value,
+                            "alter_column_prepare_new_value": "",
+                            "type": "text",
+                        },
+                        variables,
+                    )
+                    value = sql.SQL("pg_temp.{function}({value})").format(
+                        function=sql.Identifier(function_name), value=value
+                    )
+                values.append(
+                    sql.SQL("({field_id}, {value})").format(
+                        field_id=sql.Literal(field.id), value=value
+                    )
+                )
+
+        if sample_percentage is not None:
+            queryset = queryset.filter(
+                id__in=RawSQL(
+                    f'SELECT id FROM "{model._meta.db_table}" '
+                    f"TABLESAMPLE SYSTEM (%s)",
+                    [sample_percentage],
+                )
+            )
+
+        base_queryset = queryset.order_by().values(*[name for _, _, name in columns])
+        base_sql, base_params = base_queryset.query.sql_with_params()
+
+        query = sql.SQL(
+            """
+            SELECT field_id, value, value_count FROM (
+                SELECT
+                    facet.field_id,
+                    facet.value,
+                    count(*) AS value_count,
+                    row_number() OVER (
+                        PARTITION BY facet.field_id
+                        ORDER BY count(*) DESC, facet.value
+                    ) AS rank
+                FROM ({base_sql}) AS {base}
+                CROSS JOIN LATERAL (VALUES {values}) AS facet(field_id, value)
+                WHERE facet.value IS NOT NULL AND facet.value != ''
+                GROUP BY facet.field_id, facet.value
+            ) AS facets
+            WHERE rank <= {limit}
+            ORDER BY field_id, rank
+            """
+        ).format(
+            base_sql=sql.SQL(base_sql),
+            base=sql.Identifier("base"),
+            values=sql.SQL(", ").join(values),
+            limit=sql.Literal(limit),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, base_params)
+            res = cursor.fetchall()
+
+        facets = {field.id: [] for field, _, _ in columns}
+        for field_id, value, count in res:
+            if sample_percentage is not None:
+                count = round(count * 100 / sample_percentage)
+            facets[field_id].append((value, count))
+        return facets
+
     def _validate_name_and_optionally_rename_if_collision(
         self,
         field: Field,
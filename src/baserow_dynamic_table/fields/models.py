@@ -135,6 +135,10 @@ class Field(
     def tsv_index_name(self):
         return f"tbl_tsv_{self.id}_idx"
 
+    @property
+    def trigram_index_name(self):
+        return f"tbl_trgm_{self.id}_idx"
+
     @property
     def model_attribute_name(self):
         """
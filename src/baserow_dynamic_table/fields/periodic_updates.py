@@ -0,0 +1,130 @@
+"""
+This file keeps track of the shards of the periodic field updates. When
+`PERIODIC_FIELD_UPDATE_FAN_OUT` is enabled, `run_periodic_fields_updates` splits the
+periodic updates into one shard per field type and workspace, and dispatches each
+shard as a separate `run_periodic_field_type_update_shard` task with its own time
+limit, so that a slow workspace doesn't delay or time out the others.
+
+A shard is not dispatched again while it's still queued or running, the number of
+those is the backlog returned by `get_periodic_field_update_backlog`. The outcome of
+the last run of every shard is available with `get_periodic_field_update_shard_run`,
+so that the slow or failing workspaces can be identified.
+"""
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from loguru import logger
+
+SHARD_RUN_TIMEOUT = 7 * 24 * 60 * 60
+BACKLOG_CACHE_KEY = "periodic_field_update_backlog"
+
+
+def _shard_key(field_type: str, workspace_id: int) -> str:
+    return f"{field_type}_{workspace_id}"
+
+
+def _queued_shard_cache_key(field_type: str, workspace_id: int) -> str:
+    return f"periodic_field_update_queued_{_shard_key(field_type, workspace_id)}"
+
+
+def _dispatched_shard_cache_key(field_type: str, workspace_id: int) -> str:
+    return f"periodic_field_update_dispatched_{_shard_key(field_type, workspace_id)}"
+
+
+def _shard_run_cache_key(field_type: str, workspace_id: int) -> str:
+    return f"periodic_field_update_run_{_shard_key(field_type, workspace_id)}"
+
+
+def _change_backlog(delta: int):
+    cache.add(BACKLOG_CACHE_KEY, 0, timeout=None)
+    try:
+        cache.incr(BACKLOG_CACHE_KEY, delta)
+    except ValueError:
+        pass
+
+
+def get_periodic_field_update_backlog() -> int:
+    """
+    Returns the number of shards which have been dispatched, but haven't finished
+    yet.
+    """
+
+    return max(cache.get(BACKLOG_CACHE_KEY, 0), 0)
+
+
+def mark_shard_as_queued(field_type: str, workspace_id: int) -> bool:
+    """
+    Marks the shard as queued, unless it already is because its previous run hasn't
+    finished yet.
+
+    :return: True if the shard has been marked and must be dispatched.
+    """
+
+    # The mark expires in case the task is lost, a bit later than the task would
+    # have been stopped by its time limit.
+    timeout = settings.PERIODIC_FIELD_UPDATE_TIMEOUT_MINUTES * 60 * 2
+    if not cache.add(_queued_shard_cache_key(field_type, workspace_id), True, timeout):
+        return False
+    # The dispatched mark doesn't expire. If it's still there, the previous task
+    # has been lost and is still counted in the backlog, so it's replaced by this
+    # one instead of being counted again.
+    if cache.add(_dispatched_shard_cache_key(field_type, workspace_id), True, None):
+        _change_backlog(1)
+    return True
+
+
+def record_shard_run(
+    field_type: str,
+    workspace_id: int,
+    started: float,
+    updated_fields: int,
+    failed_fields: int,
+    timed_out: bool = False,
+):
+    """
+    Stores the outcome of a run of the shard and marks it as finished.
+
+    :param field_type: The type of the updated fields.
+    :param workspace_id: The id of the workspace of the updated fields.
+    :param started: The `time.perf_counter()` at which the run started.
+    :param updated_fields: The number of fields which have been updated.
+    :param failed_fields: The number of fields whose update has failed.
+    :param timed_out: Whether the run has been stopped by its time limit.
+    """
+
+    duration = time.perf_counter() - started
+    cache.set(
+        _shard_run_cache_key(field_type, workspace_id),
+        {
+            "finished_at": time.time(),
+            "duration": duration,
+            "updated_fields": updated_fields,
+            "failed_fields": failed_fields,
+            "timed_out": timed_out,
+        },
+        timeout=SHARD_RUN_TIMEOUT,
+    )
+    cache.delete(_queued_shard_cache_key(field_type, workspace_id))
+    if cache.delete(_dispatched_shard_cache_key(field_type, workspace_id)):
+        _change_backlog(-1)
+
+    log = logger.warning if timed_out or failed_fields else logger.info
+    log(
+        f"Periodically updated {updated_fields} {field_type} field(s) of workspace "
+        f"{workspace_id} in {duration:.2f}s, {failed_fields} failed"
+        f"{', timed out' if timed_out else ''}."
+    )
+
+
+def get_periodic_field_update_shard_run(
+    field_type: str, workspace_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the outcome of the last run of the shard, with the `finished_at`
+    timestamp, the `duration` in seconds, the number of `updated_fields` and
+    `failed_fields` and whether it `timed_out`. None if it hasn't run recently.
+    """
+
+    return cache.get(_shard_run_cache_key(field_type, workspace_id))
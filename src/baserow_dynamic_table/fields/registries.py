@@ -132,6 +132,13 @@ class FieldType(
     and so isn't done as we can get the data back from simply restoring the attributes.
     """
 
+    depends_on_row_order = False
+    """
+    Indicates whether the cell values of this field type can change when the rows of
+    a table it depends on are reordered. Only dependants of such field types are
+    notified with `row_of_dependency_moved` when a row is moved.
+    """
+
     needs_refresh_after_import_serialized = False
     """Set this to True your after_import_serialized function can cause the field
     data to change and hence it needs to be refreshed after this function has run
@@ -145,6 +152,13 @@ class FieldType(
     values without having to query the database.
     """
 
+    can_be_trigram_indexed = False
+    """
+    Set this to True if the underlying database column contains text which can be
+    indexed using a `pg_trgm` GIN index, so that it can be searched using the
+    trigram search mode.
+    """
+
     def prepare_value_for_db(self, instance: Field, value: Any) -> Any:
         """
         When a row is created or updated all the values are going to be prepared for the
@@ -882,7 +896,10 @@ class FieldType(
             if self.can_have_select_options
             else []
         )
-        should_create_tsvector_column = not import_export_config.reduce_disk_space_usage
+        should_create_tsvector_column = (
+            not import_export_config.reduce_disk_space_usage
+            and not table.uses_combined_tsvector
+        )
         field = self.model_class(
             table=table,
             tsvector_column_created=should_create_tsvector_column,
@@ -1329,7 +1346,8 @@ class FieldType(
     ):
         """
         Called when a row is moved in a dependency field (a field that the
-        field instance parameter depends on).
+        field instance parameter depends on), but only if `depends_on_row_order` is
+        set for this field type.
         If as a result row value changes are required by this field type an
         update expression should be provided to the update_collector.
         Ensure super is called if this fields rows also change so dependants of this
@@ -1717,6 +1735,16 @@ class FieldTypeRegistry(
     does_not_exist_exception_class = FieldTypeDoesNotExist
     already_registered_exception_class = FieldTypeAlreadyRegistered
 
+    def has_row_order_dependant_types(self) -> bool:
+        """
+        Returns whether any of the registered field types depends on the order of
+        the rows, see `FieldType.depends_on_row_order`.
+        """
+
+        return any(
+            field_type.depends_on_row_order for field_type in self.registry.values()
+        )
+
 
 class FieldConverter(Instance):
     """
@@ -1,5 +1,6 @@
+import time
 import traceback
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from baserow_dynamic_table_dynamic_table_dynamic_table.config.celery import app
 from baserow_dynamic_table_dynamic_table_dynamic_table.core.models import Workspace
@@ -7,7 +8,12 @@ from baserow_dynamic_table_dynamic_table_dynamic_table.core.telemetry.utils impo
     add_baserow_dynamic_table_dynamic_table_dynamic_table_trace_attrs,
     baserow_dynamic_table_dynamic_table_dynamic_table_trace,
 )
+from baserow_dynamic_table.fields.periodic_updates import (
+    mark_shard_as_queued,
+    record_shard_run,
+)
 from baserow_dynamic_table.fields.registries import field_type_registry
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from django.db import transaction
 from django.db.models import QuerySet
@@ -43,13 +49,27 @@ def filter_distinct_workspace_ids_per_fields(
     soft_time_limit=settings.PERIODIC_FIELD_UPDATE_TIMEOUT_MINUTES * 60,
 )
 def run_periodic_fields_updates(
-        self, workspace_id: Optional[int] = None, update_now: bool = True
+        self,
+        workspace_id: Optional[int] = None,
+        update_now: bool = True,
+        fan_out: Optional[bool] = None,
 ):
     """
     Refreshes all the fields that need to be updated periodically for all
     workspaces.
+
+    :param workspace_id: Only refreshes the fields of this workspace if provided.
+    :param update_now: Whether the `now` of the workspaces is set to the current time
+        first.
+    :param fan_out: Dispatches a separate `run_periodic_field_type_update_shard` task
+        per field type and workspace instead of refreshing everything in this task.
+        Defaults to `PERIODIC_FIELD_UPDATE_FAN_OUT`.
     """
 
+    if fan_out is None:
+        fan_out = settings.PERIODIC_FIELD_UPDATE_FAN_OUT
+
+    dispatched, skipped = 0, 0
     for field_type_instance in field_type_registry.get_all():
         field_qs = field_type_instance.get_fields_needing_periodic_update()
         if field_qs is None:
@@ -57,19 +77,75 @@ def run_periodic_fields_updates(
 
         workspace_qs = filter_distinct_workspace_ids_per_fields(field_qs, workspace_id)
 
+        # The workspaces which have been updated the longest time ago come first.
         for workspace in workspace_qs.all():
-            _run_periodic_field_type_update_per_workspace(
-                field_type_instance, workspace, update_now
+            if not fan_out:
+                _run_periodic_field_type_update_per_workspace(
+                    field_type_instance, workspace, update_now
+                )
+            elif mark_shard_as_queued(field_type_instance.type, workspace.id):
+                run_periodic_field_type_update_shard.delay(
+                    field_type_instance.type, workspace.id, update_now
+                )
+                dispatched += 1
+            else:
+                skipped += 1
+
+    if fan_out:
+        logger.info(
+            f"Dispatched {dispatched} periodic field update shard(s), skipped "
+            f"{skipped} which are still queued or running."
+        )
+
+
+@app.task(
+    bind=True,
+    queue=settings.PERIODIC_FIELD_UPDATE_QUEUE_NAME,
+    soft_time_limit=settings.PERIODIC_FIELD_UPDATE_TIMEOUT_MINUTES * 60,
+)
+def run_periodic_field_type_update_shard(
+        self, field_type: str, workspace_id: int, update_now: bool = True
+):
+    """
+    Refreshes the fields of the provided type of one workspace that need to be
+    updated periodically, see `baserow_dynamic_table.fields.periodic_updates`.
+    """
+
+    started = time.perf_counter()
+    updated_fields, failed_fields, timed_out = 0, 0, False
+    try:
+        workspace = Workspace.objects.filter(id=workspace_id).first()
+        if workspace is not None:
+            updated_fields, failed_fields = (
+                _run_periodic_field_type_update_per_workspace(
+                    field_type_registry.get(field_type), workspace, update_now
+                )
             )
+    except SoftTimeLimitExceeded:
+        timed_out = True
+    finally:
+        record_shard_run(
+            field_type,
+            workspace_id,
+            started,
+            updated_fields,
+            failed_fields,
+            timed_out=timed_out,
+        )
 
 
 @baserow_dynamic_table_dynamic_table_dynamic_table_trace(tracer)
 def _run_periodic_field_type_update_per_workspace(
         field_type_instance, workspace: Workspace, update_now=True
-):
+) -> Tuple[int, int]:
+    """
+    :return: The number of fields which have been updated and the number of fields
+        whose update has failed.
+    """
+
     qs = field_type_instance.get_fields_needing_periodic_update()
     if qs is None:
-        return
+        return 0, 0
 
     if update_now:
         workspace.refresh_now()
@@ -77,6 +153,7 @@ def _run_periodic_field_type_update_per_workspace(
         update_now=update_now, workspace_id=workspace.id
     )
 
+    updated_fields, failed_fields = 0, 0
     for field in qs.filter(
             table__database__workspace_id=workspace.id,
             table__trashed=False,
@@ -85,7 +162,11 @@ def _run_periodic_field_type_update_per_workspace(
         # noinspection PyBroadException
         try:
             _run_periodic_field_update(field, field_type_instance)
+            updated_fields += 1
+        except SoftTimeLimitExceeded:
+            raise
         except Exception:
+            failed_fields += 1
             tb = traceback.format_exc()
             logger.error(
                 "Failed to periodically update {field_id} because of: \n{tb}",
@@ -93,6 +174,7 @@ def _run_periodic_field_type_update_per_workspace(
                 tb=tb,
             )
             continue
+    return updated_fields, failed_fields
 
 
 @baserow_dynamic_table_dynamic_table_dynamic_table_trace(tracer)
@@ -102,6 +184,54 @@ def _run_periodic_field_update(field, field_type_instance):
         field_type_instance.run_periodic_update(field)
 
 
+@app.task(queue="export")
+def run_deferred_cascade(
+        table_id: int,
+        row_ids: List[int],
+        field_ids: List[int],
+        affected_table_ids: List[int],
+        deleted_m2m_rels_per_link_field: Optional[Dict[str, List[int]]] = None,
+):
+    """
+    Applies the updates of the dependants of a row change which have been deferred
+    because they would update too many rows, see
+    `baserow_dynamic_table.fields.dependencies.deferred`.
+
+    :param table_id: The id of the table in which the rows have changed.
+    :param row_ids: The ids of the rows that have changed.
+    :param field_ids: The ids of the fields whose cells have changed.
+    :param affected_table_ids: The ids of the tables which are updated.
+    :param deleted_m2m_rels_per_link_field: The ids of the rows whose link row
+        relations have been removed per link row field id.
+    """
+
+    from baserow_dynamic_table.fields.dependencies.deferred import (
+        apply_deferred_cascade,
+        finish_deferred_cascade,
+    )
+    from baserow_dynamic_table.table.exceptions import TableDoesNotExist
+    from baserow_dynamic_table.table.handler import TableHandler
+
+    try:
+        table = TableHandler().get_table(table_id)
+        apply_deferred_cascade(
+            table,
+            row_ids,
+            field_ids,
+            {
+                # The keys have become strings when serializing the task arguments.
+                int(link_field_id): set(ids)
+                for link_field_id, ids in (
+                    deleted_m2m_rels_per_link_field or {}
+                ).items()
+            },
+        )
+    except TableDoesNotExist:
+        logger.debug(f"The table {table_id} of a deferred cascade has been deleted.")
+    finally:
+        finish_deferred_cascade(affected_table_ids)
+
+
 @app.on_after_finalize.connect
 def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(
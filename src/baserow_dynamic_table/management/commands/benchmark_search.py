@@ -0,0 +1,134 @@
+import json
+import sys
+
+from baserow_dynamic_table.search.benchmark import (
+    DEFAULT_BENCHMARK_MODES,
+    DEFAULT_BENCHMARK_QUERIES,
+    benchmark_table_search,
+    run_search_benchmark,
+)
+from baserow_dynamic_table.search.handler import SearchModes
+from baserow_dynamic_table.table.models import Table
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds tables with random data and benchmarks searching them in every "
+        "search mode. The latency percentiles, rows scanned and search index sizes "
+        "are written as JSON, so that runs can be compared across versions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--row-counts",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="The number of rows of the seeded tables.",
+        )
+        parser.add_argument(
+            "--field-counts",
+            type=int,
+            nargs="+",
+            default=[5, 20],
+            help="The number of fields of the seeded tables. A table is seeded for "
+            "every combination of row count and field count.",
+        )
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            choices=[mode.value for mode in SearchModes],
+            default=[mode.value for mode in DEFAULT_BENCHMARK_MODES],
+            help="The search modes to benchmark.",
+        )
+        parser.add_argument(
+            "--queries",
+            nargs="+",
+            default=DEFAULT_BENCHMARK_QUERIES,
+            help="The search queries, defaults to a fixed corpus.",
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=5,
+            help="How many times every query is run per search mode.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="The seed of the random data.",
+        )
+        parser.add_argument(
+            "--table-id",
+            type=int,
+            help="Benchmark this existing table instead of seeding tables.",
+        )
+        parser.add_argument(
+            "--keep-tables",
+            action="store_true",
+            help="Don't delete the seeded tables after the benchmark.",
+        )
+        parser.add_argument(
+            "--no-explain",
+            action="store_true",
+            help="Don't run EXPLAIN (ANALYZE, BUFFERS) for every query.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Write the JSON results to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        modes = [SearchModes(mode) for mode in options["modes"]]
+        explain = not options["no_explain"]
+
+        table_id = options["table_id"]
+        if table_id is not None:
+            try:
+                table = Table.objects.get(pk=table_id)
+            except Table.DoesNotExist:
+                self.stdout.write(
+                    self.style.ERROR(f"The table with id {table_id} was not found.")
+                )
+                sys.exit(1)
+
+            results = {
+                "repeats": options["repeats"],
+                "queries": options["queries"],
+                "modes": [mode.value for mode in modes],
+                "results": [
+                    benchmark_table_search(
+                        table,
+                        options["queries"],
+                        modes,
+                        repeats=options["repeats"],
+                        explain=explain,
+                    )
+                ],
+            }
+        else:
+            results = run_search_benchmark(
+                options["row_counts"],
+                options["field_counts"],
+                queries=options["queries"],
+                modes=modes,
+                repeats=options["repeats"],
+                seed=options["seed"],
+                keep_tables=options["keep_tables"],
+                explain=explain,
+            )
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"The results have been written to {options['output']}."
+                )
+            )
+        else:
+            self.stdout.write(output)
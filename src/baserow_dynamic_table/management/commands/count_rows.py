@@ -1,5 +1,20 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from baserow_dynamic_table.table.handler import TableHandler
 from django.core.management import BaseCommand
+from django.db import connections
+
+
+def count_rows_of_shard(min_table_id, max_table_id, estimate_threshold):
+    # Every process must use its own database connections, the ones inherited from
+    # the parent process can't be shared.
+    connections.close_all()
+    return TableHandler.count_rows(
+        estimate_threshold=estimate_threshold,
+        min_table_id=min_table_id,
+        max_table_id=max_table_id,
+    )
 
 
 class Command(BaseCommand):
@@ -7,8 +22,69 @@ class Command(BaseCommand):
         "Runs the periodic count rows task without having to wait for the time trigger"
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--estimate-threshold",
+            type=int,
+            default=None,
+            help="Tables expected to contain more rows than this are estimated "
+            "instead of counted exactly. Use 0 to count every table exactly.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="How many concurrent processes should be used to count the rows.",
+        )
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=1000,
+            help="How many tables each process counts at once when the concurrency "
+            "is higher than 1.",
+        )
+
     def handle(self, *args, **options):
-        tables_counted = TableHandler.count_rows()
+        estimate_threshold = options["estimate_threshold"]
+        concurrency = options["concurrency"]
+
+        tick = time.time()
+        if concurrency <= 1:
+            tables_counted = TableHandler.count_rows(
+                estimate_threshold=estimate_threshold
+            )
+        else:
+            tables_counted = self.count_rows_concurrently(
+                concurrency, options["shard_size"], estimate_threshold
+            )
+
         self.stdout.write(
-            self.style.SUCCESS(f"{tables_counted} table(s) have been counted.")
+            self.style.SUCCESS(
+                f"{tables_counted} table(s) have been counted in "
+                f"{time.time() - tick:.1f} seconds."
+            )
         )
+
+    def count_rows_concurrently(self, concurrency, shard_size, estimate_threshold):
+        shards = TableHandler.get_row_count_shards(shard_size)
+        connections.close_all()
+
+        tick = time.time()
+        tables_counted = 0
+        with ProcessPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(
+                    count_rows_of_shard, min_table_id, max_table_id, estimate_threshold
+                )
+                for min_table_id, max_table_id in shards
+            ]
+            for shards_done, future in enumerate(as_completed(futures), start=1):
+                tables_counted += future.result()
+                elapsed = time.time() - tick
+                eta = elapsed / shards_done * (len(shards) - shards_done)
+                self.stdout.write(
+                    f"{shards_done}/{len(shards)} shard(s) done, {tables_counted} "
+                    f"table(s) counted, elapsed {elapsed:.1f}s, ETA {eta:.1f}s."
+                )
+
+        return tables_counted
@@ -1,3 +1,5 @@
+from typing import Optional, Set
+
 import graphviz
 from baserow_dynamic_table.fields.dependencies.models import (
     FieldDependency,
@@ -72,8 +74,19 @@ class Command(BaseCommand):
 
 
 def draw_field_graph(
-        database: Database, output_dir: str, gv_files_only: bool, draw_m2m_boxes: bool
+        database: Database,
+        output_dir: str,
+        gv_files_only: bool,
+        draw_m2m_boxes: bool,
+        highlighted_field_ids: Optional[Set[int]] = None,
 ):
+    """
+    Renders the field dependency graph of the database. The fields whose ids are in
+    `highlighted_field_ids`, for example the fields updated by a cascade, are drawn
+    in a different color.
+    """
+
+    highlighted_field_ids = highlighted_field_ids or set()
     kwargs = {"format": "png"} if not gv_files_only else {"format": "gv"}
     dot = graphviz.Digraph(
         f"database-{database.id}-graph",
@@ -95,7 +108,13 @@ def draw_field_graph(
                     c.node(
                         field_node(field),
                         f"{field.name} (field_{field.id})\n{field_type_name}",
-                        color="darkseagreen3" if field.primary else "white",
+                        color=(
+                            "lightcoral"
+                            if field.id in highlighted_field_ids
+                            else "darkseagreen3"
+                            if field.primary
+                            else "white"
+                        ),
                     )
 
     if draw_m2m_boxes:
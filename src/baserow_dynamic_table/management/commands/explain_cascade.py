@@ -0,0 +1,99 @@
+import json
+import sys
+
+from baserow_dynamic_table.management.commands.draw_field_graph import (
+    draw_field_graph,
+)
+from baserow_dynamic_table.rows.handler import RowHandler
+from baserow_dynamic_table.table.models import Table
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Dry runs the cascade of updating rows of a table without changing anything. "
+        "Writes the planned update statements with the rows they would change, as "
+        "estimated by EXPLAIN, and the longest link row path as JSON. Optionally "
+        "draws the field dependency graph with the fields updated by the cascade "
+        "highlighted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "table_id",
+            type=int,
+            help="The id of the table whose rows would be updated.",
+        )
+        parser.add_argument(
+            "--row-ids",
+            type=int,
+            nargs="+",
+            help="The ids of the rows that would be updated. The entire fields are "
+            "updated if not provided.",
+        )
+        parser.add_argument(
+            "--field-ids",
+            type=int,
+            nargs="+",
+            help="The ids of the fields that would be updated, defaults to all the "
+            "fields of the table.",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Write the JSON explanation to this file instead of stdout.",
+        )
+        parser.add_argument(
+            "--draw",
+            action="store_true",
+            help="Also draw the field dependency graph of the database, see "
+            "draw_field_graph.",
+        )
+        parser.add_argument(
+            "--output-dir",
+            default="field-diagrams",
+            help="The folder to write the field diagram to",
+        )
+        parser.add_argument(
+            "--gv-files-only",
+            action="store_true",
+            help="When provided only gv files will be output and no png files",
+        )
+
+    def handle(self, *args, **options):
+        table_id = options["table_id"]
+        try:
+            table = Table.objects.select_related("database").get(pk=table_id)
+        except Table.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f"The table with id {table_id} was not found.")
+            )
+            sys.exit(1)
+
+        explanation = RowHandler().explain_update(
+            table, row_ids=options["row_ids"], field_ids=options["field_ids"]
+        )
+
+        output = json.dumps(explanation.as_dict(), indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"The explanation has been written to {options['output']}."
+                )
+            )
+        else:
+            self.stdout.write(output)
+
+        if options["draw"]:
+            output_image_file = draw_field_graph(
+                table.database,
+                output_dir=options["output_dir"],
+                gv_files_only=options["gv_files_only"],
+                draw_m2m_boxes=True,
+                highlighted_field_ids=set(explanation.updated_field_ids),
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Graph written to {output_image_file}.")
+            )
@@ -23,5 +23,5 @@ class Command(BaseCommand):
     @transaction.atomic
     def handle(self, *args, **options):
         run_periodic_fields_updates(
-            options["workspace_id"], not options["dont_update_now"]
+            options["workspace_id"], not options["dont_update_now"], fan_out=False
         )
@@ -0,0 +1,47 @@
+import sys
+
+from baserow_dynamic_table.search.handler import SearchHandler
+from baserow_dynamic_table.table.handler import TableHandler
+from baserow_dynamic_table.table.models import Table
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Given a table ID, this command will create a `pg_trgm` GIN index for every "
+        "text-like field of the table, so it can be searched with the trigram "
+        "search mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "table_id",
+            type=int,
+            help="The ID of the table to create the trigram indexes for.",
+        )
+        parser.add_argument(
+            "--disable",
+            action="store_true",
+            help="Drop the trigram indexes of the table instead.",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        table_id = options["table_id"]
+        try:
+            table = TableHandler().get_table_for_update(table_id)
+        except Table.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f"The table with id {table_id} was not found.")
+            )
+            sys.exit(1)
+
+        enabled = not options["disable"]
+        SearchHandler.set_trigram_indexes_enabled(table, enabled)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "The trigram indexes have been "
+                f"{'created' if enabled else 'dropped'}."
+            )
+        )
@@ -0,0 +1,61 @@
+import sys
+
+from baserow_dynamic_table.search.exceptions import (
+    PostgresFullTextSearchDisabledException,
+)
+from baserow_dynamic_table.search.handler import SearchHandler
+from baserow_dynamic_table.table.constants import (
+    TSVECTOR_LAYOUT_COMBINED,
+    TSVECTOR_LAYOUT_PER_FIELD,
+)
+from baserow_dynamic_table.table.handler import TableHandler
+from baserow_dynamic_table.table.models import Table
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Given a table ID, this command will switch the table between a `tsvector` "
+        "column per field and a single combined `tsvector` column, and schedule a "
+        "full update of the new columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "table_id",
+            type=int,
+            help="The ID of the table to switch.",
+        )
+        parser.add_argument(
+            "layout",
+            type=str,
+            choices=[TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED],
+            help="The tsvector layout the table should use.",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        table_id = options["table_id"]
+        try:
+            table = TableHandler().get_table_for_update(table_id)
+        except Table.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f"The table with id {table_id} was not found.")
+            )
+            sys.exit(1)
+        try:
+            SearchHandler.set_tsvector_layout(table, options["layout"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"The table now uses the {options['layout']} tsvector layout, "
+                    "its tsvectors will be updated in the background."
+                )
+            )
+        except PostgresFullTextSearchDisabledException:
+            self.stdout.write(
+                self.style.ERROR(
+                    "Your installation has Postgres full-text search disabled. To "
+                    "use full-text, ensure that USE_PG_FULLTEXT_SEARCH=true."
+                )
+            )
@@ -20,6 +20,13 @@ class Command(BaseCommand):
             type=int,
             help="The ID of the table to update.",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="How many row id ranges of the table should be updated at the same "
+            "time, each using its own database connection.",
+        )
 
     def handle(self, *args, **options):
         table_id = options["table_id"]
@@ -31,9 +38,14 @@ class Command(BaseCommand):
             )
             sys.exit(1)
         try:
-            SearchHandler.update_tsvector_columns(
-                table, update_tsvectors_for_changed_rows_only=False
-            )
+            if options["concurrency"] > 1:
+                SearchHandler.update_tsvector_columns_in_parallel(
+                    table, concurrency=options["concurrency"]
+                )
+            else:
+                SearchHandler.update_tsvector_columns(
+                    table, update_tsvectors_for_changed_rows_only=False
+                )
             self.stdout.write(
                 self.style.SUCCESS("The tsvector columns were been updated.")
             )
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("baserow_dynamic_table", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="table",
+            name="row_count_is_estimate",
+            field=models.BooleanField(
+                default=False,
+                help_text="Indicates whether the row count is an estimate based on "
+                "the Postgres statistics instead of an exact count.",
+            ),
+        ),
+    ]
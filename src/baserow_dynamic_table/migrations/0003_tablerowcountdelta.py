@@ -0,0 +1,42 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("baserow_dynamic_table", "0002_table_row_count_is_estimate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableRowCountDelta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.IntegerField()),
+                (
+                    "table",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="row_count_deltas",
+                        to="baserow_dynamic_table.table",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["table", "id"],
+                        name="baserow_dyn_table_i_ce5d14_idx",
+                    )
+                ],
+            },
+        ),
+    ]
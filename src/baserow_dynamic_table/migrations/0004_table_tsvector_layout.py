@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+# Returns the lexemes of the provided fields from a combined row `tsvector`, keeping
+# their positions so that phrase searches still work. Every field's lexemes are
+# preceded by a `_f{field_id}` marker lexeme, so a lexeme belongs to the field of
+# the last marker positioned before it.
+sql_create_tsv_row_field_slice = r"""
+CREATE OR REPLACE FUNCTION tsv_row_field_slice(vector tsvector, field_ids integer[])
+RETURNS tsvector AS $$
+    WITH lexemes AS (
+        SELECT entry.lexeme, lexeme_position
+        FROM unnest(vector) AS entry(lexeme, positions, weights),
+            unnest(entry.positions) AS lexeme_position
+    ),
+    markers AS (
+        SELECT
+            substring(lexeme FROM 3)::integer AS field_id,
+            lexeme_position AS start_position,
+            lead(lexeme_position) OVER (ORDER BY lexeme_position) AS end_position
+        FROM lexemes
+        WHERE lexeme ~ '^_f[0-9]+$'
+    )
+    SELECT coalesce(
+        string_agg(
+            format(
+                '''%s'':%s',
+                replace(replace(lexemes.lexeme, '\', '\\'), '''', ''''''),
+                lexemes.lexeme_position
+            ),
+            ' '
+        ),
+        ''
+    )::tsvector
+    FROM lexemes
+    JOIN markers ON lexemes.lexeme_position > markers.start_position
+        AND (
+            markers.end_position IS NULL
+            OR lexemes.lexeme_position < markers.end_position
+        )
+    WHERE markers.field_id = ANY(field_ids)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+"""
+
+sql_drop_tsv_row_field_slice = """
+DROP FUNCTION IF EXISTS tsv_row_field_slice(tsvector, integer[]);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("baserow_dynamic_table", "0003_tablerowcountdelta"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="table",
+            name="tsvector_layout",
+            field=models.CharField(
+                choices=[("per_field", "Per field"), ("combined", "Combined")],
+                default="per_field",
+                help_text="Indicates whether the full-text search data is stored in "
+                "a `tsvector` column per field, or in a single combined `tsvector` "
+                "column.",
+                max_length=16,
+            ),
+        ),
+        migrations.RunSQL(
+            sql_create_tsv_row_field_slice, sql_drop_tsv_row_field_slice
+        ),
+    ]
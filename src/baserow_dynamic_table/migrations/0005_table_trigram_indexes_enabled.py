@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("baserow_dynamic_table", "0004_table_tsvector_layout"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="table",
+            name="trigram_indexes_enabled",
+            field=models.BooleanField(
+                default=False,
+                help_text="Indicates whether the text-like columns of the table have "
+                "a `pg_trgm` GIN index used by the trigram search mode.",
+            ),
+        ),
+    ]
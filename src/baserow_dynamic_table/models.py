@@ -12,11 +12,12 @@ from .fields.models import (
     TextField,
     URLField,
 )
-from .table.models import Table, GeneratedTableModel
+from .table.models import Table, GeneratedTableModel, TableRowCountDelta
 
 __all__ = [
     "Table",
     "GeneratedTableModel",
+    "TableRowCountDelta",
     "Field",
     "TextField",
     "NumberField",
@@ -0,0 +1,307 @@
+"""
+This file is responsible for the optional read-through row cache used by
+`RowHandler.get_row`, `RowHandler.has_row` and `RowHandler.get_row_names`. The
+entries are stored in the configured Django cache and additionally in a small
+in-process LRU so that hot rows don't even need a round trip to the cache backend.
+
+Every entry is stored in the cache key:
+    `row_{kind}_{table_id}_{row_id}_{variant}_{table_version}_{epoch}`
+
+Where `epoch` is a per table counter stored in the Django cache. Any write to the
+rows of a table, directly via the `RowHandler` or indirectly via a cascade of the
+`FieldUpdateCollector`, bumps the epoch of the table which invalidates all its
+entries at once. Because the epoch is always read from the shared cache, entries
+in the in-process LRU of other workers are invalidated as well.
+
+When we look up a row we:
+1. Get the current epoch of the table from the Django cache.
+2. Check the in-process LRU, then the Django cache, for the entry.
+3. If neither has it, query the database and store the result in both.
+"""
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from baserow_dynamic_table.core.utils import generate_hash
+
+if TYPE_CHECKING:
+    from baserow_dynamic_table.table.models import GeneratedTableModel, Table
+
+ROW_CACHE_VALUES = "values"
+ROW_CACHE_NAME = "name"
+ROW_CACHE_EXISTS = "exists"
+
+
+class RowCacheStats:
+    """
+    Keeps track of the hits and misses of the row cache in this process. Can be
+    used to expose metrics or to verify the effectiveness of the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def increment(self, attr: str, by: int = 1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + by)
+
+    @property
+    def hits(self) -> int:
+        return self.local_hits + self.shared_hits
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class LocalLRUCache:
+    """
+    A very small thread safe least recently used cache which lives in the memory
+    of the current process.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            except KeyError:
+                return default
+
+    def set(self, key: str, value: Any):
+        max_size = settings.BASEROW_ROW_CACHE_LOCAL_MAX_SIZE
+        if max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+row_cache_stats = RowCacheStats()
+local_row_cache = LocalLRUCache()
+
+
+def row_cache_enabled() -> bool:
+    return settings.BASEROW_ROW_CACHE_ENABLED
+
+
+def row_cache_epoch_key(table_id: int) -> str:
+    return f"row_cache_epoch_{table_id}"
+
+
+def row_cache_entry_key(
+    kind: str, table: "Table", row_id: int, variant: Any, epoch: int
+) -> str:
+    return f"row_{kind}_{table.id}_{row_id}_{variant}_{table.version}_{epoch}"
+
+
+def get_row_cache_epoch(table_id: int) -> int:
+    return cache.get(row_cache_epoch_key(table_id), 0)
+
+
+def _bump_row_cache_epoch(table_id: int):
+    key = row_cache_epoch_key(table_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The epoch doesn't exist yet, so nothing of this table could have been
+        # cached with it except for the initial epoch.
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate_table_in_row_cache(table_id: int):
+    """
+    Invalidates all the cached rows of the provided table by bumping its epoch. This
+    must be called after any change to the cell values of the table. The epoch is
+    bumped again when the transaction commits, because a concurrent read can't see
+    the changes before that and could have cached the old row with the new epoch
+    in the meantime.
+
+    :param table_id: The id of the table whose rows have changed.
+    """
+
+    from baserow_dynamic_table.search.cache import invalidate_table_in_search_cache
+
+    # The cached search results contain the ids of the rows matching their cell
+    # values, so they are invalidated by the same changes.
+    invalidate_table_in_search_cache(table_id)
+
+    if not row_cache_enabled():
+        return
+
+    _bump_row_cache_epoch(table_id)
+    transaction.on_commit(lambda: _bump_row_cache_epoch(table_id))
+    row_cache_stats.increment("invalidations")
+
+
+def _get_model_variant(model: Type["GeneratedTableModel"]) -> str:
+    """
+    Different models of the same table can contain a different set of fields. The
+    variant makes sure that a row fetched with a model containing only some of the
+    fields is never returned to a caller using a model with other fields.
+    """
+
+    try:
+        return model.__dict__["_row_cache_variant"]
+    except KeyError:
+        attnames = sorted(f.attname for f in model._meta.concrete_fields)
+        variant = generate_hash(",".join(attnames))[:16]
+        model._row_cache_variant = variant
+        return variant
+
+
+def _get_many(keys: List[str]) -> Dict[str, Any]:
+    found = {}
+    missing = []
+    for key in keys:
+        value = local_row_cache.get(key)
+        if value is not None:
+            found[key] = value
+        else:
+            missing.append(key)
+
+    row_cache_stats.increment("local_hits", len(found))
+
+    if missing:
+        from_shared_cache = cache.get_many(missing)
+        for key, value in from_shared_cache.items():
+            local_row_cache.set(key, value)
+        found.update(from_shared_cache)
+        row_cache_stats.increment("shared_hits", len(from_shared_cache))
+        row_cache_stats.increment("misses", len(missing) - len(from_shared_cache))
+
+    return found
+
+
+def _set_many(entries: Dict[str, Any]):
+    for key, value in entries.items():
+        local_row_cache.set(key, value)
+    cache.set_many(entries, timeout=settings.BASEROW_ROW_CACHE_TIMEOUT)
+
+
+def get_cached_row(
+    table: "Table", model: Type["GeneratedTableModel"], row_id: int
+) -> Optional["GeneratedTableModel"]:
+    """
+    Returns the row instance constructed from the cached values or None if the row
+    has not been cached.
+    """
+
+    epoch = get_row_cache_epoch(table.id)
+    key = row_cache_entry_key(
+        ROW_CACHE_VALUES, table, row_id, _get_model_variant(model), epoch
+    )
+    values = _get_many([key]).get(key)
+    if values is None:
+        return None
+
+    return model.from_db(model.objects.db, list(values.keys()), list(values.values()))
+
+
+def set_cached_row(table: "Table", row: "GeneratedTableModel"):
+    """
+    Stores the concrete column values of the provided row instance in the cache.
+    Deferred columns, like the tsvector ones, are never stored.
+    """
+
+    model = type(row)
+    deferred = row.get_deferred_fields()
+    values = {
+        f.attname: getattr(row, f.attname)
+        for f in model._meta.concrete_fields
+        if f.attname not in deferred
+    }
+    epoch = get_row_cache_epoch(table.id)
+    key = row_cache_entry_key(
+        ROW_CACHE_VALUES, table, row.id, _get_model_variant(model), epoch
+    )
+    _set_many({key: values})
+
+
+def row_exists_in_cache(table: "Table", row_id: int) -> bool:
+    """
+    Only existing rows are cached, a miss doesn't mean the row doesn't exist.
+    """
+
+    epoch = get_row_cache_epoch(table.id)
+    key = row_cache_entry_key(ROW_CACHE_EXISTS, table, row_id, "", epoch)
+    return _get_many([key]).get(key, False)
+
+
+def set_row_exists_in_cache(table: "Table", row_id: int):
+    epoch = get_row_cache_epoch(table.id)
+    key = row_cache_entry_key(ROW_CACHE_EXISTS, table, row_id, "", epoch)
+    _set_many({key: True})
+
+
+def get_cached_row_names(
+    table: "Table", variant: Any, row_ids: Iterable[int]
+) -> Dict[int, str]:
+    """
+    Returns the cached names of the provided row ids. Row ids which are not in the
+    cache are not in the returned dict.
+
+    :param table: The table where the rows belong to.
+    :param variant: Identifies the field used to compute the names, usually the id
+        of the primary field.
+    :param row_ids: The ids of the rows to get the names for.
+    """
+
+    epoch = get_row_cache_epoch(table.id)
+    keys_by_row_id = {
+        row_id: row_cache_entry_key(ROW_CACHE_NAME, table, row_id, variant, epoch)
+        for row_id in row_ids
+    }
+    found = _get_many(list(keys_by_row_id.values()))
+    return {
+        row_id: found[key] for row_id, key in keys_by_row_id.items() if key in found
+    }
+
+
+def set_cached_row_names(table: "Table", variant: Any, names_by_row_id: Dict[int, str]):
+    if not names_by_row_id:
+        return
+
+    epoch = get_row_cache_epoch(table.id)
+    _set_many(
+        {
+            row_cache_entry_key(ROW_CACHE_NAME, table, row_id, variant, epoch): name
+            for row_id, name in names_by_row_id.items()
+        }
+    )
@@ -35,10 +35,16 @@ from baserow_dynamic_table.core.utils import (
     grouper,
     CannotCalculateIntermediateOrder,
 )
+from baserow_dynamic_table.fields.dependencies.batch import (
+    cascade_batch,
+    get_field_cache,
+    get_field_update_collector,
+)
 from baserow_dynamic_table.fields.dependencies.handler import (
     FieldDependencyHandler,
 )
 from baserow_dynamic_table.fields.dependencies.update_collector import (
+    CascadeExplanation,
     FieldUpdateCollector,
 )
 from baserow_dynamic_table.fields.field_cache import FieldCache
@@ -52,8 +58,20 @@ from baserow_dynamic_table.fields.registries import (
     field_type_registry,
 )
 from baserow_dynamic_table.models import GeneratedTableModel, Table
+from baserow_dynamic_table.search.handler import SearchHandler
+from baserow_dynamic_table.table.row_counts import record_row_count_change
 from baserow_dynamic_table.trash.handler import TrashHandler
 from baserow_dynamic_table.trash.models import TrashedRows
+from .cache import (
+    get_cached_row,
+    get_cached_row_names,
+    invalidate_table_in_row_cache,
+    row_cache_enabled,
+    row_exists_in_cache,
+    set_cached_row,
+    set_cached_row_names,
+    set_row_exists_in_cache,
+)
 from .constants import ROW_IMPORT_CREATION
 from .exceptions import RowDoesNotExist, RowIdsNotUnique
 
@@ -399,7 +417,7 @@ class RowHandler:
         :param model: If the correct model has already been generated it can be
             provided so that it does not have to be generated for a second time.
         :param base_queryset: A queryset that can be used to already pre-filter
-            the results.
+            the results. The row cache is never used when this is provided.
         :raises RowDoesNotExist: When the row with the provided id does not exist.
         :return: The requested row instance.
         """
@@ -407,6 +425,12 @@ class RowHandler:
         if model is None:
             model = table.get_model()
 
+        use_row_cache = base_queryset is None and row_cache_enabled()
+        if use_row_cache:
+            row = get_cached_row(table, model, row_id)
+            if row is not None:
+                return row
+
         if base_queryset is None:
             base_queryset = model.objects
 
@@ -415,6 +439,9 @@ class RowHandler:
         except model.DoesNotExist as e:
             raise RowDoesNotExist(row_id) from e
 
+        if use_row_cache:
+            set_cached_row(table, row)
+
         return row
 
     def get_adjacent_row(self, row, original_queryset, previous=False, view=None):
@@ -569,6 +596,17 @@ class RowHandler:
             values are the row names.
         """
 
+        use_row_cache = row_cache_enabled()
+        names = {}
+        if use_row_cache:
+            # The name only depends on the primary field. If no model is provided,
+            # the primary field is always used, so the variant can be fixed.
+            cache_variant = model._primary_field_id if model else "primary"
+            names = get_cached_row_names(table, cache_variant, row_ids)
+            row_ids = [row_id for row_id in row_ids if row_id not in names]
+            if not row_ids:
+                return names
+
         if not model:
             primary_field = table.field_set.get(primary=True)
             model = table.get_model(
@@ -576,8 +614,12 @@ class RowHandler:
             )
 
         queryset = model.objects.filter(pk__in=row_ids)
+        fetched_names = {row.id: str(row) for row in queryset}
 
-        return {row.id: str(row) for row in queryset}
+        if use_row_cache:
+            set_cached_row_names(table, cache_variant, fetched_names)
+
+        return {**names, **fetched_names}
 
     # noinspection PyMethodMayBeStatic
     def has_row(self, table, row_id, raise_error=False, model=None):
@@ -608,15 +650,51 @@ class RowHandler:
         :rtype: bool
         """
 
+        use_row_cache = row_cache_enabled()
+        if use_row_cache and row_exists_in_cache(table, row_id):
+            return True
+
         if model is None:
             model = table.get_model(field_ids=[])
 
         row_exists = model.objects.filter(id=row_id).exists()
+        if row_exists and use_row_cache:
+            # Only existing rows are cached, because a row id that doesn't exist
+            # yet can be created at any moment without invalidating the cache.
+            set_row_exists_in_cache(table, row_id)
+
         if not row_exists and raise_error:
             raise RowDoesNotExist(row_id)
         else:
             return row_exists
 
+    def _has_dependency_cascade(
+        self,
+        table: Table,
+        model: Type[GeneratedTableModel],
+        rows_created: bool = False,
+    ) -> bool:
+        """
+        Checks if changing the rows of the table can affect other fields, in which
+        case the updates of the dependant fields must be collected and applied. This
+        is not needed if no field depends on the fields of the table, which the
+        dependency graph answers without a query, and, when rows are created, none of
+        the field types of the table implements `after_rows_created`.
+
+        :param table: The table whose rows have changed.
+        :param model: The model of the table.
+        :param rows_created: Whether the rows have been created.
+        """
+
+        if FieldDependencyHandler.table_has_dependants(table.id):
+            return True
+
+        return rows_created and any(
+            type(field_object["type"]).after_rows_created
+            is not FieldType.after_rows_created
+            for field_object in model._field_objects.values()
+        )
+
     def create_row(
         self,
         user: AbstractUser,
@@ -703,39 +781,47 @@ class RowHandler:
             )
             getattr(instance, name).set(value)
 
-        fields = []
-        update_collector = FieldUpdateCollector(table, starting_row_ids=[instance.id])
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        field_ids = []
-        for field_object in model._field_objects.values():
-            field_type: FieldType = field_object["type"]
-            field = field_object["field"]
-            fields.append(field)
-            field_ids.append(field.id)
-
-            field_type.after_rows_created(
-                field, [instance], update_collector, field_cache
+        if self._has_dependency_cascade(table, model, rows_created=True):
+            fields = []
+            update_collector = get_field_update_collector(
+                table, starting_row_ids=[instance.id]
             )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            field_ids = []
+            for field_object in model._field_objects.values():
+                field_type: FieldType = field_object["type"]
+                field = field_object["field"]
+                fields.append(field)
+                field_ids.append(field.id)
+
+                field_type.after_rows_created(
+                    field, [instance], update_collector, field_cache
+                )
 
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_created(
+            for (
                 dependant_field,
-                instance,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_created(
+                    dependant_field,
+                    instance,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=field_ids
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
+        record_row_count_change(table.id, 1)
+        SearchHandler.after_rows_created_or_updated(table, model, [instance.id])
 
         if model.fields_requiring_refresh_after_insert():
             instance.refresh_from_db(
@@ -858,31 +944,36 @@ class RowHandler:
 
         row.save()
 
-        update_collector = FieldUpdateCollector(
-            table,
-            starting_row_ids=[row.id],
-            deleted_m2m_rels_per_link_field=m2m_change_tracker.get_deleted_link_row_rels_for_update_collector(),
-        )
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            updated_field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_updated(
+        if self._has_dependency_cascade(table, model):
+            update_collector = get_field_update_collector(
+                table,
+                starting_row_ids=[row.id],
+                deleted_m2m_rels_per_link_field=m2m_change_tracker.get_deleted_link_row_rels_for_update_collector(),
+            )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            for (
                 dependant_field,
-                row,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                updated_field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_updated(
+                    dependant_field,
+                    row,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=updated_field_ids
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
+        SearchHandler.after_rows_created_or_updated(table, model, [row.id])
         # We need to refresh here as ExpressionFields might have had their values
         # updated. Django does not support UPDATE .... RETURNING and so we need to
         # query for the rows updated values instead.
@@ -1006,39 +1097,48 @@ class RowHandler:
             through = getattr(model, field_name).through
             through.objects.bulk_create(values)
 
-        update_collector = FieldUpdateCollector(
-            table, starting_row_ids=[row.id for row in inserted_rows]
-        )
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        field_ids = []
-        for field_object in model._field_objects.values():
-            field_type = field_object["type"]
-            field = field_object["field"]
-            field_ids.append(field.id)
-
-            field_type.after_rows_created(
-                field, inserted_rows, update_collector, field_cache
+        if self._has_dependency_cascade(table, model, rows_created=True):
+            update_collector = get_field_update_collector(
+                table, starting_row_ids=[row.id for row in inserted_rows]
             )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            field_ids = []
+            for field_object in model._field_objects.values():
+                field_type = field_object["type"]
+                field = field_object["field"]
+                field_ids.append(field.id)
+
+                field_type.after_rows_created(
+                    field, inserted_rows, update_collector, field_cache
+                )
 
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_created(
+            for (
                 dependant_field,
-                inserted_rows,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_created(
+                    dependant_field,
+                    inserted_rows,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=field_ids
+            )
+        invalidate_table_in_row_cache(table.id)
+        record_row_count_change(table.id, len(inserted_rows))
+        if not skip_search_update:
+            SearchHandler.after_rows_created_or_updated(
+                table, model, [row.id for row in inserted_rows]
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
 
         rows_to_return = inserted_rows
 
@@ -1228,9 +1328,11 @@ class RowHandler:
             else None
         )
 
-        created_rows, creation_report = self.create_rows_by_batch(
-            user, table, valid_rows, progress=creation_sub_progress, model=model
-        )
+        # The cascades of all the batches are applied at once at the end.
+        with cascade_batch():
+            created_rows, creation_report = self.create_rows_by_batch(
+                user, table, valid_rows, progress=creation_sub_progress, model=model
+            )
 
         # Add errors to global report
         for index, error in creation_report.items():
@@ -1498,31 +1600,36 @@ class RowHandler:
             model.objects.bulk_update(rows_to_update, bulk_update_fields)
             rows_updated_counter.add(len(rows_to_update))
 
-        update_collector = FieldUpdateCollector(
-            table,
-            starting_row_ids=row_ids,
-            deleted_m2m_rels_per_link_field=m2m_change_tracker.get_deleted_link_row_rels_for_update_collector(),
-        )
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            updated_field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_updated(
+        if self._has_dependency_cascade(table, model):
+            update_collector = get_field_update_collector(
+                table,
+                starting_row_ids=row_ids,
+                deleted_m2m_rels_per_link_field=m2m_change_tracker.get_deleted_link_row_rels_for_update_collector(),
+            )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            for (
                 dependant_field,
-                rows_to_update,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                updated_field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_updated(
+                    dependant_field,
+                    rows_to_update,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=updated_field_ids
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
+        SearchHandler.after_rows_created_or_updated(table, model, row_ids)
 
         updated_rows_to_return = list(
             model.objects.all().enhance_by_fields().filter(id__in=row_ids)
@@ -1538,6 +1645,65 @@ class RowHandler:
             fields_metadata_by_row_id,
         )
 
+    def explain_update(
+        self,
+        table: Table,
+        row_ids: Optional[List[int]] = None,
+        field_ids: Optional[List[int]] = None,
+        model: Optional[Type[GeneratedTableModel]] = None,
+    ) -> CascadeExplanation:
+        """
+        Dry runs the cascade of updating the provided fields of the provided rows.
+        The dependants collect their update statements in the same way as for a real
+        update, but instead of executing them the rows they would change are
+        estimated with `EXPLAIN`. Everything is rolled back afterwards, so nothing is
+        changed.
+
+        :param table: The table containing the rows.
+        :param row_ids: The ids of the rows that would be updated. The entire fields
+            are updated if not provided.
+        :param field_ids: The ids of the fields that would be updated, defaults to
+            all the fields of the table.
+        :param model: If the correct model has already been generated, it can be
+            provided so that it does not have to be generated for a second time.
+        :return: The planned update statements with their estimated rows.
+        """
+
+        if model is None:
+            model = table.get_model()
+        if field_ids is None:
+            field_ids = list(model._field_objects.keys())
+
+        with transaction.atomic():
+            rows = None
+            if row_ids is not None:
+                rows = list(model.objects_and_trash.filter(id__in=row_ids))
+
+            update_collector = FieldUpdateCollector(table, starting_row_ids=row_ids)
+            field_cache = FieldCache()
+            field_cache.cache_model(model)
+            for (
+                dependant_field,
+                dependant_field_type,
+                path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_updated(
+                    dependant_field,
+                    rows,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            explanation = update_collector.explain(field_cache)
+            transaction.set_rollback(True)
+
+        return explanation
+
     def get_rows_for_update(
         self, model: GeneratedTableModel, row_ids: List[int]
     ) -> RowsForUpdate:
@@ -1607,34 +1773,38 @@ class RowHandler:
         row.order = self.get_unique_orders_before_row(before_row, model)[0]
         row.save()
 
-        update_collector = FieldUpdateCollector(table, starting_row_ids=[row.id])
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        updated_field_ids = []
-        updated_fields = []
-        for field_id, field_object in model._field_objects.items():
-            updated_field_ids.append(field_id)
-            field = field_object["field"]
-            updated_fields.append(field)
-
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            updated_field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
+        # Only the fields whose values depend on the order of the rows of this table
+        # can change when a row is moved, so the other dependants are not notified.
+        if field_type_registry.has_row_order_dependant_types() and (
+            self._has_dependency_cascade(table, model)
         ):
-            dependant_field_type.row_of_dependency_moved(
+            update_collector = get_field_update_collector(
+                table, starting_row_ids=[row.id]
+            )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            for (
                 dependant_field,
-                row,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
-            )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                list(model._field_objects.keys()),
+                associated_relations_changed=False,
+                field_cache=field_cache,
+            ):
+                if not dependant_field_type.depends_on_row_order:
+                    continue
+
+                dependant_field_type.row_of_dependency_moved(
+                    dependant_field,
+                    row,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
 
         return row
 
@@ -1685,35 +1855,41 @@ class RowHandler:
 
         TrashHandler.trash(user, row)
 
-        update_collector = FieldUpdateCollector(table, starting_row_ids=[row.id])
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        updated_field_ids = []
-        updated_fields = []
+        if self._has_dependency_cascade(table, model):
+            update_collector = get_field_update_collector(
+                table, starting_row_ids=[row.id]
+            )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            updated_field_ids = []
+            updated_fields = []
 
-        for field_id, field_object in model._field_objects.items():
-            updated_field_ids.append(field_id)
-            field = field_object["field"]
-            updated_fields.append(field)
-
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            updated_field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_deleted(
+            for field_id, field_object in model._field_objects.items():
+                updated_field_ids.append(field_id)
+                field = field_object["field"]
+                updated_fields.append(field)
+
+            for (
                 dependant_field,
-                row,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                updated_field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_deleted(
+                    dependant_field,
+                    row,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=updated_field_ids
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
 
     def delete_rows(
         self,
@@ -1755,34 +1931,40 @@ class RowHandler:
 
         TrashHandler.trash(user, trashed_rows)
 
-        updated_field_ids = []
-        updated_fields = []
-        for field_id, field_object in model._field_objects.items():
-            updated_field_ids.append(field_id)
-            field = field_object["field"]
-            updated_fields.append(field)
-
-        update_collector = FieldUpdateCollector(table, starting_row_ids=row_ids)
-        field_cache = FieldCache()
-        field_cache.cache_model(model)
-        for (
-            dependant_field,
-            dependant_field_type,
-            path_to_starting_table,
-        ) in FieldDependencyHandler.get_dependant_fields_with_type(
-            table.id,
-            updated_field_ids,
-            associated_relations_changed=True,
-            field_cache=field_cache,
-        ):
-            dependant_field_type.row_of_dependency_deleted(
+        if self._has_dependency_cascade(table, model):
+            updated_field_ids = []
+            updated_fields = []
+            for field_id, field_object in model._field_objects.items():
+                updated_field_ids.append(field_id)
+                field = field_object["field"]
+                updated_fields.append(field)
+
+            update_collector = get_field_update_collector(
+                table, starting_row_ids=row_ids
+            )
+            field_cache = get_field_cache()
+            field_cache.cache_model(model)
+            for (
                 dependant_field,
-                rows,
-                update_collector,
-                field_cache,
+                dependant_field_type,
                 path_to_starting_table,
+            ) in FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id,
+                updated_field_ids,
+                associated_relations_changed=True,
+                field_cache=field_cache,
+            ):
+                dependant_field_type.row_of_dependency_deleted(
+                    dependant_field,
+                    rows,
+                    update_collector,
+                    field_cache,
+                    path_to_starting_table,
+                )
+            update_collector.apply_updates_and_get_updated_fields(
+                field_cache, starting_field_ids=updated_field_ids
             )
-        update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
 
         return trashed_rows
 
@@ -1804,3 +1986,4 @@ class RowHandler:
             model = table.get_model()
 
         recalculate_full_orders(model)
+        invalidate_table_in_row_cache(table.id)
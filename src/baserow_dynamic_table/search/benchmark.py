@@ -0,0 +1,280 @@
+"""
+This file contains the reproducible search benchmark used by the `benchmark_search`
+management command. It seeds tables of several sizes with random data, runs a fixed
+corpus of queries through `search_all_fields` in every requested `SearchModes` and
+reports the latency percentiles, the rows scanned according to
+`EXPLAIN (ANALYZE, BUFFERS)` and the size of the search indexes.
+
+The results are plain dicts that can be serialized as JSON, so that the runs of
+different versions can be compared.
+"""
+import json
+import math
+import random
+import time
+from itertools import cycle
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import connection
+from faker import Faker
+
+from baserow_dynamic_table.search.handler import SearchHandler, SearchModes
+from baserow_dynamic_table.table.handler import TableHandler
+from baserow_dynamic_table.table.models import Table
+
+# The queries cover a single common word, a prefix, multiple words, a number, an
+# url fragment and a query that doesn't match anything.
+DEFAULT_BENCHMARK_QUERIES = [
+    "the",
+    "john",
+    "sm",
+    "quick brown",
+    "42",
+    "www",
+    "zzqxvbenchmark",
+]
+
+DEFAULT_BENCHMARK_MODES = [
+    SearchModes.MODE_COMPAT,
+    SearchModes.MODE_FT_WITH_COUNT,
+    SearchModes.MODE_FT_RANKED,
+]
+
+# The fields of the seeded tables, after the primary text field, cycle through
+# these types.
+BENCHMARK_FIELD_TYPES = [
+    ("text", {}),
+    ("long_text", {}),
+    ("number", {"number_decimal_places": 0}),
+    ("url", {}),
+]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Returns the nearest-rank percentile of the values.
+    """
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def seed_benchmark_table(row_count: int, field_count: int, seed: int = 0) -> Table:
+    """
+    Creates a table with `field_count` fields filled with `row_count` rows of random
+    data, using the same values as `fill_table_rows` for the same seed, and updates
+    its search index.
+
+    :param row_count: The number of rows to create.
+    :param field_count: The number of fields to create, including the primary one.
+    :param seed: The seed of the random data.
+    :return: The created table.
+    """
+
+    from baserow_dynamic_table.management.commands.fill_table_rows import (
+        fill_table_rows,
+    )
+
+    fields = [("Name", "text", {})]
+    field_types = cycle(BENCHMARK_FIELD_TYPES)
+    for index in range(1, field_count):
+        field_type, config = next(field_types)
+        fields.append((f"Field {index}", field_type, dict(config)))
+
+    table = TableHandler().create_table_and_fields(
+        None, f"Search benchmark {row_count} rows {field_count} fields", fields
+    )
+
+    Faker.seed(seed)
+    random.seed(seed)
+    if row_count > 0:
+        fill_table_rows(row_count, table)
+
+    if table.tsvectors_are_supported:
+        SearchHandler.update_tsvector_columns(
+            table, update_tsvectors_for_changed_rows_only=False
+        )
+    return table
+
+
+def _count_rows_scanned(plan: Dict[str, Any]) -> int:
+    rows_scanned = 0
+    if plan["Node Type"].endswith("Scan"):
+        rows_scanned += plan.get("Actual Rows", 0) * plan.get("Actual Loops", 1)
+        rows_scanned += plan.get("Rows Removed by Filter", 0) * plan.get(
+            "Actual Loops", 1
+        )
+    for child in plan.get("Plans", []):
+        rows_scanned += _count_rows_scanned(child)
+    return rows_scanned
+
+
+def explain_queryset(queryset) -> Dict[str, Any]:
+    """
+    Runs `EXPLAIN (ANALYZE, BUFFERS)` for the queryset.
+
+    :return: A dict containing the rows read by all the scans of the plan, the
+        shared buffers hit and read and the execution time in milliseconds.
+    """
+
+    explained = json.loads(queryset.explain(format="json", analyze=True, buffers=True))
+    plan = explained[0]["Plan"]
+    return {
+        "rows_scanned": _count_rows_scanned(plan),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+        "execution_time_ms": explained[0].get("Execution Time"),
+    }
+
+
+def get_search_index_sizes(table: Table) -> Dict[str, int]:
+    """
+    Returns the size in bytes of the `tsvector` and trigram indexes of the table per
+    index name.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_relation_size(c.oid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+            AND (c.relname LIKE %s OR c.relname LIKE %s)
+            ORDER BY c.relname
+            """,
+            [table.get_database_table_name(), "tbl_tsv%", "tbl_trgm%"],
+        )
+        return dict(cursor.fetchall())
+
+
+def _run_search(model, query: str, mode: SearchModes, page_size: int):
+    queryset = model.objects.all().search_all_fields(query, search_mode=mode)
+    if mode != SearchModes.MODE_FT_RANKED:
+        # The ranked mode is meant to be used without a count.
+        queryset.count()
+    list(queryset.values_list("id", flat=True)[:page_size])
+    return queryset
+
+
+def benchmark_table_search(
+    table: Table,
+    queries: Iterable[str] = DEFAULT_BENCHMARK_QUERIES,
+    modes: Iterable[SearchModes] = DEFAULT_BENCHMARK_MODES,
+    repeats: int = 5,
+    page_size: int = 100,
+    explain: bool = True,
+) -> Dict[str, Any]:
+    """
+    Runs every query `repeats` times in every search mode and measures the time
+    needed to count the results, except in the ranked mode, and to fetch the first
+    page of them.
+
+    :param table: The table to search.
+    :param queries: The search queries.
+    :param modes: The search modes.
+    :param repeats: How many times every query is run per mode.
+    :param page_size: The number of rows fetched per search.
+    :param explain: Whether to include the `EXPLAIN (ANALYZE, BUFFERS)` stats of
+        every query.
+    :return: A dict which can be serialized as JSON.
+    """
+
+    model = table.get_model()
+    queries = list(queries)
+    result = {
+        "table_id": table.id,
+        "row_count": model.objects.count(),
+        "field_count": len(model._field_objects),
+        "tsvector_layout": table.tsvector_layout,
+        "tsvectors_supported": table.tsvectors_are_supported,
+        "search_index_sizes": get_search_index_sizes(table),
+        "modes": {},
+    }
+
+    for mode in modes:
+        mode = SearchModes(mode)
+        all_latencies = []
+        per_query = {}
+        for query in queries:
+            # The first run warms up the caches and isn't measured.
+            queryset = _run_search(model, query, mode, page_size)
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                _run_search(model, query, mode, page_size)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            all_latencies += latencies
+            per_query[query] = {
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+            }
+            if explain:
+                per_query[query].update(
+                    explain_queryset(queryset.values("id")[:page_size])
+                )
+
+        result["modes"][mode.value] = {
+            "p50_ms": percentile(all_latencies, 50),
+            "p95_ms": percentile(all_latencies, 95),
+            "queries": per_query,
+        }
+
+    return result
+
+
+def run_search_benchmark(
+    row_counts: Iterable[int],
+    field_counts: Iterable[int],
+    queries: Optional[Iterable[str]] = None,
+    modes: Optional[Iterable[SearchModes]] = None,
+    repeats: int = 5,
+    seed: int = 0,
+    keep_tables: bool = False,
+    explain: bool = True,
+) -> Dict[str, Any]:
+    """
+    Seeds a table for every combination of row count and field count and
+    benchmarks the search of each of them with `benchmark_table_search`.
+
+    :param row_counts: The numbers of rows of the seeded tables.
+    :param field_counts: The numbers of fields of the seeded tables.
+    :param queries: The search queries, defaults to `DEFAULT_BENCHMARK_QUERIES`.
+    :param modes: The search modes, defaults to `DEFAULT_BENCHMARK_MODES`.
+    :param repeats: How many times every query is run per mode.
+    :param seed: The seed of the random data.
+    :param keep_tables: Whether to keep the seeded tables instead of deleting them.
+    :param explain: Whether to include the `EXPLAIN (ANALYZE, BUFFERS)` stats.
+    :return: A dict which can be serialized as JSON.
+    """
+
+    from baserow_dynamic_table.trash.handler import TrashHandler
+
+    queries = list(queries or DEFAULT_BENCHMARK_QUERIES)
+    modes = list(modes or DEFAULT_BENCHMARK_MODES)
+    results = []
+    for row_count in row_counts:
+        for field_count in field_counts:
+            table = seed_benchmark_table(row_count, field_count, seed=seed)
+            try:
+                results.append(
+                    benchmark_table_search(
+                        table, queries, modes, repeats=repeats, explain=explain
+                    )
+                )
+            finally:
+                if not keep_tables:
+                    TrashHandler.permanently_delete(table)
+
+    return {
+        "seed": seed,
+        "repeats": repeats,
+        "queries": queries,
+        "modes": [SearchModes(mode).value for mode in modes],
+        "results": results,
+    }
@@ -0,0 +1,144 @@
+"""
+This file is responsible for the optional cache of search results used by
+`TableModelQuerySet.search_all_fields`. Instead of the rows, only the ids of the
+rows matching a search are cached, which keeps the memory usage bounded while
+still avoiding the repeated index lookups when users page through the results or
+repeat the same search.
+
+Every entry is stored in the cache key:
+    `search_ids_{table_id}_{table_version}_{epoch}_{hash}`
+
+Where `hash` is the hash of the search mode, the normalized query and the ids of the
+searched fields, and `epoch` is a per table write counter stored in the Django
+cache. Every write to the rows of the table, which also invalidates the row cache,
+and every update of its `tsvector` columns bumps the epoch, which invalidates all
+the cached searches of the table at once.
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from baserow_dynamic_table.core.utils import generate_hash
+
+if TYPE_CHECKING:
+    from baserow_dynamic_table.table.models import Table
+
+
+class SearchCacheStats:
+    """
+    Keeps track of the hits and misses of the search cache in this process. Can be
+    used to expose metrics or to verify the effectiveness of the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.too_large = 0
+        self.invalidations = 0
+
+    def increment(self, attr: str, by: int = 1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + by)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "too_large": self.too_large,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+search_cache_stats = SearchCacheStats()
+
+
+def search_cache_enabled() -> bool:
+    return settings.BASEROW_SEARCH_CACHE_ENABLED
+
+
+def search_cache_epoch_key(table_id: int) -> str:
+    return f"search_cache_epoch_{table_id}"
+
+
+def get_search_cache_epoch(table_id: int) -> int:
+    return cache.get(search_cache_epoch_key(table_id), 0)
+
+
+def normalize_search_query(search: str) -> str:
+    # All search modes are case insensitive and ignore the surrounding spaces. The
+    # spaces in between are kept, because the compat search matches them as is.
+    return search.strip().lower()
+
+
+def get_search_cache_key(
+    table: "Table", search_mode: str, search: str, field_ids: Iterable[int]
+) -> str:
+    """
+    Returns the key of the cached ids of the rows matching the search. The current
+    epoch is part of the key, so it must be computed before searching, otherwise
+    results computed before a concurrent write could be stored with the new epoch.
+
+    :param table: The searched table.
+    :param search_mode: The mode of the search.
+    :param search: The search query.
+    :param field_ids: The ids of the searched fields.
+    """
+
+    epoch = get_search_cache_epoch(table.id)
+    search_hash = generate_hash(
+        f"{search_mode}:{','.join(str(i) for i in sorted(field_ids))}:"
+        f"{normalize_search_query(search)}"
+    )
+    return f"search_ids_{table.id}_{table.version}_{epoch}_{search_hash}"
+
+
+def get_cached_search_ids(key: str) -> Optional[List[int]]:
+    ids = cache.get(key)
+    search_cache_stats.increment("misses" if ids is None else "hits")
+    return ids
+
+
+def set_cached_search_ids(key: str, ids: List[int]):
+    cache.set(key, ids, timeout=settings.BASEROW_SEARCH_CACHE_TIMEOUT)
+
+
+def _bump_search_cache_epoch(table_id: int):
+    key = search_cache_epoch_key(table_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The epoch doesn't exist yet, so nothing of this table could have been
+        # cached with it except for the initial epoch.
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate_table_in_search_cache(table_id: int):
+    """
+    Invalidates all the cached searches of the provided table by bumping its epoch.
+    This must be called after any change to the cell values or `tsvector` columns
+    of the table. The epoch is bumped again when the transaction commits, because
+    a concurrent search can't see the changes before that and could have cached
+    its results with the new epoch in the meantime.
+
+    :param table_id: The id of the table whose rows have changed.
+    """
+
+    if not search_cache_enabled():
+        return
+
+    _bump_search_cache_epoch(table_id)
+    transaction.on_commit(lambda: _bump_search_cache_epoch(table_id))
+    search_cache_stats.increment("invalidations")
@@ -1,5 +1,8 @@
-from django.contrib.postgres.search import SearchVector
-from django.db.models import Expression
+from typing import List
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models import BooleanField, Expression, Func, IntegerField, Value
 
 
 class LocalisedSearchVector(SearchVector):
@@ -27,3 +30,40 @@ class LocalisedSearchVector(SearchVector):
             config=SearchHandler.search_config(),
             **kwargs,
         )
+
+
+class TsvRowFieldSlice(Func):
+    """
+    Returns the part of a combined row `tsvector` containing the lexemes of the
+    provided fields only, with their original positions, so that a search can be
+    restricted to some fields. Relies on the `tsv_row_field_slice` database function
+    created by the `0004_table_tsvector_layout` migration.
+    """
+
+    function = "tsv_row_field_slice"
+    output_field = SearchVectorField()
+
+    def __init__(self, expression: Expression, field_ids: List[int], **extra):
+        super().__init__(
+            expression,
+            Value(list(field_ids), output_field=ArrayField(IntegerField())),
+            **extra,
+        )
+
+
+class TrigramContains(Func):
+    """
+    Checks if the expression contains the value using `ILIKE`, which can use a
+    `pg_trgm` GIN index on the expression, contrary to the `UPPER(...) LIKE` used by
+    Django's `icontains` lookup.
+    """
+
+    template = "(%(expressions)s)"
+    arg_joiner = " ILIKE "
+    output_field = BooleanField()
+
+    def __init__(self, expression: Expression, value: str, **extra):
+        escaped_value = (
+            value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        super().__init__(expression, Value(f"%{escaped_value}%"), **extra)
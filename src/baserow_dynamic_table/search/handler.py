@@ -1,14 +1,25 @@
 import math
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
-from typing import TYPE_CHECKING, List, NamedTuple, Optional, Type
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple, Type
 
 from django.conf import settings
 from django.contrib.postgres.indexes import GinIndex
-from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.cache import cache
 from django.db import connection, transaction
-from django.db.models import Expression, Func, Q, QuerySet, TextField, Value
+from django.db.models import (
+    Expression,
+    Func,
+    Max,
+    Min,
+    Q,
+    QuerySet,
+    TextField,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
 from django.utils.encoding import force_str
 from loguru import logger
 from psycopg2 import sql
@@ -16,10 +27,12 @@ from redis.exceptions import LockNotOwnedError
 
 from baserow_dynamic_table.core.utils import ChildProgressBuilder, exception_capturer
 from baserow_dynamic_table.db.schema import safe_django_schema_editor
+from baserow_dynamic_table.search.cache import invalidate_table_in_search_cache
 from baserow_dynamic_table.search.exceptions import (
     PostgresFullTextSearchDisabledException,
 )
 from baserow_dynamic_table.search.expressions import LocalisedSearchVector
+from baserow_dynamic_table.search.maintenance import request_table_vacuum
 from baserow_dynamic_table.search.regexes import (
     RE_ONE_OR_MORE_WHITESPACE,
     RE_REMOVE_ALL_PUNCTUATION_ALREADY_REMOVED_FROM_TSVS_FOR_QUERY,
@@ -30,6 +43,10 @@ from baserow_dynamic_table.table.cache import (
 )
 from baserow_dynamic_table.table.constants import (
     ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME,
+    TSV_ROW_COLUMN_NAME,
+    TSVECTOR_LAYOUT_COMBINED,
+    TSVECTOR_LAYOUT_PER_FIELD,
+    get_tsv_row_field_marker,
 )
 
 if TYPE_CHECKING:
@@ -39,7 +56,9 @@ if TYPE_CHECKING:
 
     from baserow_dynamic_table.table.models import (
         GeneratedTableModel,
+        RowCount,
         Table,
+        TableModelQuerySet,
     )
 
 
@@ -54,6 +73,16 @@ class SearchModes(str, Enum):
     # method is much faster as tables grow in size.
     MODE_FT_WITH_COUNT = "full-text-with-count"
 
+    # Use this mode to search rows using Postgres full-text search, ordered by
+    # relevance. The rows are meant to be fetched as a top-k without a `count`,
+    # which is much faster for "search as you type" on large tables.
+    MODE_FT_RANKED = "full-text-ranked"
+
+    # Use this mode to search rows for a substring of their text-like fields using
+    # `ILIKE` operators, which can use the `pg_trgm` GIN indexes of the table. Other
+    # field types are not searched in this mode.
+    MODE_TRIGRAM = "trigram"
+
 
 ALL_SEARCH_MODES = [getattr(mode, "value") for mode in SearchModes]
 
@@ -67,6 +96,25 @@ class FieldWithSearchVector(NamedTuple):
         return self.field.tsv_db_column
 
 
+class RowWithSearchVector(NamedTuple):
+    """
+    The search vector of all fields of a table using the combined `tsvector` layout.
+    """
+
+    search_vector: Expression
+    field = None
+
+    @property
+    def field_tsv_db_column(self):
+        return TSV_ROW_COLUMN_NAME
+
+
+class RankedSearchResult(NamedTuple):
+    rows: List["GeneratedTableModel"]
+    # Only provided if requested, and can be an estimate on large tables.
+    count: Optional["RowCount"]
+
+
 class SearchHandler:
     @classmethod
     def full_text_enabled(cls):
@@ -126,6 +174,47 @@ class SearchHandler:
             output_field=TextField(),
         )
 
+    @classmethod
+    def search_top_k(
+        cls,
+        queryset: "TableModelQuerySet",
+        search: str,
+        k: int,
+        only_search_by_field_ids: Optional[List[int]] = None,
+        with_estimated_count: bool = False,
+    ) -> RankedSearchResult:
+        """
+        Returns the `k` most relevant rows of the queryset matching the search,
+        without counting all the matching rows.
+
+        :param queryset: The queryset of the table model to search in.
+        :param search: The raw search query.
+        :param k: The number of rows to return.
+        :param only_search_by_field_ids: If provided only these fields are searched.
+        :param with_estimated_count: Whether the number of matching rows should be
+            returned as well. Large tables get the estimate of the Postgres planner
+            instead of an exact count, see `TableModelQuerySet.estimated_count`.
+        :return: The rows, and the count if requested.
+        """
+
+        rows = list(
+            queryset.search_all_fields(
+                search,
+                only_search_by_field_ids,
+                search_mode=SearchModes.MODE_FT_RANKED,
+            )[:k]
+        )
+
+        count = None
+        if with_estimated_count:
+            count = queryset.search_all_fields(
+                search,
+                only_search_by_field_ids,
+                search_mode=SearchModes.MODE_FT_WITH_COUNT,
+            ).estimated_count()
+
+        return RankedSearchResult(rows, count)
+
     @classmethod
     def escape_query(cls, text: str) -> str:
         """
@@ -192,6 +281,13 @@ class SearchHandler:
                 cls.entire_field_values_changed_or_created(
                     field.table, updated_fields=[field]
                 )
+        elif field.table.uses_combined_tsvector and not skip_search_updates:
+            cls.entire_field_values_changed_or_created(
+                field.table, updated_fields=[field]
+            )
+
+        if cls._needs_trigram_index(field):
+            cls._create_trigram_index(field)
 
     @classmethod
     def _create_tsv_column(cls, field):
@@ -219,6 +315,9 @@ class SearchHandler:
         :return: None
         """
 
+        # The index is normally dropped together with the column already.
+        cls._drop_trigram_index(field)
+
         if field.tsvector_column_created:
             # The table could have been perm deleted already so don't crash if we
             # fail to delete because the table is already gone as that also means
@@ -226,6 +325,98 @@ class SearchHandler:
             cls._drop_column_if_table_exists(
                 f"database_table_{field.table_id}", field.tsv_db_column
             )
+        else:
+            from baserow_dynamic_table.table.models import Table
+
+            # The lexemes of the field are part of the combined row `tsvector`, they
+            # only disappear once it has been updated again.
+            table = Table.objects_and_trash.filter(
+                id=field.table_id, tsvector_layout=TSVECTOR_LAYOUT_COMBINED
+            ).first()
+            if table is not None:
+                cls.entire_field_values_changed_or_created(table)
+
+    @classmethod
+    def before_field_type_changed(cls, field: "Field"):
+        """
+        Drops the trigram index of the field before its column type changes, because
+        the `gin_trgm_ops` operator class only supports text columns.
+
+        :param field: The field, before the type change.
+        """
+
+        cls._drop_trigram_index(field)
+
+    @classmethod
+    def after_field_type_changed(cls, field: "Field"):
+        """
+        :param field: The field, after the type change.
+        """
+
+        if cls._needs_trigram_index(field):
+            cls._create_trigram_index(field)
+
+    @classmethod
+    def set_trigram_indexes_enabled(
+        cls, table: "TableForUpdate", enabled: bool
+    ) -> "TableForUpdate":
+        """
+        Creates or drops a `pg_trgm` GIN index for every text-like field of the
+        table, so that the `MODE_TRIGRAM` search mode can find substrings without
+        scanning the whole table. Once enabled, the indexes are kept in sync when
+        fields are created, change type, move or are deleted.
+
+        :param table: The table, locked for update.
+        :param enabled: Whether the table should have trigram indexes.
+        :return: The updated table.
+        """
+
+        table.trigram_indexes_enabled = enabled
+        table.save(update_fields=["trigram_indexes_enabled"])
+
+        model = table.get_model()
+        for field_object in model.get_field_objects(include_trash=True):
+            field = field_object["field"]
+            if enabled and field_object["type"].can_be_trigram_indexed:
+                cls._create_trigram_index(field)
+            else:
+                cls._drop_trigram_index(field)
+
+        return table
+
+    @classmethod
+    def _needs_trigram_index(cls, field: "Field") -> bool:
+        from baserow_dynamic_table.fields.registries import (
+            field_type_registry,
+        )
+
+        return (
+            field.table.trigram_indexes_enabled
+            and field_type_registry.get_by_model(field).can_be_trigram_indexed
+        )
+
+    @classmethod
+    def _create_trigram_index(cls, field: "Field"):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.SQL(
+                    "CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} "
+                    "USING gin ({column} gin_trgm_ops)"
+                ).format(
+                    index_name=sql.Identifier(field.trigram_index_name),
+                    table_name=sql.Identifier(f"database_table_{field.table_id}"),
+                    column=sql.Identifier(field.db_column),
+                )
+            )
+
+    @classmethod
+    def _drop_trigram_index(cls, field: "Field"):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("DROP INDEX IF EXISTS {index_name}").format(
+                    index_name=sql.Identifier(field.trigram_index_name)
+                )
+            )
 
     @staticmethod
     def _drop_column_if_table_exists(table_name: str, column_to_drop: str):
@@ -252,6 +443,13 @@ class SearchHandler:
         the field type is searchable.
         """
 
+        if model.baserow_table.uses_combined_tsvector:
+            # The combined `tsvector` always contains all fields, so it can't be
+            # updated for some fields only.
+            return [
+                RowWithSearchVector(cls._get_combined_search_vector(model, queryset))
+            ]
+
         vector_updates: List[FieldWithSearchVector] = []
 
         for field in model.get_fields_with_search_index():
@@ -264,6 +462,49 @@ class SearchHandler:
                 )  # noinspection PyTypeChecker
         return vector_updates
 
+    @classmethod
+    def _get_combined_search_vector(
+        cls, model: Type["GeneratedTableModel"], queryset: QuerySet
+    ) -> Expression:
+        """
+        Concatenates the search vectors of all searchable fields into a single
+        `tsvector`. Every field's lexemes are preceded by a marker lexeme containing
+        the field id, so `TsvRowFieldSlice` can find out which lexeme belongs to
+        which field using their positions. The lexemes of the primary field get the
+        highest weight. A marker can never match a search query because Postgres
+        splits the cell values on underscores, and they're removed from the queries.
+        """
+
+        from baserow_dynamic_table.fields.registries import (
+            field_type_registry,
+        )
+
+        empty_vector = Cast(Value(""), SearchVectorField())
+        vectors = []
+        for field in model.get_fields():
+            field_type = field_type_registry.get_by_model(field)
+            if not field_type.is_searchable(field):
+                continue
+
+            marker = Cast(
+                Value(f"{get_tsv_row_field_marker(field.id)}:1"), SearchVectorField()
+            )
+            search_vector = LocalisedSearchVector(
+                field_type.get_search_expression(field, queryset),
+                weight="A" if field.primary else None,
+            )
+            vectors += [marker, Coalesce(search_vector, empty_vector)]
+
+        if not vectors:
+            return Value(None, output_field=SearchVectorField())
+
+        return Func(
+            *vectors,
+            template="(%(expressions)s)",
+            arg_joiner=" || ",
+            output_field=SearchVectorField(),
+        )
+
     @classmethod
     def _get_field_with_vector_from_field(cls, field, queryset):
         from baserow_dynamic_table.fields.registries import (
@@ -293,6 +534,10 @@ class SearchHandler:
         if not cls.full_text_enabled():
             raise PostgresFullTextSearchDisabledException()
 
+        if table.uses_combined_tsvector:
+            # The combined column is created when switching to the layout.
+            return table
+
         # Prepare a fresh model we can use to create the column.
         model = table.get_model(force_add_tsvectors=True)
 
@@ -327,6 +572,81 @@ class SearchHandler:
 
         return table
 
+    @classmethod
+    def set_tsvector_layout(
+        cls, table: "TableForUpdate", layout: str
+    ) -> "TableForUpdate":
+        """
+        Switches the table between a `tsvector` column and GIN index per field, and a
+        single combined `tsvector` column and GIN index per row. The combined layout
+        has only one index to maintain on every write and a single predicate in the
+        search query, which is a lot faster for tables with many fields. Searching
+        some fields only is slower because their lexemes must be sliced out of the
+        matching rows. Postgres caps the positions at 16383, so in rows containing
+        more words than that, the fields after the limit can only be found by a
+        search that isn't restricted to some fields.
+
+        The columns of the old layout are dropped and a full update of the new
+        columns is scheduled. The table can't be searched until that has finished.
+
+        :param table: The table, locked for update, to switch.
+        :param layout: Either `TSVECTOR_LAYOUT_PER_FIELD` or
+            `TSVECTOR_LAYOUT_COMBINED`.
+        :raises ValueError: If the layout doesn't exist.
+        :return: The updated table.
+        """
+
+        from baserow_dynamic_table.fields.models import Field
+
+        if layout not in [TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED]:
+            raise ValueError(f"The tsvector layout {layout} does not exist.")
+
+        if not cls.full_text_enabled():
+            raise PostgresFullTextSearchDisabledException()
+
+        if table.tsvector_layout == layout:
+            return table
+
+        table_name = table.get_database_table_name()
+        if layout == TSVECTOR_LAYOUT_COMBINED:
+            fields_with_tsv = Field.objects_and_trash.filter(
+                table=table, tsvector_column_created=True
+            )
+            for field in fields_with_tsv:
+                cls._drop_column_if_table_exists(table_name, field.tsv_db_column)
+            fields_with_tsv.update(tsvector_column_created=False)
+
+            table.tsvector_layout = layout
+            model = table.get_model(use_cache=False)
+            with safe_django_schema_editor(atomic=False) as schema_editor:
+                schema_editor.add_field(
+                    model, model._meta.get_field(TSV_ROW_COLUMN_NAME)
+                )
+                schema_editor.add_index(
+                    model,
+                    GinIndex(
+                        fields=[TSV_ROW_COLUMN_NAME], name=table.tsv_row_index_name
+                    ),
+                )
+        else:
+            cls._drop_column_if_table_exists(table_name, TSV_ROW_COLUMN_NAME)
+            table.tsvector_layout = layout
+
+        table.save(update_fields=["tsvector_layout"])
+        invalidate_table_in_model_cache(table.id)
+        table.refresh_from_db(fields=["version"])
+
+        if layout == TSVECTOR_LAYOUT_PER_FIELD:
+            cls.sync_tsvector_columns(table)
+
+        cls.entire_field_values_changed_or_created(table)
+        logger.info(
+            "Switched table {table_id} to the {layout} tsvector layout.",
+            table_id=table.id,
+            layout=layout,
+        )
+        return table
+
     @classmethod
     def get_update_changed_rows_only_lock_key(cls, table):
         return (
@@ -405,6 +725,8 @@ class SearchHandler:
         update_tsvectors_for_changed_rows_only: bool,
         field_ids_to_restrict_update_to: Optional[List[int]] = None,
         progress_builder: Optional[ChildProgressBuilder] = None,
+        row_id_range: Optional[Tuple[int, int]] = None,
+        vacuum: bool = True,
     ):
         """
         Responsible for updating a table's `tsvector` columns. If the caller is
@@ -421,6 +743,11 @@ class SearchHandler:
             provided ids will have their tsv columns updated.
         :param progress_builder: If provided will be used to build a child progress bar
             and report on this methods progress to the parent of the progress_builder.
+        :param row_id_range: If provided, only the rows with an id between the
+            min and max id of the range, both inclusive, are updated.
+        :param vacuum: Whether a vacuum of the table can be requested after updating
+            all rows. Should be `False` if only a part of the table is updated because
+            another part is updated concurrently.
         :return: None
         """
 
@@ -438,6 +765,10 @@ class SearchHandler:
                 "with needs_background_update=True."
             )
 
+        if table.uses_combined_tsvector:
+            # The combined `tsvector` is always updated for all fields at once.
+            field_ids_to_restrict_update_to = None
+
         model = table.get_model()
         qs = model.objects.all()
 
@@ -446,24 +777,19 @@ class SearchHandler:
         # rows where `last_updated__lte=now()
         if update_tsvectors_for_changed_rows_only:
             qs = qs.filter(Q(**{f"{ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME}": True}))
+        if row_id_range is not None:
+            qs = qs.filter(id__gte=row_id_range[0], id__lte=row_id_range[1])
 
         collected_vectors = cls._collect_search_vectors(
             model, qs, field_ids_to_restrict_update_to
         )
 
-        # If we've updated the entire `tsvector` column, issue a vacuum to clear dead
-        # tuples immediately.
+        # If we've updated the entire `tsvector` column, request a vacuum to clear the
+        # dead tuples.
         was_full_column_update = not update_tsvectors_for_changed_rows_only
-        must_vacuum = (
-            was_full_column_update
-            and collected_vectors
-            and settings.AUTO_VACUUM_AFTER_SEARCH_UPDATE
-            and not settings.TESTS
-        )
+        must_vacuum = vacuum and was_full_column_update and collected_vectors
 
-        progress = ChildProgressBuilder.build(
-            progress_builder, child_total=1000 if must_vacuum else 800
-        )
+        progress = ChildProgressBuilder.build(progress_builder, child_total=800)
 
         rows_updated_count = cls.run_tsvector_update_statement(
             collected_vectors,
@@ -474,11 +800,10 @@ class SearchHandler:
             update_tsvectors_for_changed_rows_only=update_tsvectors_for_changed_rows_only,
             progress_builder=progress.create_child_builder(represents_progress=800),
         )
+        invalidate_table_in_search_cache(table.id)
 
         if must_vacuum:
-            progress.increment(state="Vacuuming")
-            cls.vacuum_table(table)
-            progress.increment(200)
+            request_table_vacuum(table)
             logger.info(
                 "Updated table {table_id}'s tsvs for all rows with optional field "
                 "filter of {field_ids}.",
@@ -495,12 +820,116 @@ class SearchHandler:
             )
 
     @classmethod
-    def vacuum_table(cls, table):
-        with connection.cursor() as cursor:
-            query = sql.SQL("VACUUM {table_name}").format(
-                table_name=sql.Identifier(table.get_database_table_name())
+    def get_row_id_ranges(
+        cls, table: "Table", number_of_ranges: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Splits the ids of the rows in the table into disjoint ranges of equal width,
+        which can be updated independently of each other.
+
+        :param table: The table to split.
+        :param number_of_ranges: The maximum number of ranges to split the ids into.
+        :return: A list of inclusive `(min_id, max_id)` tuples.
+        """
+
+        model = table.get_model(field_ids=[])
+        id_range = model.objects_and_trash.aggregate(
+            min_id=Min("id"), max_id=Max("id")
+        )
+        min_id, max_id = id_range["min_id"], id_range["max_id"]
+        if min_id is None:
+            return []
+
+        width = math.ceil((max_id - min_id + 1) / max(number_of_ranges, 1))
+        return [
+            (start, min(start + width - 1, max_id))
+            for start in range(min_id, max_id + 1, width)
+        ]
+
+    @classmethod
+    def update_tsvector_columns_in_parallel(
+        cls,
+        table: "Table",
+        field_ids_to_restrict_update_to: Optional[List[int]] = None,
+        concurrency: Optional[int] = None,
+        progress_builder: Optional[ChildProgressBuilder] = None,
+    ):
+        """
+        Updates the `tsvector` columns of all rows in the table, like
+        `update_tsvector_columns` with `update_tsvectors_for_changed_rows_only=False`,
+        but splits the table into id ranges which are updated concurrently by
+        multiple threads, each using its own database connection. A vacuum of the
+        table is requested once all ranges have been updated.
+
+        :param table: The table which we're going to update.
+        :param field_ids_to_restrict_update_to: If provided only the fields matching the
+            provided ids will have their tsv columns updated.
+        :param concurrency: The number of ranges updated at the same time. Defaults
+            to `settings.TSV_UPDATE_CONCURRENCY`.
+        :param progress_builder: If provided will be used to build a child progress bar
+            and report on this methods progress to the parent of the progress_builder.
+        """
+
+        if not SearchHandler.full_text_enabled():
+            raise PostgresFullTextSearchDisabledException()
+
+        if concurrency is None:
+            concurrency = settings.TSV_UPDATE_CONCURRENCY
+
+        # Using more ranges than threads balances the load when some parts of the
+        # table contain a lot more data than others.
+        row_id_ranges = cls.get_row_id_ranges(table, concurrency * 4)
+        if not row_id_ranges:
+            # This will make the progressbar skip this step.
+            ChildProgressBuilder.build(progress_builder, child_total=1).increment()
+            return
+
+        progress = ChildProgressBuilder.build(
+            progress_builder, child_total=len(row_id_ranges)
+        )
+
+        def update_range(row_id_range):
+            cls.update_tsvector_columns(
+                table,
+                update_tsvectors_for_changed_rows_only=False,
+                field_ids_to_restrict_update_to=field_ids_to_restrict_update_to,
+                row_id_range=row_id_range,
+                vacuum=False,
             )
-            cursor.execute(query)  # type: ignore
+
+        def update_range_in_thread(row_id_range):
+            try:
+                update_range(row_id_range)
+            finally:
+                # Every thread gets its own connection which must be closed when
+                # the thread is done with it.
+                connection.close()
+
+        if concurrency <= 1:
+            for row_id_range in row_id_ranges:
+                update_range(row_id_range)
+                progress.increment(state="Updating search index")
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(update_range_in_thread, row_id_range)
+                    for row_id_range in row_id_ranges
+                ]
+                # The progress is only incremented in this thread because the
+                # progress events are not thread safe.
+                for future in as_completed(futures):
+                    future.result()
+                    progress.increment(state="Updating search index")
+
+        request_table_vacuum(table)
+
+        logger.info(
+            "Updated table {table_id}'s tsvs for all rows in {range_count} ranges "
+            "with optional field filter of {field_ids}.",
+            table_id=table.id,
+            range_count=len(row_id_ranges),
+            field_ids=field_ids_to_restrict_update_to or "no fields",
+        )
 
     @classmethod
     def split_update_into_chunks_by_ranges(
@@ -510,31 +939,45 @@ class SearchHandler:
         progress_builder: Optional[ChildProgressBuilder] = None,
     ) -> Optional[int]:
         """
-        Split the queryset up into chunks based on the count, and update the tsv
-        cells for the rows in the chunk. It will stop when max number of
-        precalculated iterations is reached.
+        Split the queryset up into chunks of consecutive ids, and update the tsv
+        cells for the rows in the chunk. Every chunk starts right after the last id
+        of the previous one (keyset pagination), so finding the next chunk costs the
+        same no matter how far into the table we are, contrary to an OFFSET.
         """
 
-        total_count = qs.count()
+        id_range = qs.aggregate(min_id=Min("id"), max_id=Max("id"))
+        min_id, max_id = id_range["min_id"], id_range["max_id"]
 
         # There can be an edge case where the row has already bee updated. To prevent
         # division by zero exceptions, we don't have to do anything here.
-        if total_count == 0:
+        if min_id is None:
             return 0
 
-        total_iterations = math.ceil(total_count / settings.TSV_UPDATE_CHUNK_SIZE)
+        chunk_size = settings.TSV_UPDATE_CHUNK_SIZE
+        # The ids are used to track the progress because counting the rows would
+        # require an additional scan of the table.
         progress = ChildProgressBuilder.build(
-            progress_builder, child_total=total_iterations
+            progress_builder, child_total=max_id - min_id + 1
         )
         total_updated = 0
-        for i in range(0, total_count, settings.TSV_UPDATE_CHUNK_SIZE):
+        last_id = min_id - 1
+        while last_id < max_id:
             with transaction.atomic():
-                next_ids = qs.order_by("id").values_list("id", flat=True)[
-                    i : i + settings.TSV_UPDATE_CHUNK_SIZE
-                ]
-                next_chunk = qs.filter(id__in=next_ids).select_for_update(of=("self",))
+                chunk = qs.filter(id__gt=last_id)
+                # The id of the last row of the chunk. If there are fewer rows left
+                # than the chunk size, this is the last chunk.
+                chunk_end_ids = list(
+                    chunk.order_by("id").values_list("id", flat=True)[
+                        chunk_size - 1 : chunk_size
+                    ]
+                )
+                chunk_end_id = chunk_end_ids[0] if chunk_end_ids else max_id
+                next_chunk = chunk.filter(id__lte=chunk_end_id).select_for_update(
+                    of=("self",)
+                )
                 total_updated += next_chunk.update(**update_query)
-            progress.increment()
+            progress.increment(by=chunk_end_id - last_id)
+            last_id = chunk_end_id
         return total_updated
 
     @classmethod
@@ -660,8 +1103,9 @@ class SearchHandler:
         for cv in collected_vectors:
             try:
                 # re-fetch the fields incase they changed since we got the model
-                refetched_field = FieldHandler().get_field(cv.field.id).specific
-                cv = cls._get_field_with_vector_from_field(refetched_field, qs)
+                if cv.field is not None:
+                    refetched_field = FieldHandler().get_field(cv.field.id).specific
+                    cv = cls._get_field_with_vector_from_field(refetched_field, qs)
                 if update_tsvectors_for_changed_rows_only:
                     cls.split_update_into_chunks_until_all_background_done(
                         qs,
@@ -687,7 +1131,7 @@ class SearchHandler:
                     + str(field)
                     + " and expression is "
                     + str(cv.search_vector),
-                    field_id=field.id,
+                    field_id=getattr(field, "id", None),
                     field_type=str(type(field)),
                     e=str(another_e),
                 )
@@ -706,6 +1150,59 @@ class SearchHandler:
         else:
             progress.increment(1000)
 
+    @classmethod
+    def after_rows_created_or_updated(
+        cls,
+        table: "Table",
+        model: Type["GeneratedTableModel"],
+        row_ids: List[int],
+    ):
+        """
+        Called in the transaction which created or updated the rows. If there are at
+        most `TSV_INLINE_UPDATE_MAX_ROWS` rows, their tsvectors are updated right
+        away, so the rows are searchable as soon as the transaction commits without
+        waiting for the background update. Larger batches are updated in the
+        background.
+
+        :param table: The table the rows belong to.
+        :param model: The model of the table.
+        :param row_ids: The ids of the created or updated rows.
+        """
+
+        max_rows = settings.TSV_INLINE_UPDATE_MAX_ROWS
+        if max_rows <= 0 or not row_ids or not table.tsvectors_are_supported:
+            return
+
+        if len(row_ids) <= max_rows:
+            cls.update_tsvector_columns_of_rows(model, row_ids)
+        else:
+            cls.field_value_updated_or_created(table)
+
+    @classmethod
+    def update_tsvector_columns_of_rows(
+        cls, model: Type["GeneratedTableModel"], row_ids: List[int]
+    ) -> int:
+        """
+        Updates the tsvectors of all fields of the provided rows in a single UPDATE
+        statement and marks them as not needing a background update anymore. All
+        fields are updated, even if only some of them changed, because the rows
+        could still be waiting for the background update of an earlier change.
+
+        :param model: The model of the table.
+        :param row_ids: The ids of the rows to update.
+        :return: The number of updated rows.
+        """
+
+        qs = model.objects_and_trash.filter(id__in=row_ids)
+        update_query = {
+            cv.field_tsv_db_column: cv.search_vector
+            for cv in cls._collect_search_vectors(model, qs)
+        }
+        update_query[ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME] = Value(False)
+        rows_updated_count = qs.update(**update_query)
+        invalidate_table_in_search_cache(model.baserow_table.id)
+        return rows_updated_count
+
     @classmethod
     def field_value_updated_or_created(
         cls,
@@ -757,8 +1254,13 @@ class SearchHandler:
         updated_fields: Optional[List["Field"]] = None,
     ):
         if table.tsvectors_are_supported:
+            from baserow_dynamic_table.search.scheduler import (
+                debounced_tsvector_updates_enabled,
+                request_tsvector_update,
+            )
             from baserow_dynamic_table.search.tasks import (
                 async_update_tsvector_columns,
+                async_update_tsvector_columns_in_parallel,
             )
             from baserow_dynamic_table.tasks import (
                 enqueue_task_on_commit_swallowing_any_exceptions,
@@ -770,6 +1272,30 @@ class SearchHandler:
                 else None
             )
 
+            if debounced_tsvector_updates_enabled():
+                enqueue_task_on_commit_swallowing_any_exceptions(
+                    lambda: request_tsvector_update(
+                        table.id,
+                        update_tsvs_for_changed_rows_only,
+                        searchable_updated_fields_ids,
+                    )
+                )
+                return
+
+            # Updating all rows can be split over multiple workers, updating only
+            # the changed rows can't because those are locked per table.
+            if (
+                not update_tsvs_for_changed_rows_only
+                and settings.TSV_UPDATE_CONCURRENCY > 1
+            ):
+                enqueue_task_on_commit_swallowing_any_exceptions(
+                    lambda: async_update_tsvector_columns_in_parallel.delay(
+                        table.id,
+                        field_ids_to_restrict_update_to=searchable_updated_fields_ids,
+                    )
+                )
+                return
+
             enqueue_task_on_commit_swallowing_any_exceptions(
                 lambda: async_update_tsvector_columns.delay(
                     table.id,
@@ -790,8 +1316,47 @@ class SearchHandler:
     def after_field_moved_between_tables(
         cls, moved_field: "Field", original_table_id: int
     ):
+        """
+        Moves the search data of a field which has been moved to another table. The
+        `tsvector` column is created in the new table if it uses the per field
+        layout, and the combined `tsvectors` of the tables using the combined layout
+        are updated, so that they contain, or don't contain anymore, the values of
+        the moved field.
+
+        :param moved_field: The field which has been moved.
+        :param original_table_id: The id of the table the field has been moved from.
+        """
+
+        from baserow_dynamic_table.fields.models import Field
+        from baserow_dynamic_table.table.models import Table
+
+        original_table = Table.objects_and_trash.filter(id=original_table_id).first()
+        target_table = moved_field.table
+
         if moved_field.tsvector_column_created:
             cls._drop_column_if_table_exists(
                 f"database_table_{original_table_id}", moved_field.tsv_db_column
             )
+
+        tsvector_column_created = target_table.per_field_tsvectors_are_supported
+        if moved_field.tsvector_column_created != tsvector_column_created:
+            moved_field.tsvector_column_created = tsvector_column_created
+            Field.objects_and_trash.filter(id=moved_field.id).update(
+                tsvector_column_created=tsvector_column_created
+            )
+        if tsvector_column_created:
             cls._create_tsv_column(moved_field)
+
+        if tsvector_column_created or target_table.uses_combined_tsvector:
+            cls.entire_field_values_changed_or_created(
+                target_table, updated_fields=[moved_field]
+            )
+        if original_table is not None and original_table.uses_combined_tsvector:
+            # The combined `tsvectors` still contain the values of the moved field.
+            cls.entire_field_values_changed_or_created(original_table)
+
+        # Index names are unique per schema, so the index of the original table
+        # must be dropped before it can be created for the new table.
+        cls._drop_trigram_index(moved_field)
+        if cls._needs_trigram_index(moved_field):
+            cls._create_trigram_index(moved_field)
@@ -0,0 +1,252 @@
+"""
+This file is responsible for vacuuming tables after their `tsvector` columns have
+been updated for all rows. Such an update rewrites every row of the table, so it
+leaves as many dead tuples behind. Vacuuming right after the update holds the worker
+for a long time on big tables, and piles up when many tables are re-indexed at once.
+
+Instead, the table is recorded as needing a vacuum together with the dead tuple
+estimate of `pg_stat_user_tables` at that moment. The periodic
+`run_pending_table_vacuums` job then:
+- Skips the tables which have been vacuumed by autovacuum, or manually, since the
+  vacuum was requested.
+- Skips the tables with fewer dead tuples than `TABLE_VACUUM_MIN_DEAD_TUPLES`.
+- Runs `VACUUM (ANALYZE)` on at most `TABLE_VACUUM_MAX_TABLES_PER_RUN` of the
+  remaining tables, the ones with the most dead tuples first. The others are left
+  for the next run.
+
+The pending vacuums are stored in the cache key `table_vacuum_pending`.
+"""
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from loguru import logger
+from psycopg2 import sql
+
+if TYPE_CHECKING:
+    from baserow_dynamic_table.table.models import Table
+
+PENDING_VACUUMS_CACHE_KEY = "table_vacuum_pending"
+RUNNING_VACUUMS_CACHE_KEY = "table_vacuum_running"
+# A pending vacuum is dropped if no job processed it for this long.
+PENDING_STATE_TIMEOUT = 24 * 60 * 60
+# Added to the hard time limit of the vacuum job for the expiry of the running
+# flag, which is left behind if the worker is killed.
+RUNNING_STATE_MARGIN = 60
+
+
+class TableVacuumStats(NamedTuple):
+    db_table: str
+    live_tuples: int
+    dead_tuples: int
+    # The unix timestamp of the last manual or automatic vacuum, if any.
+    last_vacuumed_at: Optional[float]
+
+
+@contextmanager
+def _cache_lock():
+    # Only some cache backends support locks, in which case concurrent requests
+    # can't overwrite each other's changes to the pending vacuums.
+    if hasattr(cache, "lock"):
+        with cache.lock(f"{PENDING_VACUUMS_CACHE_KEY}_lock", timeout=10):
+            yield
+    else:
+        yield
+
+
+def get_table_vacuum_stats(db_tables: Iterable[str]) -> Dict[str, TableVacuumStats]:
+    """
+    Returns the dead tuple estimates and last vacuum times of the provided database
+    tables, as tracked by the Postgres statistics collector. The estimates can lag
+    behind the actual changes by a few hundred milliseconds.
+
+    :param db_tables: The names of the database tables.
+    :return: A dict containing the stats per database table name. Tables that don't
+        exist are not included.
+    """
+
+    db_tables = list(db_tables)
+    if not db_tables:
+        return {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                relname,
+                n_live_tup,
+                n_dead_tup,
+                extract(epoch FROM greatest(last_vacuum, last_autovacuum))
+            FROM pg_stat_user_tables
+            WHERE schemaname = current_schema() AND relname = ANY(%s)
+            """,
+            [db_tables],
+        )
+        return {
+            db_table: TableVacuumStats(
+                db_table,
+                live_tuples,
+                dead_tuples,
+                float(last_vacuumed_at) if last_vacuumed_at is not None else None,
+            )
+            for db_table, live_tuples, dead_tuples, last_vacuumed_at in cursor
+        }
+
+
+def get_pending_table_vacuums() -> Dict[int, Dict[str, Any]]:
+    """
+    Returns the vacuums waiting for the next `run_pending_table_vacuums` run per
+    table id, with the database table name, the time of the first request and the
+    dead tuple estimate of the last request.
+    """
+
+    return cache.get(PENDING_VACUUMS_CACHE_KEY, {})
+
+
+def request_table_vacuum(table: "Table"):
+    """
+    Records that the table should be vacuumed by the next
+    `run_pending_table_vacuums` run because a lot of its rows have been rewritten.
+    Does nothing if `AUTO_VACUUM_AFTER_SEARCH_UPDATE` is disabled.
+
+    :param table: The table to vacuum.
+    """
+
+    if not settings.AUTO_VACUUM_AFTER_SEARCH_UPDATE:
+        return
+
+    db_table = table.get_database_table_name()
+    stats = get_table_vacuum_stats([db_table]).get(db_table)
+    dead_tuples = stats.dead_tuples if stats else 0
+
+    with _cache_lock():
+        pending = get_pending_table_vacuums()
+        requested_at = pending.get(table.id, {}).get("requested_at", time.time())
+        pending[table.id] = {
+            "db_table": db_table,
+            "requested_at": requested_at,
+            "dead_tuples": dead_tuples,
+        }
+        cache.set(PENDING_VACUUMS_CACHE_KEY, pending, PENDING_STATE_TIMEOUT)
+
+    logger.debug(
+        "Requested a vacuum of table {table_id} with an estimated {dead_tuples} dead "
+        "tuples.",
+        table_id=table.id,
+        dead_tuples=dead_tuples,
+    )
+
+
+def vacuum_table(db_table: str):
+    """
+    Runs `VACUUM (ANALYZE)` on the database table. Can't be called inside a
+    transaction.
+    """
+
+    with connection.cursor() as cursor:
+        query = sql.SQL("VACUUM (ANALYZE) {table_name}").format(
+            table_name=sql.Identifier(db_table)
+        )
+        cursor.execute(query)  # type: ignore
+
+
+def run_pending_table_vacuums(max_tables: Optional[int] = None) -> List[int]:
+    """
+    Vacuums the tables with the most dead tuples of the pending vacuums and drops
+    the pending vacuums that are no longer needed. Only one run can be in progress
+    at the same time, so the vacuums are rate limited across all workers.
+
+    :param max_tables: The maximum number of tables to vacuum. Defaults to
+        `settings.TABLE_VACUUM_MAX_TABLES_PER_RUN`.
+    :return: The ids of the vacuumed tables.
+    """
+
+    if max_tables is None:
+        max_tables = settings.TABLE_VACUUM_MAX_TABLES_PER_RUN
+
+    running_timeout = settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT + (
+        RUNNING_STATE_MARGIN
+    )
+    if not cache.add(RUNNING_VACUUMS_CACHE_KEY, True, running_timeout):
+        logger.info("Skipping the table vacuums because another run is in progress.")
+        return []
+
+    try:
+        return _run_pending_table_vacuums(max_tables)
+    finally:
+        cache.delete(RUNNING_VACUUMS_CACHE_KEY)
+
+
+def _run_pending_table_vacuums(max_tables: int) -> List[int]:
+    pending = get_pending_table_vacuums()
+    if not pending:
+        return []
+
+    stats_per_db_table = get_table_vacuum_stats(
+        entry["db_table"] for entry in pending.values()
+    )
+
+    handled, candidates = [], []
+    for table_id, entry in pending.items():
+        stats = stats_per_db_table.get(entry["db_table"])
+        if stats is None:
+            # The table has been deleted in the meantime.
+            handled.append(table_id)
+        elif (
+            stats.last_vacuumed_at is not None
+            and stats.last_vacuumed_at >= entry["requested_at"]
+        ):
+            logger.debug(
+                "Skipping the vacuum of table {table_id} because it has already been "
+                "vacuumed.",
+                table_id=table_id,
+            )
+            handled.append(table_id)
+        elif stats.dead_tuples < settings.TABLE_VACUUM_MIN_DEAD_TUPLES:
+            handled.append(table_id)
+        else:
+            candidates.append((stats.dead_tuples, table_id))
+
+    candidates.sort(reverse=True)
+    to_vacuum = [table_id for _, table_id in candidates[:max_tables]]
+
+    # The tables are removed before vacuuming them, so that the vacuums requested
+    # in the meantime are kept for the next run.
+    with _cache_lock():
+        current = get_pending_table_vacuums()
+        for table_id in handled + to_vacuum:
+            entry = current.get(table_id)
+            if entry and entry["requested_at"] == pending[table_id]["requested_at"]:
+                del current[table_id]
+        cache.set(PENDING_VACUUMS_CACHE_KEY, current, PENDING_STATE_TIMEOUT)
+
+    vacuumed = []
+    for table_id in to_vacuum:
+        start = time.perf_counter()
+        try:
+            vacuum_table(pending[table_id]["db_table"])
+        except Exception as e:
+            logger.warning(
+                "Failed to vacuum table {table_id}: {error}", table_id=table_id, error=e
+            )
+            continue
+        vacuumed.append(table_id)
+        logger.info(
+            "Vacuumed table {table_id} with an estimated {dead_tuples} dead tuples in "
+            "{duration:.2f}s.",
+            table_id=table_id,
+            dead_tuples=stats_per_db_table[pending[table_id]["db_table"]].dead_tuples,
+            duration=time.perf_counter() - start,
+        )
+
+    logger.info(
+        "Vacuumed {vacuumed_count} table(s), skipped {skipped_count} and left "
+        "{remaining_count} for the next run.",
+        vacuumed_count=len(vacuumed),
+        skipped_count=len(handled),
+        remaining_count=len(candidates) - len(to_vacuum),
+    )
+    return vacuumed
@@ -0,0 +1,295 @@
+"""
+This file is responsible for debouncing and coalescing the `tsvector` updates of
+tables. Without it, every write enqueues an `async_update_tsvector_columns` task, so
+a stream of single row writes results in a steady flood of tasks.
+
+When an update is requested, the table is marked as dirty in the Django cache and
+the requested update is merged into the pending update of the table:
+- Changed rows only: the rows with `needs_background_update` must be updated.
+- All rows: every row must be updated, optionally for some fields only. Requests
+  for different fields are merged into one update for all of those fields.
+
+Only a single `run_debounced_tsvector_update` task is scheduled per dirty table.
+It waits until no update has been requested for `TSV_UPDATE_DEBOUNCE_SECONDS`, but
+never longer than `TSV_UPDATE_MAX_DELAY_SECONDS` after the first request, and then
+runs the merged update at once. Requests that arrive while it runs mark the table as
+dirty again and schedule a new task. The time at which the task has been scheduled
+is stored with the pending update, so that a request schedules the task again if it
+should have run long ago, because it has been lost.
+
+The pending updates are stored in the cache key `tsv_update_pending_{table_id}`,
+and the dirty tables with the time of their first request in
+`tsv_update_pending_tables` which is used to expose the queue depth and lag.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from loguru import logger
+
+PENDING_TABLES_CACHE_KEY = "tsv_update_pending_tables"
+# The pending state of a table is dropped if no task processed it for this long,
+# for example because the worker was killed, so it doesn't stay dirty forever.
+PENDING_STATE_TIMEOUT = 60 * 60
+
+
+class PendingTsvectorUpdate(NamedTuple):
+    table_id: int
+    update_changed_rows: bool
+    update_all_rows: bool
+    # The fields to restrict the update of all rows to, `None` means all fields.
+    field_ids: Optional[List[int]]
+    requests: int
+    # The number of seconds between the first request and the update.
+    lag: float
+
+
+class TsvectorSchedulerStats:
+    """
+    Keeps track of the update requests and the updates run by the scheduler in this
+    process. Can be used to expose metrics or to verify that bursts are merged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.coalesced_requests = 0
+        self.tasks_scheduled = 0
+        self.updates_run = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def increment(self, attr: str, by: int = 1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + by)
+
+    def record_update(self, pending: PendingTsvectorUpdate):
+        with self._lock:
+            self.updates_run += 1
+            self.total_lag += pending.lag
+            self.max_lag = max(self.max_lag, pending.lag)
+
+    @property
+    def average_lag(self) -> float:
+        return self.total_lag / self.updates_run if self.updates_run else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "coalesced_requests": self.coalesced_requests,
+            "tasks_scheduled": self.tasks_scheduled,
+            "updates_run": self.updates_run,
+            "average_lag": self.average_lag,
+            "max_lag": self.max_lag,
+        }
+
+
+tsvector_scheduler_stats = TsvectorSchedulerStats()
+
+
+def debounced_tsvector_updates_enabled() -> bool:
+    return settings.TSV_UPDATE_DEBOUNCE_SECONDS > 0
+
+
+def get_pending_update_cache_key(table_id: int) -> str:
+    return f"tsv_update_pending_{table_id}"
+
+
+@contextmanager
+def _cache_lock(name: str):
+    # Only some cache backends support locks, in which case concurrent requests
+    # can't overwrite each other's changes to the pending state.
+    if hasattr(cache, "lock"):
+        with cache.lock(f"tsv_update_lock_{name}", timeout=10):
+            yield
+    else:
+        yield
+
+
+def _get_remaining_delay(state: Dict[str, Any], now: float) -> float:
+    until_debounced = state["last"] + settings.TSV_UPDATE_DEBOUNCE_SECONDS - now
+    until_max_delay = state["first"] + settings.TSV_UPDATE_MAX_DELAY_SECONDS - now
+    return max(min(until_debounced, until_max_delay), 0)
+
+
+def _is_scheduled_task_lost(state: Dict[str, Any], now: float) -> bool:
+    # The task waits at most the debounce window before running or scheduling
+    # itself again, and is then stopped by its time limit.
+    scheduled_task_timeout = (
+        settings.TSV_UPDATE_DEBOUNCE_SECONDS
+        + settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT
+    )
+    return state.get("scheduled_at", state["first"]) + scheduled_task_timeout < now
+
+
+def request_tsvector_update(
+    table_id: int,
+    update_changed_rows_only: bool,
+    field_ids: Optional[Iterable[int]] = None,
+):
+    """
+    Marks the table as dirty and merges the requested update into its pending
+    update. Schedules the task which runs it if the table wasn't dirty yet. Must be
+    called after the changes have been committed.
+
+    :param table_id: The id of the table whose tsvectors must be updated.
+    :param update_changed_rows_only: Whether only the rows with
+        `needs_background_update` must be updated instead of all rows.
+    :param field_ids: If all rows must be updated, optionally the fields to restrict
+        the update to.
+    """
+
+    from baserow_dynamic_table.search.tasks import run_debounced_tsvector_update
+
+    now = time.time()
+    key = get_pending_update_cache_key(table_id)
+    with _cache_lock(key):
+        state = cache.get(key)
+        is_new = state is None
+        if is_new:
+            state = {"first": now, "changed": False, "all_rows": False, "requests": 0}
+        schedule = is_new or _is_scheduled_task_lost(state, now)
+        if schedule:
+            state["scheduled_at"] = now
+
+        state["last"] = now
+        state["requests"] += 1
+        if update_changed_rows_only:
+            state["changed"] = True
+        elif field_ids is None:
+            state["all_rows"] = True
+            state["field_ids"] = None
+        elif not state["all_rows"]:
+            state["all_rows"] = True
+            state["field_ids"] = sorted(set(field_ids))
+        elif state["field_ids"] is not None:
+            state["field_ids"] = sorted(set(state["field_ids"]) | set(field_ids))
+        cache.set(key, state, PENDING_STATE_TIMEOUT)
+
+    tsvector_scheduler_stats.increment("requests")
+    if not is_new:
+        tsvector_scheduler_stats.increment("coalesced_requests")
+    if not schedule:
+        return
+
+    if is_new:
+        with _cache_lock(PENDING_TABLES_CACHE_KEY):
+            pending_tables = cache.get(PENDING_TABLES_CACHE_KEY, {})
+            pending_tables[table_id] = now
+            cache.set(PENDING_TABLES_CACHE_KEY, pending_tables, PENDING_STATE_TIMEOUT)
+    else:
+        logger.warning(
+            f"The scheduled tsvector update of table {table_id} hasn't run in time, "
+            f"scheduling it again."
+        )
+
+    tsvector_scheduler_stats.increment("tasks_scheduled")
+    run_debounced_tsvector_update.apply_async(
+        (table_id,), countdown=settings.TSV_UPDATE_DEBOUNCE_SECONDS
+    )
+
+
+def claim_pending_tsvector_update(
+    table_id: int, force: bool = False
+) -> Tuple[Optional[PendingTsvectorUpdate], float]:
+    """
+    Takes the pending update of the table if it has been debounced long enough, so
+    that the next request marks the table as dirty again.
+
+    :param table_id: The id of the table to claim the pending update of.
+    :param force: Claims the pending update even if the debounce window hasn't
+        passed yet.
+    :return: The pending update and 0, or `None` and the number of seconds to wait
+        before trying again. `None` and 0 if there is nothing to update.
+    """
+
+    now = time.time()
+    key = get_pending_update_cache_key(table_id)
+    with _cache_lock(key):
+        state = cache.get(key)
+        if state is None:
+            return None, 0
+
+        remaining_delay = _get_remaining_delay(state, now)
+        if remaining_delay > 0 and not force:
+            # The task schedules itself again.
+            state["scheduled_at"] = now
+            cache.set(key, state, PENDING_STATE_TIMEOUT)
+            return None, remaining_delay
+
+        cache.delete(key)
+
+    with _cache_lock(PENDING_TABLES_CACHE_KEY):
+        pending_tables = cache.get(PENDING_TABLES_CACHE_KEY, {})
+        pending_tables.pop(table_id, None)
+        cache.set(PENDING_TABLES_CACHE_KEY, pending_tables, PENDING_STATE_TIMEOUT)
+
+    return (
+        PendingTsvectorUpdate(
+            table_id=table_id,
+            update_changed_rows=state["changed"],
+            update_all_rows=state["all_rows"],
+            field_ids=state.get("field_ids"),
+            requests=state["requests"],
+            lag=now - state["first"],
+        ),
+        0,
+    )
+
+
+def run_pending_tsvector_update(pending: PendingTsvectorUpdate):
+    """
+    Runs the merged update of a table claimed by `claim_pending_tsvector_update`.
+
+    :param pending: The claimed pending update.
+    """
+
+    from baserow_dynamic_table.search.handler import SearchHandler
+    from baserow_dynamic_table.table.handler import TableHandler
+
+    table = TableHandler().get_table(pending.table_id)
+    if pending.update_all_rows:
+        if settings.TSV_UPDATE_CONCURRENCY > 1:
+            SearchHandler.update_tsvector_columns_in_parallel(
+                table, field_ids_to_restrict_update_to=pending.field_ids
+            )
+        else:
+            SearchHandler.update_tsvector_columns(
+                table,
+                update_tsvectors_for_changed_rows_only=False,
+                field_ids_to_restrict_update_to=pending.field_ids,
+            )
+
+    # Updating all rows for all fields also updates the changed rows.
+    if pending.update_changed_rows and not (
+        pending.update_all_rows and pending.field_ids is None
+    ):
+        SearchHandler.update_tsvector_columns_locked(
+            table, update_tsvectors_for_changed_rows_only=True
+        )
+
+    tsvector_scheduler_stats.record_update(pending)
+
+
+def get_tsvector_scheduler_metrics() -> Dict[str, Any]:
+    """
+    Returns the metrics of the scheduler in this process, together with the number
+    of dirty tables waiting for an update and the lag of the oldest one, which are
+    shared by all processes.
+    """
+
+    pending_tables = cache.get(PENDING_TABLES_CACHE_KEY, {})
+    oldest_request = min(pending_tables.values(), default=None)
+    return {
+        **tsvector_scheduler_stats.as_dict(),
+        "queue_depth": len(pending_tables),
+        "oldest_pending_lag": (
+            time.time() - oldest_request if oldest_request is not None else 0.0
+        ),
+    }
@@ -1,11 +1,25 @@
 from typing import List, Optional
+from uuid import uuid4
 
 from baserow_dynamic_table_dynamic_table_dynamic_table.config.celery import app
 from baserow_dynamic_table.search.exceptions import (
     PostgresFullTextSearchDisabledException,
 )
 from django.conf import settings
+from django.core.cache import cache
 from loguru import logger
+from redis.exceptions import LockNotOwnedError
+
+# The lock of a parallel update and its number of remaining ranges expire in case a
+# range task is lost, the same as the lock of `update_tsvector_columns_locked`.
+PARALLEL_UPDATE_TIMEOUT = 60 * 60
+# How long a parallel update waits for the lock of another update before it's
+# rescheduled, so that it doesn't hold a worker for as long as the other update runs.
+PARALLEL_UPDATE_LOCK_WAIT = 60
+
+
+def get_parallel_update_remaining_ranges_key(table_id: int, token: str) -> str:
+    return f"tsv_update_parallel_remaining_ranges_{table_id}_{token}"
 
 
 @app.task(
@@ -38,3 +52,203 @@ def async_update_tsvector_columns(
         )
     except PostgresFullTextSearchDisabledException:
         logger.debug(f"Postgres full-text search is disabled.")
+
+
+@app.task(
+    bind=True,
+    queue="export",
+    time_limit=settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT,
+)
+def async_update_tsvector_columns_in_parallel(
+        self,
+        table_id: int,
+        field_ids_to_restrict_update_to: Optional[List[int]] = None,
+):
+    """
+    Splits the table into row id ranges and updates the `tsvector` columns of every
+    range in a separate task, so that they can be processed by multiple workers at
+    the same time.
+
+    The lock of `update_tsvector_columns_locked` is held until the last range is
+    done, so that the changed rows are not updated concurrently. Every range task
+    counts down the remaining ranges in the cache, the last one releases the lock,
+    updates the rows which have changed in the meantime and requests a vacuum of the
+    table. If another update holds the lock, the task is rescheduled.
+
+    :param table_id: The ID of the table we'd like to update the tsvectors for.
+    :param field_ids_to_restrict_update_to: If provided only the fields matching the
+        provided ids will have their tsv columns updated.
+    """
+
+    from baserow_dynamic_table.search.handler import SearchHandler
+    from baserow_dynamic_table.table.handler import TableHandler
+
+    table = TableHandler().get_table(table_id)
+    row_id_ranges = SearchHandler.get_row_id_ranges(
+        table, settings.TSV_UPDATE_CONCURRENCY
+    )
+    if not row_id_ranges:
+        return
+
+    token = uuid4().hex
+    if hasattr(cache, "lock"):
+        acquired = cache.lock(
+            SearchHandler.get_update_changed_rows_only_lock_key(table),
+            timeout=PARALLEL_UPDATE_TIMEOUT,
+        ).acquire(
+            blocking=True, blocking_timeout=PARALLEL_UPDATE_LOCK_WAIT, token=token
+        )
+        if not acquired:
+            if self.request.is_eager:
+                # An eager task can't be rescheduled, so the ranges are updated
+                # sequentially instead, which doesn't need the lock.
+                async_update_tsvector_columns(
+                    table_id, False, field_ids_to_restrict_update_to
+                )
+            else:
+                self.apply_async(
+                    (table_id, field_ids_to_restrict_update_to),
+                    countdown=PARALLEL_UPDATE_LOCK_WAIT,
+                )
+            return
+    cache.set(
+        get_parallel_update_remaining_ranges_key(table_id, token),
+        len(row_id_ranges),
+        timeout=PARALLEL_UPDATE_TIMEOUT,
+    )
+    for min_row_id, max_row_id in row_id_ranges:
+        async_update_tsvector_columns_range.delay(
+            table_id, min_row_id, max_row_id, field_ids_to_restrict_update_to, token
+        )
+
+
+@app.task(
+    queue="export",
+    time_limit=settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT,
+)
+def async_update_tsvector_columns_range(
+        table_id: int,
+        min_row_id: int,
+        max_row_id: int,
+        field_ids_to_restrict_update_to: Optional[List[int]] = None,
+        token: Optional[str] = None,
+):
+    """
+    Updates the `tsvector` columns of the rows with an id between the provided min
+    and max row id, both inclusive.
+
+    :param token: The token of the parallel update the range is part of, see
+        `async_update_tsvector_columns_in_parallel`.
+    """
+
+    from baserow_dynamic_table.search.handler import SearchHandler
+    from baserow_dynamic_table.table.handler import TableHandler
+
+    table = TableHandler().get_table(table_id)
+    try:
+        SearchHandler.update_tsvector_columns(
+            table,
+            update_tsvectors_for_changed_rows_only=False,
+            field_ids_to_restrict_update_to=field_ids_to_restrict_update_to,
+            row_id_range=(min_row_id, max_row_id),
+            vacuum=False,
+        )
+    except PostgresFullTextSearchDisabledException:
+        logger.debug(f"Postgres full-text search is disabled.")
+    finally:
+        if token is not None:
+            _finish_parallel_update_range(table, token)
+
+
+def _finish_parallel_update_range(table, token: str):
+    from baserow_dynamic_table.search.handler import SearchHandler
+    from baserow_dynamic_table.search.maintenance import request_table_vacuum
+
+    key = get_parallel_update_remaining_ranges_key(table.id, token)
+    try:
+        remaining_ranges = cache.decr(key)
+    except ValueError:
+        # The count and the lock have expired. It's unknown which range is the last
+        # one, so none of them finishes the update. The rows changed in the meantime
+        # are updated by the next update of the changed rows.
+        logger.warning(
+            f"The parallel tsvector update {token} of table {table.id} has expired."
+        )
+        return
+    if remaining_ranges > 0:
+        return
+
+    cache.delete(key)
+    if hasattr(cache, "lock"):
+        try:
+            cache.lock(
+                SearchHandler.get_update_changed_rows_only_lock_key(table),
+                timeout=PARALLEL_UPDATE_TIMEOUT,
+            ).do_release(token)
+        except LockNotOwnedError:
+            # The lock has timed out and might have been taken by another worker.
+            pass
+
+    if SearchHandler.full_text_enabled():
+        # The updates of the rows changed while the lock was held have been skipped.
+        SearchHandler.update_tsvector_columns_locked(
+            table, update_tsvectors_for_changed_rows_only=True
+        )
+        request_table_vacuum(table)
+
+
+@app.task(
+    queue="export",
+    time_limit=settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT,
+)
+def run_pending_table_vacuums_job():
+    """
+    Vacuums the tables whose vacuum has been requested, see
+    `baserow_dynamic_table.search.maintenance`.
+    """
+
+    from baserow_dynamic_table.search.maintenance import run_pending_table_vacuums
+
+    run_pending_table_vacuums()
+
+
+@app.task(
+    bind=True,
+    queue="export",
+    time_limit=settings.CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT,
+)
+def run_debounced_tsvector_update(self, table_id: int):
+    """
+    Runs the merged `tsvector` update of a table once no update has been requested
+    for the debounce window, or the maximum delay has passed. Reschedules itself
+    until then.
+
+    :param table_id: The ID of the table we'd like to update the tsvectors for.
+    """
+
+    from baserow_dynamic_table.search.scheduler import (
+        claim_pending_tsvector_update,
+        run_pending_tsvector_update,
+    )
+
+    # An eager task can't wait, otherwise it would reschedule itself forever.
+    pending, delay = claim_pending_tsvector_update(
+        table_id, force=self.request.is_eager
+    )
+    if pending is None:
+        if delay > 0:
+            self.apply_async((table_id,), countdown=delay)
+        return
+
+    try:
+        run_pending_tsvector_update(pending)
+    except PostgresFullTextSearchDisabledException:
+        logger.debug(f"Postgres full-text search is disabled.")
+
+
+@app.on_after_finalize.connect
+def setup_periodic_tasks(sender, **kwargs):
+    sender.add_periodic_task(
+        settings.TABLE_VACUUM_INTERVAL_SECONDS,
+        run_pending_table_vacuums_job.s(),
+    )
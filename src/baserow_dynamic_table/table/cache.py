@@ -65,6 +65,12 @@ def clear_generated_model_cache():
 
 
 def invalidate_table_in_model_cache(table_id: int):
+    from baserow_dynamic_table.rows.cache import invalidate_table_in_row_cache
+
+    # A schema change can also change the values of the existing rows, for example
+    # when the type of field is converted.
+    invalidate_table_in_row_cache(table_id)
+
     if settings.BASEROW_DISABLE_MODEL_CACHE:
         return None
 
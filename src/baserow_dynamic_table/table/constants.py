@@ -17,3 +17,14 @@ def get_tsv_vector_field_name(field_id) -> str:
 # search tsv update.
 ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME = "needs_background_update"
 TSV_FIELD_PREFIX = "tsv_field"
+
+# Tables either store a `tsvector` column per field, or a single combined `tsvector`
+# column per row in which the lexemes of every field are preceded by a marker lexeme
+# containing the field id. See `SearchHandler.set_tsvector_layout` for more details.
+TSVECTOR_LAYOUT_PER_FIELD = "per_field"
+TSVECTOR_LAYOUT_COMBINED = "combined"
+TSV_ROW_COLUMN_NAME = "tsv_row"
+
+
+def get_tsv_row_field_marker(field_id) -> str:
+    return f"_f{field_id}"
@@ -3,15 +3,18 @@ from typing import Any, Dict, List, NewType, Optional, Tuple, cast
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import DatabaseError, ProgrammingError
+from django.db import DatabaseError, ProgrammingError, connection, transaction
 from django.db.models import QuerySet, Sum
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from loguru import logger
+from psycopg2 import sql
 
+from baserow_dynamic_table.core.db import get_estimated_row_count_of_query
 from baserow_dynamic_table.core.utils import (
     Progress,
     find_unused_name,
+    grouper,
 )
 from baserow_dynamic_table.db.schema import safe_django_schema_editor
 from baserow_dynamic_table.fields.constants import (
@@ -37,7 +40,14 @@ from .exceptions import (
     TableDoesNotExist,
     TableNotInDatabase,
 )
-from .models import Table, get_row_needs_background_update_index
+from .models import (
+    RowCount,
+    Table,
+    TableRowCountDelta,
+    count_or_estimate_rows,
+    get_row_needs_background_update_index,
+)
+from .row_counts import get_pending_row_count_deltas
 
 BATCH_SIZE = 1024
 
@@ -183,6 +193,10 @@ class TableHandler:
             order=last_order,
             name=name,
             needs_background_update_column_added=True,
+            # A new table is empty, so the row count can be maintained by the
+            # row count deltas right away.
+            row_count=0,
+            row_count_updated_at=timezone.now(),
         )
 
         # Let's create the fields before creating the model so that the whole
@@ -198,7 +212,7 @@ class TableHandler:
                 order=index,
                 primary=index == 0,
                 name=name,
-                tsvector_column_created=table.tsvectors_are_supported,
+                tsvector_column_created=table.per_field_tsvectors_are_supported,
                 **field_config,
             )
             if field_options:
@@ -458,25 +472,135 @@ class TableHandler:
         TrashHandler.trash(user, table.database.workspace, table.database, table)
 
     @classmethod
-    def count_rows(cls) -> int:
+    def _get_tables_to_count(cls) -> QuerySet:
+        return Table.objects.filter(database__workspace__template__isnull=True)
+
+    @classmethod
+    def get_row_count_shards(cls, shard_size: int) -> List[Tuple[int, int]]:
+        """
+        Splits the tables that must be counted into ranges of table ids, each
+        containing at most `shard_size` tables. Every shard can be counted
+        independently by calling `count_rows` with the min and max table id.
+
+        :param shard_size: The maximum number of tables per shard.
+        :return: A list of inclusive `(min_table_id, max_table_id)` tuples.
+        """
+
+        table_ids = (
+            cls._get_tables_to_count()
+            .order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=10_000)
+        )
+        return [(chunk[0], chunk[-1]) for chunk in grouper(shard_size, table_ids)]
+
+    @staticmethod
+    def _count_rows_of_table(
+        table: Table, estimate_threshold: Optional[int] = None
+    ) -> Tuple[RowCount, List[int]]:
+        """
+        Counts the non trashed rows of the table with raw SQL, which avoids having
+        to generate the model of every table. Follows the same rules as
+        `TableModelQuerySet.estimated_count`.
+
+        Also returns the ids of the pending row count deltas of the table which are
+        included in the count. An exact count selects them in the same statement, so
+        that both see the same snapshot. A delta is then included exactly when the
+        rows it has been recorded for are counted.
+        """
+
+        table_name = table.get_database_table_name()
+        delta_ids_query = sql.SQL(
+            "SELECT {id} FROM {deltas} WHERE {table_id} = {value}"
+        ).format(
+            id=sql.Identifier("id"),
+            deltas=sql.Identifier(TableRowCountDelta._meta.db_table),
+            table_id=sql.Identifier("table_id"),
+            value=sql.Literal(table.id),
+        )
+        included_delta_ids = []
+
+        def rows_query(columns: str) -> sql.Composed:
+            return sql.SQL("SELECT {columns} FROM {table} WHERE NOT {trashed}").format(
+                columns=sql.SQL(columns),
+                table=sql.Identifier(table_name),
+                trashed=sql.Identifier("trashed"),
+            )
+
+        def count() -> int:
+            nonlocal included_delta_ids
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("SELECT ({count}), ARRAY({delta_ids})").format(
+                        count=rows_query("count(*)"), delta_ids=delta_ids_query
+                    )
+                )
+                row_count, included_delta_ids = cursor.fetchone()
+            return row_count
+
+        def estimate() -> int:
+            nonlocal included_delta_ids
+            # The planner estimate isn't based on a snapshot, so the deltas which
+            # are visible right now are considered to be included.
+            with connection.cursor() as cursor:
+                cursor.execute(delta_ids_query)
+                included_delta_ids = [delta_id for delta_id, in cursor.fetchall()]
+            return get_estimated_row_count_of_query(rows_query("1"))
+
+        row_count = count_or_estimate_rows(
+            table_name, count=count, estimate=estimate, threshold=estimate_threshold
+        )
+        return row_count, included_delta_ids
+
+    @classmethod
+    def count_rows(
+        cls,
+        estimate_threshold: Optional[int] = None,
+        min_table_id: Optional[int] = None,
+        max_table_id: Optional[int] = None,
+    ) -> int:
         """
         Counts how many rows each user table has and stores the count
-        for later reference.
+        for later reference. Tables which are expected to be larger than the
+        estimate threshold are not counted exactly, the Postgres row estimate is
+        stored instead and `row_count_is_estimate` is set.
+
+        :param estimate_threshold: The number of rows above which the count of a
+            table is estimated. Defaults to `settings.BASEROW_COUNT_ESTIMATE_THRESHOLD`.
+        :param min_table_id: If provided, only tables with an id greater than or
+            equal to this are counted. Used to count a single shard.
+        :param max_table_id: If provided, only tables with an id lower than or
+            equal to this are counted. Used to count a single shard.
         :returns: The number of tables counted.
         """
 
         chunk_size = 200
+        tables = cls._get_tables_to_count()
+        if min_table_id is not None:
+            tables = tables.filter(id__gte=min_table_id)
+        if max_table_id is not None:
+            tables = tables.filter(id__lte=max_table_id)
+
         tables_to_store = []
+        # The ids of the pending row count deltas which are included in the new
+        # counts, and must be deleted when the counts are stored.
+        included_delta_ids = []
+        # The `row_count` of every table before it was counted.
+        previous_row_counts = {}
         time = timezone.now()
         i = 0
-        for table in Table.objects.filter(
-            database__workspace__template__isnull=True
-        ).iterator(chunk_size=chunk_size):
+        tables = tables.only("id", "row_count").order_by("id")
+        for table in tables.iterator(chunk_size=chunk_size):
             try:
-                count = table.get_model(field_ids=[]).objects.count()
-                table.row_count = count
+                previous_row_counts[table.id] = table.row_count
+                row_count, delta_ids = cls._count_rows_of_table(
+                    table, estimate_threshold
+                )
+                table.row_count = row_count.count
+                table.row_count_is_estimate = not row_count.exact
                 table.row_count_updated_at = time
                 tables_to_store.append(table)
+                included_delta_ids.extend(delta_ids)
             except ProgrammingError as e:
                 if f'"database_table_{table.id}" does not exist' in str(e):
                     logger.warning(f"Error while counting rows {e}")
@@ -484,20 +608,73 @@ class TableHandler:
                     raise e
 
             # This makes sure we don't pollute the memory
-            if i % chunk_size == 0:
-                Table.objects.bulk_update(
-                    tables_to_store, ["row_count", "row_count_updated_at"]
+            if len(tables_to_store) >= chunk_size:
+                cls._store_row_counts(
+                    tables_to_store, included_delta_ids, previous_row_counts
                 )
                 tables_to_store = []
+                included_delta_ids = []
+                previous_row_counts = {}
             i += 1
 
         if len(tables_to_store) > 0:
-            Table.objects.bulk_update(
-                tables_to_store, ["row_count", "row_count_updated_at"]
+            cls._store_row_counts(
+                tables_to_store, included_delta_ids, previous_row_counts
             )
 
         return i
 
+    @staticmethod
+    def _store_row_counts(
+        tables: List[Table],
+        included_delta_ids: List[int],
+        previous_row_counts: Dict[int, Optional[int]],
+    ):
+        """
+        Stores the counted row counts and deletes the row count deltas which were
+        already included in the count, so that they're not added twice. Deltas
+        which were committed after a table has been counted are kept, even if
+        their id is lower than the id of an included one.
+
+        `flush_row_count_deltas` can add deltas which are not included in the count
+        to the `row_count` while the table is being counted. Storing the count
+        would then lose them, so the tables whose `row_count` has changed since
+        they were counted are skipped. Their deltas are kept, and the next run
+        counts them again.
+
+        :param previous_row_counts: The `row_count` of every table before it was
+            counted.
+        """
+
+        with transaction.atomic():
+            # The deltas are locked before the tables, in the same order as the
+            # flush, so that both can't wait for each other.
+            list(
+                TableRowCountDelta.objects.select_for_update()
+                .filter(id__in=included_delta_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            row_counts = dict(
+                Table.objects.select_for_update(of=("self",))
+                .filter(id__in=[table.id for table in tables])
+                .order_by("id")
+                .values_list("id", "row_count")
+            )
+            changed_table_ids = {
+                table_id
+                for table_id, row_count in row_counts.items()
+                if row_count != previous_row_counts[table_id]
+            }
+            Table.objects.bulk_update(
+                [table for table in tables if table.id not in changed_table_ids],
+                ["row_count", "row_count_updated_at", "row_count_is_estimate"],
+            )
+            if included_delta_ids:
+                TableRowCountDelta.objects.filter(id__in=included_delta_ids).exclude(
+                    table_id__in=changed_table_ids
+                ).delete()
+
     @classmethod
     def get_total_row_count_of_workspace(cls, workspace_id: int) -> int:
         """
@@ -508,12 +685,12 @@ class TableHandler:
         :return: The total row count of all tables in the given workspace.
         """
 
-        return (
-            Table.objects.filter(database__workspace_id=workspace_id).aggregate(
-                Sum("row_count")
-            )["row_count__sum"]
-            or 0
+        tables = Table.objects.filter(
+            database__workspace_id=workspace_id, row_count__isnull=False
         )
+        row_count = tables.aggregate(Sum("row_count"))["row_count__sum"] or 0
+        pending_deltas = get_pending_row_count_deltas(tables.values("id"))
+        return max(row_count + sum(pending_deltas.values()), 0)
 
     def create_needs_background_update_field(self, table: "Table") -> None:
         """
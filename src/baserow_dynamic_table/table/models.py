@@ -1,21 +1,49 @@
 import itertools
+import operator
 import re
 from collections import defaultdict
+from functools import reduce
 from types import MethodType
-from typing import Generator, Iterable, List, Optional, Type, TypedDict, Union
+from typing import (
+    Callable,
+    Generator,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Type,
+    TypedDict,
+    Union,
+)
 
 from django.apps import apps
 from django.conf import settings
 from django.contrib.postgres.indexes import GinIndex
-from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorExact,
+    SearchVectorField,
+)
 from django.core.exceptions import FieldDoesNotExist as DjangoFieldDoesNotExist
 from django.db import models
 from django.db.models import Field as DjangoModelFieldClass
-from django.db.models import JSONField, Q, QuerySet, Value
+from django.db.models import (
+    Expression,
+    F,
+    FloatField,
+    JSONField,
+    Q,
+    QuerySet,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
 from loguru import logger
 
 from baserow_dynamic_table.core.db import (
     MultiFieldPrefetchQuerysetMixin,
+    get_estimated_row_count_of_queryset,
+    get_estimated_row_count_of_table,
     specific_iterator,
 )
 from baserow_dynamic_table.core.fields import AutoTrueBooleanField
@@ -45,6 +73,17 @@ from baserow_dynamic_table.fields.registries import (
     FieldType,
     field_type_registry,
 )
+from baserow_dynamic_table.search.cache import (
+    get_cached_search_ids,
+    get_search_cache_key,
+    search_cache_enabled,
+    search_cache_stats,
+    set_cached_search_ids,
+)
+from baserow_dynamic_table.search.expressions import (
+    TrigramContains,
+    TsvRowFieldSlice,
+)
 from baserow_dynamic_table.search.handler import (
     SearchHandler,
     SearchModes,
@@ -56,6 +95,9 @@ from baserow_dynamic_table.table.cache import (
 from baserow_dynamic_table.table.constants import (
     ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME,
     TSV_FIELD_PREFIX,
+    TSV_ROW_COLUMN_NAME,
+    TSVECTOR_LAYOUT_COMBINED,
+    TSVECTOR_LAYOUT_PER_FIELD,
     USER_TABLE_DATABASE_NAME_PREFIX,
 )
 
@@ -63,6 +105,51 @@ extract_filter_sections_regex = re.compile(r"filter__(.+)__(.+)$")
 field_id_regex = re.compile(r"field_(\d+)$")
 
 
+class RowCount(NamedTuple):
+    count: int
+    exact: bool
+
+
+def count_or_estimate_rows(
+    table_name: str,
+    count: Callable[[], int],
+    estimate: Callable[[], int],
+    threshold: Optional[int] = None,
+) -> RowCount:
+    """
+    Decides whether the rows of a query on the provided database table can be
+    counted exactly or whether the Postgres planner estimate must be used because
+    the table is too large.
+
+    :param table_name: The name of the database table that is queried.
+    :param count: Callable returning the exact count of the query.
+    :param estimate: Callable returning the planner estimate of the query.
+    :param threshold: The number of rows above which the count is estimated.
+        Defaults to `settings.BASEROW_COUNT_ESTIMATE_THRESHOLD`. A value of 0 or
+        lower always results in an exact count.
+    :return: The count and whether it is exact or an estimate.
+    """
+
+    if threshold is None:
+        threshold = settings.BASEROW_COUNT_ESTIMATE_THRESHOLD
+
+    if threshold <= 0:
+        return RowCount(count(), True)
+
+    # The statistics of the whole table are the cheapest to get. A query can never
+    # return more rows than the table contains, so if the table itself is small
+    # enough, there is no need to ask the planner.
+    table_estimate = get_estimated_row_count_of_table(table_name)
+    if table_estimate is None or table_estimate < threshold:
+        return RowCount(count(), True)
+
+    estimated = estimate()
+    if estimated < threshold:
+        return RowCount(count(), True)
+
+    return RowCount(estimated, False)
+
+
 def get_row_needs_background_update_index(table):
     return models.Index(
         fields=[ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME],
@@ -90,7 +177,10 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
         if fields is not None:
             for f in fields:
                 field_name = getattr(f, "attname", f)
-                if TSV_FIELD_PREFIX not in field_name:
+                if (
+                    TSV_FIELD_PREFIX not in field_name
+                    and field_name != TSV_ROW_COLUMN_NAME
+                ):
                     insertable_fields.append(f)
         else:
             insertable_fields = None
@@ -109,29 +199,185 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
         if not input_search or not input_search.strip():
             return self
 
+        search_query = self._get_pg_search_query(input_search)
+        if search_query is None:
+            return self.filter(id__in=[])
+
+        return self._filter_by_pg_search_query(
+            input_search, search_query, only_search_by_field_ids
+        )
+
+    def pg_search_ranked(
+        self,
+        input_search: str,
+        only_search_by_field_ids: Optional[Iterable[int]] = None,
+        max_candidates: Optional[int] = None,
+    ) -> QuerySet:
+        """
+        Narrows the queryset down using Postgres full-text search like `pg_search`,
+        but annotates the rows with a `search_rank` computed by `ts_rank_cd` and
+        orders them by it, most relevant first. The queryset is meant to be sliced
+        to get the top-k rows without counting all the matches.
+
+        Ranking a row requires reading its `tsvector`, so on broad queries only the
+        first `max_candidates` matches found by the index are ranked. This stops
+        the scan early at the cost of an approximate top-k.
+
+        :param input_search: The raw search query.
+        :param only_search_by_field_ids: Only field ids in this iterable are searched
+            and used to rank the rows.
+        :param max_candidates: The maximum number of matching rows to rank. Defaults
+            to `settings.BASEROW_RANKED_SEARCH_MAX_CANDIDATES`. A value of 0 or
+            lower ranks all the matching rows.
+        :return: The ranked queryset.
+        """
+
+        if not input_search or not input_search.strip():
+            return self
+
+        search_query = self._get_pg_search_query(input_search)
+        if search_query is None:
+            return self.filter(id__in=[])
+
+        if max_candidates is None:
+            max_candidates = settings.BASEROW_RANKED_SEARCH_MAX_CANDIDATES
+        if only_search_by_field_ids is not None:
+            only_search_by_field_ids = set(only_search_by_field_ids)
+
+        queryset = self._filter_by_pg_search_query(
+            input_search, search_query, only_search_by_field_ids
+        )
+        if max_candidates > 0:
+            candidate_ids = queryset.order_by().values("id")[:max_candidates]
+            queryset = self.filter(id__in=candidate_ids)
+
+        return queryset.annotate(
+            search_rank=self._get_pg_search_rank(
+                search_query, only_search_by_field_ids
+            )
+        ).order_by("-search_rank", "order", "id")
+
+    def _get_pg_search_query(self, input_search: str) -> Optional[SearchQuery]:
         sanitized_search = SearchHandler.escape_postgres_query(input_search)
         logger.debug(f"Raw query: {input_search}. Sanitized query: {sanitized_search}")
 
         if len(sanitized_search) == 0:
-            return self.filter(id__in=[])
+            return None
 
         # We use "raw" as we can't use XXX, so if someone had a cell for "cheese" and
         # searches for "chee", we need to be able to match it with "$$chee$$:*"
-        search_query = SearchQuery(
+        return SearchQuery(
             sanitized_search,
             search_type="raw",
             config=SearchHandler.search_config(),
         )
 
+    def _filter_by_pg_search_query(
+        self,
+        input_search: str,
+        search_query: SearchQuery,
+        only_search_by_field_ids: Optional[Iterable[int]] = None,
+    ) -> QuerySet:
         filter_builder = FilterBuilder(filter_type=FILTER_TYPE_OR)
 
         self._add_exact_id_search(filter_builder, input_search)
 
-        for field in self.model.get_searchable_fields():
-            if only_search_by_field_ids is None or field.id in only_search_by_field_ids:
-                filter_builder.filter(Q(**{field.tsv_db_column: search_query}))
+        if self.model.baserow_table.uses_combined_tsvector:
+            self._add_combined_tsvector_search(
+                filter_builder, search_query, only_search_by_field_ids
+            )
+        else:
+            for field in self.model.get_searchable_fields():
+                if (
+                    only_search_by_field_ids is None
+                    or field.id in only_search_by_field_ids
+                ):
+                    filter_builder.filter(Q(**{field.tsv_db_column: search_query}))
         return filter_builder.apply_to_queryset(self)
 
+    def _add_combined_tsvector_search(
+        self,
+        filter_builder: FilterBuilder,
+        search_query: SearchQuery,
+        only_search_by_field_ids: Optional[Iterable[int]] = None,
+    ):
+        """
+        Searches the single `tsvector` column of a table using the combined layout.
+        The GIN index of the column narrows the rows down first, and only if the
+        search must be restricted to some fields, the lexemes of those fields are
+        sliced out of the matching rows to check them again. The lexemes of
+        trashed fields are only removed when the row `tsvector` is updated again,
+        so they're excluded in the same way.
+        """
+
+        searchable_field_ids = [f.id for f in self.model.get_searchable_fields()]
+        field_ids_to_search = None
+        if only_search_by_field_ids is not None:
+            only_search_by_field_ids = set(only_search_by_field_ids)
+            field_ids_to_search = [
+                field_id
+                for field_id in searchable_field_ids
+                if field_id in only_search_by_field_ids
+            ]
+        elif self.model._trashed_field_objects:
+            field_ids_to_search = searchable_field_ids
+
+        if field_ids_to_search is None:
+            filter_builder.filter(Q(**{TSV_ROW_COLUMN_NAME: search_query}))
+        elif field_ids_to_search:
+            filter_builder.filter(
+                Q(**{TSV_ROW_COLUMN_NAME: search_query})
+                & Q(
+                    SearchVectorExact(
+                        TsvRowFieldSlice(F(TSV_ROW_COLUMN_NAME), field_ids_to_search),
+                        search_query,
+                    )
+                )
+            )
+
+    def _get_pg_search_rank(
+        self,
+        search_query: SearchQuery,
+        only_search_by_field_ids: Optional[Iterable[int]] = None,
+    ) -> Expression:
+        """
+        Returns the `ts_rank_cd` of the search query for the searched `tsvector`
+        columns. With a column per field the ranks of the fields are summed, and
+        the rank of the primary field is multiplied by 10, just like the weight of
+        the primary field in the combined layout.
+        """
+
+        empty_vector = Cast(Value(""), SearchVectorField())
+        searched_fields = [
+            field
+            for field in self.model.get_searchable_fields()
+            if only_search_by_field_ids is None
+            or field.id in only_search_by_field_ids
+        ]
+
+        if self.model.baserow_table.uses_combined_tsvector:
+            vector = F(TSV_ROW_COLUMN_NAME)
+            if only_search_by_field_ids is not None:
+                vector = TsvRowFieldSlice(vector, [f.id for f in searched_fields])
+            return SearchRank(
+                Coalesce(vector, empty_vector), search_query, cover_density=True
+            )
+
+        ranks = []
+        for field in searched_fields:
+            rank = SearchRank(
+                Coalesce(F(field.tsv_db_column), empty_vector),
+                search_query,
+                cover_density=True,
+            )
+            if field.primary:
+                rank = rank * Value(10.0)
+            ranks.append(rank)
+
+        if not ranks:
+            return Value(0.0, output_field=FloatField())
+        return reduce(operator.add, ranks)
+
     def _add_exact_id_search(self, filter_builder, input_search):
         try:
             # Search for the row ID if the `input_search` can be cast to an integer.
@@ -145,6 +391,26 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
     def count(self):
         return super().count()
 
+    def estimated_count(self, threshold: Optional[int] = None) -> RowCount:
+        """
+        Counts the rows of the queryset, but returns the row estimate of the Postgres
+        planner instead of running a `SELECT COUNT(*)` if the table is large. An exact
+        count is only done if the table, or the filtered queryset, is expected to
+        contain less rows than the threshold.
+
+        :param threshold: The number of rows above which the count is estimated.
+            Defaults to `settings.BASEROW_COUNT_ESTIMATE_THRESHOLD`. A value of 0 or
+            lower always results in an exact count.
+        :return: The count and whether it is exact or an estimate.
+        """
+
+        return count_or_estimate_rows(
+            self.model._meta.db_table,
+            count=self.count,
+            estimate=lambda: get_estimated_row_count_of_queryset(self),
+            threshold=threshold,
+        )
+
     def enhance_by_fields(self):
         """
         Enhances the queryset based on the `enhance_queryset_in_bulk` for each unique
@@ -170,6 +436,7 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
         search: str,
         only_search_by_field_ids: Optional[Iterable[int]] = None,
         search_mode: Optional[SearchModes] = None,
+        use_cache: bool = True,
     ):
         """
         Performs a very broad search across all supported fields with the given search
@@ -183,7 +450,12 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
             ignored and not be filtered.
         :param search_mode: In `MODE_COMPAT` we will use the old search method, using
             the LIKE operator on each column. In `MODE_FT_WITH_COUNT`  we will switch
-            to using Postgres full-text search.
+            to using Postgres full-text search. In `MODE_FT_RANKED` the full-text
+            search results are ordered by relevance, see `pg_search_ranked`. In
+            `MODE_TRIGRAM` the text-like fields are searched for a substring, see
+            `trigram_search`.
+        :param use_cache: Whether the ids of the matching rows can be read from and
+            stored in the search cache if it's enabled, see `_cached_search`.
         :return: The queryset containing the search queries.
         :rtype: QuerySet
         """
@@ -191,6 +463,15 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
         if not search_mode:
             search_mode = settings.DEFAULT_SEARCH_MODE
 
+        # The ranked mode orders the rows by relevance, which the cached ids can't
+        # preserve.
+        if (
+            use_cache
+            and search_cache_enabled()
+            and search_mode != SearchModes.MODE_FT_RANKED
+        ):
+            return self._cached_search(search, only_search_by_field_ids, search_mode)
+
         # If we are searching with Postgres full text search (whether with
         # or without a COUNT)...
         if search_mode == SearchModes.MODE_FT_WITH_COUNT:
@@ -201,11 +482,62 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
             else:
                 # Otherwise we'll fall back to compat search.
                 return self.compat_search(search, only_search_by_field_ids)
+        elif search_mode == SearchModes.MODE_FT_RANKED:
+            if self.model.baserow_table.tsvectors_are_supported:
+                return self.pg_search_ranked(search, only_search_by_field_ids)
+            else:
+                # The compat search can't rank, the rows keep their order.
+                return self.compat_search(search, only_search_by_field_ids)
+        elif search_mode == SearchModes.MODE_TRIGRAM:
+            return self.trigram_search(search, only_search_by_field_ids)
         elif search_mode == SearchModes.MODE_COMPAT:
             return self.compat_search(search, only_search_by_field_ids)
         else:
             raise NotImplementedError(f"Unsupported search_mode {search_mode}.")
 
+    def _cached_search(
+        self,
+        search: str,
+        only_search_by_field_ids: Optional[Iterable[int]],
+        search_mode: SearchModes,
+    ):
+        """
+        Filters the queryset by the ids of the rows matching the search, which are
+        cached per table, model version and write epoch, so that repeating the same
+        search or paging through its results doesn't have to search again. Searches
+        matching more than `BASEROW_SEARCH_CACHE_MAX_IDS` rows are not cached.
+        """
+
+        searched_field_ids = self.model._field_objects.keys()
+        if only_search_by_field_ids is not None:
+            searched_field_ids = set(searched_field_ids) & set(only_search_by_field_ids)
+
+        key = get_search_cache_key(
+            self.model.baserow_table,
+            SearchModes(search_mode).value,
+            search,
+            searched_field_ids,
+        )
+        row_ids = get_cached_search_ids(key)
+        if row_ids is None:
+            max_ids = settings.BASEROW_SEARCH_CACHE_MAX_IDS
+            row_ids = list(
+                self.model.objects.all()
+                .search_all_fields(
+                    search, only_search_by_field_ids, search_mode, use_cache=False
+                )
+                .order_by()
+                .values_list("id", flat=True)[: max_ids + 1]
+            )
+            if len(row_ids) > max_ids:
+                search_cache_stats.increment("too_large")
+                return self.search_all_fields(
+                    search, only_search_by_field_ids, search_mode, use_cache=False
+                )
+            set_cached_search_ids(key, row_ids)
+
+        return self.filter(id__in=row_ids)
+
     def compat_search(self, search: str, only_search_by_field_ids=None):
         """
         Responsible for executing our original search behaviour, using the
@@ -234,6 +566,41 @@ class TableModelQuerySet(MultiFieldPrefetchQuerysetMixin, models.QuerySet):
 
         return filter_builder.apply_to_queryset(self)
 
+    def trigram_search(self, search: str, only_search_by_field_ids=None):
+        """
+        Searches the text-like fields of the table for the given substring using the
+        `ILIKE` operator, which can use the `pg_trgm` GIN indexes created by
+        `SearchHandler.set_trigram_indexes_enabled`. Other field types are not
+        searched because a single non indexed condition would result in a full
+        table scan again.
+        """
+
+        search = search.strip()
+        if not search:
+            return self
+
+        filter_builder = FilterBuilder(filter_type=FILTER_TYPE_OR)
+
+        self._add_exact_id_search(filter_builder, search)
+        searched_field_count = 0
+        for field_object in self.model._field_objects.values():
+            if (
+                only_search_by_field_ids is not None
+                and field_object["field"].id not in only_search_by_field_ids
+            ):
+                continue
+            if field_object["type"].can_be_trigram_indexed:
+                filter_builder.filter(
+                    Q(TrigramContains(F(field_object["name"]), search))
+                )
+                searched_field_count += 1
+
+        if searched_field_count == 0:
+            # Without any searchable field, only the row id can still match.
+            filter_builder.filter(Q(id__in=[]))
+
+        return filter_builder.apply_to_queryset(self)
+
     def _get_field_name(self, field: str) -> str:
         """
         Helper method for parsing a field name from a string
@@ -482,6 +849,8 @@ class TableModelTrashAndObjectsManager(models.Manager):
             except DjangoFieldDoesNotExist:
                 # THe model has been generated without TSVs so no need to defer.
                 pass
+        if self.model.baserow_table.uses_combined_tsvector:
+            qs = qs.defer(TSV_ROW_COLUMN_NAME)
         return qs
 
 
@@ -511,7 +880,11 @@ class GeneratedTableModel(HierarchicalModelMixin, models.Model):
         """
 
         if update_fields is not None:
-            update_fields = [f for f in update_fields if TSV_FIELD_PREFIX not in f]
+            update_fields = [
+                f
+                for f in update_fields
+                if TSV_FIELD_PREFIX not in f and f != TSV_ROW_COLUMN_NAME
+            ]
         else:
             update_fields = None
         return super()._do_update(
@@ -578,6 +951,10 @@ class GeneratedTableModel(HierarchicalModelMixin, models.Model):
         corresponding tsvector column.
         """
 
+        if cls.baserow_table.uses_combined_tsvector:
+            # The fields are indexed in the combined row `tsvector` column instead.
+            return []
+
         return [
             field for field in cls.get_fields() if not field.tsvector_column_created
         ]
@@ -607,11 +984,14 @@ class GeneratedTableModel(HierarchicalModelMixin, models.Model):
         :return: A generator of Field.
         """
 
+        combined_tsvector = cls.baserow_table.uses_combined_tsvector
         for field_object in cls.get_field_objects(include_trash):
             field_type = field_object["type"]
             field = field_object["field"]
 
-            if field.tsvector_column_created and field_type.is_searchable(field):
+            if (
+                field.tsvector_column_created or combined_tsvector
+            ) and field_type.is_searchable(field):
                 yield field
 
     @classmethod
@@ -689,12 +1069,32 @@ class Table(
     name = models.CharField(max_length=255)
     row_count = models.PositiveIntegerField(null=True)
     row_count_updated_at = models.DateTimeField(null=True)
+    row_count_is_estimate = models.BooleanField(
+        default=False,
+        help_text="Indicates whether the row count is an estimate based on the "
+        "Postgres statistics instead of an exact count.",
+    )
     version = models.TextField(default="initial_version")
     needs_background_update_column_added = models.BooleanField(
         default=False,
         help_text="Indicates whether the table has had the background_update_needed "
         "column added.",
     )
+    tsvector_layout = models.CharField(
+        max_length=16,
+        choices=[
+            (TSVECTOR_LAYOUT_PER_FIELD, "Per field"),
+            (TSVECTOR_LAYOUT_COMBINED, "Combined"),
+        ],
+        default=TSVECTOR_LAYOUT_PER_FIELD,
+        help_text="Indicates whether the full-text search data is stored in a "
+        "`tsvector` column per field, or in a single combined `tsvector` column.",
+    )
+    trigram_indexes_enabled = models.BooleanField(
+        default=False,
+        help_text="Indicates whether the text-like columns of the table have a "
+        "`pg_trgm` GIN index used by the trigram search mode.",
+    )
 
     class Meta:
         ordering = ("order",)
@@ -706,6 +1106,18 @@ class Table(
             and self.needs_background_update_column_added
         )
 
+    @property
+    def uses_combined_tsvector(self) -> bool:
+        return self.tsvector_layout == TSVECTOR_LAYOUT_COMBINED
+
+    @property
+    def per_field_tsvectors_are_supported(self) -> bool:
+        return self.tsvectors_are_supported and not self.uses_combined_tsvector
+
+    @property
+    def tsv_row_index_name(self) -> str:
+        return f"tbl_tsv_row_{self.id}_idx"
+
     @property
     def tsv_id_column_idx_name(self) -> str:
         return f"tsv_id_idx_{self.id}"
@@ -932,6 +1344,13 @@ class Table(
         return model
 
     def _add_search_tsvector_fields_to_model(self, field_attrs, indexes, force_add):
+        if self.uses_combined_tsvector:
+            field_attrs[TSV_ROW_COLUMN_NAME] = SearchVectorField(null=True)
+            indexes.append(
+                GinIndex(fields=[TSV_ROW_COLUMN_NAME], name=self.tsv_row_index_name)
+            )
+            return
+
         field_objects = field_attrs["_field_objects"]
         trashed_field_objects = field_attrs["_trashed_field_objects"]
         for field_object in itertools.chain(
@@ -1091,3 +1510,20 @@ class Table(
     # tables.
     def get_collision_safe_order_id_idx_name(self):
         return f"tbl_order_id_{self.id}_idx"
+
+
+class TableRowCountDelta(models.Model):
+    """
+    A pending change to the `row_count` of a table. A new delta is inserted in the
+    same transaction as the rows being created, trashed or restored, which avoids
+    row lock contention on the `Table` itself. The deltas are periodically summed
+    into `Table.row_count` and deleted by `flush_row_count_deltas`.
+    """
+
+    table = models.ForeignKey(
+        Table, on_delete=models.CASCADE, related_name="row_count_deltas"
+    )
+    delta = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["table", "id"])]
@@ -0,0 +1,106 @@
+"""
+This file is responsible for keeping `Table.row_count` up to date between the runs
+of the periodic `count_rows` job.
+
+Every time rows are created, trashed or restored a `TableRowCountDelta` is inserted
+in the same transaction, so a rolled back change never affects the count. Inserting
+instead of updating the table row means concurrent writes to the same table don't
+have to wait for each other.
+
+The deltas are periodically summed and moved into `Table.row_count` by
+`flush_row_count_deltas`. Until that happens the pending deltas are included by
+`get_pending_row_count_deltas`, so the total row count is always accurate.
+
+Permanently deleting rows doesn't change the count because the rows were already
+subtracted when they were trashed.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+
+from baserow_dynamic_table.table.models import Table, TableRowCountDelta
+
+
+def record_row_count_change(table_id: int, delta: int):
+    """
+    Records that the number of non trashed rows of the table has changed. Must be
+    called in the same transaction as the change itself.
+
+    :param table_id: The id of the table whose row count has changed.
+    :param delta: The number of rows added, or removed if negative.
+    """
+
+    if delta == 0:
+        return
+
+    TableRowCountDelta.objects.create(table_id=table_id, delta=delta)
+
+
+def get_pending_row_count_deltas(table_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Returns the sum of the deltas which have not yet been flushed into the
+    `row_count` of the provided tables.
+
+    :param table_ids: The ids of the tables to get the pending deltas for.
+    :return: A dict containing the pending delta per table id. Tables without
+        pending deltas are not included.
+    """
+
+    return dict(
+        TableRowCountDelta.objects.filter(table_id__in=table_ids)
+        .values("table_id")
+        .annotate(total=Sum("delta"))
+        .values_list("table_id", "total")
+    )
+
+
+def flush_row_count_deltas(batch_size: int = None) -> int:
+    """
+    Sums the pending deltas per table, adds them to the `row_count` of the tables
+    and deletes them. Deltas of tables which have never been counted are dropped
+    because the next `count_rows` run will count them anyway. Locked deltas are
+    skipped, so it's safe to run this concurrently.
+
+    :param batch_size: The maximum number of deltas to process per transaction.
+        Defaults to `settings.BASEROW_ROW_COUNT_FLUSH_BATCH_SIZE`.
+    :return: The number of deltas that have been flushed.
+    """
+
+    if batch_size is None:
+        batch_size = settings.BASEROW_ROW_COUNT_FLUSH_BATCH_SIZE
+
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            deltas = list(
+                TableRowCountDelta.objects.select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", "table_id", "delta")[:batch_size]
+            )
+            if not deltas:
+                break
+
+            delta_per_table = defaultdict(int)
+            for _, table_id, delta in deltas:
+                delta_per_table[table_id] += delta
+
+            for table_id, delta in delta_per_table.items():
+                if delta == 0:
+                    continue
+                Table.objects_and_trash.filter(
+                    id=table_id, row_count__isnull=False
+                ).update(row_count=Greatest(F("row_count") + delta, Value(0)))
+
+            TableRowCountDelta.objects.filter(
+                id__in=[delta_id for delta_id, _, _ in deltas]
+            ).delete()
+
+        flushed += len(deltas)
+        if len(deltas) < batch_size:
+            break
+
+    return flushed
@@ -1,3 +1,5 @@
+import time
+
 from django.conf import settings
 from django.db import transaction
 from loguru import logger
@@ -7,13 +9,53 @@ from loguru import logger
 def run_row_count_job():
     """
     Runs the row count job to keep track of how many rows
-    are being used by each table.
+    are being used by each table. The tables are split into shards of table ids
+    which are counted in parallel by separate `count_rows_shard_job` tasks.
     """
 
     from baserow_dynamic_table.table.handler import TableHandler
 
     # TODO: settings to enable or disable this
-    TableHandler.count_rows()
+    shard_size = settings.BASEROW_ROW_COUNT_JOB_SHARD_SIZE
+    if shard_size <= 0:
+        TableHandler.count_rows()
+        return
+
+    shards = TableHandler.get_row_count_shards(shard_size)
+    for min_table_id, max_table_id in shards:
+        count_rows_shard_job.delay(min_table_id, max_table_id)
+    logger.info(f"Dispatched {len(shards)} row count shard(s).")
+
+
+@app.task(queue="export")
+def count_rows_shard_job(min_table_id: int, max_table_id: int):
+    """
+    Counts the rows of the tables with an id between the provided min and max
+    table id, both inclusive.
+    """
+
+    from baserow_dynamic_table.table.handler import TableHandler
+
+    start = time.perf_counter()
+    tables_counted = TableHandler.count_rows(
+        min_table_id=min_table_id, max_table_id=max_table_id
+    )
+    logger.info(
+        f"Counted the rows of {tables_counted} table(s) with ids {min_table_id} to "
+        f"{max_table_id} in {time.perf_counter() - start:.2f}s."
+    )
+
+
+@app.task(queue="export")
+def flush_row_count_deltas_job():
+    """
+    Moves the pending row count deltas into the `row_count` of the tables so that
+    the number of pending deltas stays small.
+    """
+
+    from baserow_dynamic_table.table.row_counts import flush_row_count_deltas
+
+    flush_row_count_deltas()
 
 
 @app.on_after_finalize.connect
@@ -22,6 +64,10 @@ def setup_periodic_tasks(sender, **kwargs):
         settings.baserow_dynamic_table_ROW_COUNT_JOB_CRONTAB,
         run_row_count_job.s(),
     )
+    sender.add_periodic_task(
+        settings.BASEROW_ROW_COUNT_FLUSH_INTERVAL_SECONDS,
+        flush_row_count_deltas_job.s(),
+    )
 
 
 @app.task(
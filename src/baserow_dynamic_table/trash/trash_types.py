@@ -14,7 +14,9 @@ from baserow_dynamic_table.fields.field_cache import FieldCache
 from baserow_dynamic_table.fields.handler import FieldHandler
 from baserow_dynamic_table.fields.models import Field
 from baserow_dynamic_table.fields.registries import field_type_registry
+from baserow_dynamic_table.rows.cache import invalidate_table_in_row_cache
 from baserow_dynamic_table.table.models import GeneratedTableModel, Table
+from baserow_dynamic_table.table.row_counts import record_row_count_change
 from baserow_dynamic_table.trash.exceptions import (
     RelatedTableTrashedException,
 )
@@ -262,6 +264,7 @@ class RowTrashableItemType(TrashableItemType):
         super().restore(trashed_item, trash_entry)
 
         table = self.get_parent(trashed_item)
+        record_row_count_change(table.id, 1)
 
         model = table.get_model()
 
@@ -286,9 +289,14 @@ class RowTrashableItemType(TrashableItemType):
                     path_to_starting_table,
                 )
         update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
 
         SearchHandler.field_value_updated_or_created(table)
 
+    def trash(self, item_to_trash, requesting_user, trash_entry: TrashEntry):
+        super().trash(item_to_trash, requesting_user, trash_entry)
+        record_row_count_change(item_to_trash.baserow_table_id, -1)
+
     def permanently_delete_item(self, row, trash_item_lookup_cache=None):
         row.delete()
 
@@ -378,7 +386,10 @@ class RowsTrashableItemType(TrashableItemType):
         rows_to_restore_queryset = table_model.objects_and_trash.filter(
             id__in=trashed_item.row_ids
         )
-        rows_to_restore_queryset.update(trashed=False)
+        restored_count = rows_to_restore_queryset.filter(trashed=True).update(
+            trashed=False
+        )
+        record_row_count_change(table.id, restored_count)
         rows_to_restore = rows_to_restore_queryset.enhance_by_fields()
         trashed_item.delete()
 
@@ -403,6 +414,7 @@ class RowsTrashableItemType(TrashableItemType):
                     path_to_starting_table,
                 )
         update_collector.apply_updates_and_get_updated_fields(field_cache)
+        invalidate_table_in_row_cache(table.id)
 
         SearchHandler.field_value_updated_or_created(table)
 
@@ -412,7 +424,10 @@ class RowsTrashableItemType(TrashableItemType):
         """
 
         table_model = self._get_table_model(item_to_trash.table_id)
-        table_model.objects.filter(id__in=item_to_trash.row_ids).update(trashed=True)
+        trashed_count = table_model.objects.filter(
+            id__in=item_to_trash.row_ids
+        ).update(trashed=True)
+        record_row_count_change(item_to_trash.table_id, -trashed_count)
 
     def permanently_delete_item(self, trashed_item, trash_item_lookup_cache=None):
         table_model = self._get_table_model(trashed_item.table_id)
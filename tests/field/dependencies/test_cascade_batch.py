@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import pytest
+
+from baserow_dynamic_table.fields.dependencies.batch import (
+    cascade_batch,
+    get_current_cascade_batch,
+    get_field_cache,
+    get_field_update_collector,
+)
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
+from baserow_dynamic_table.fields.dependencies.models import FieldDependency
+from baserow_dynamic_table.fields.dependencies.update_collector import (
+    FieldUpdateCollector,
+)
+from baserow_dynamic_table.rows.handler import RowHandler
+
+
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+@patch(
+    "baserow_dynamic_table.fields.dependencies.update_collector.FieldUpdateCollector"
+    ".apply_updates"
+)
+def test_cascade_batch_applies_the_updates_once_per_table(
+    mock_apply_updates, data_fixture
+):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    primary_field = data_fixture.create_text_field(table=table, primary=True)
+    link_field = data_fixture.create_link_row_field(link_row_table=table)
+    FieldDependency.objects.create(
+        dependency=primary_field, dependant=link_field, via=link_field
+    )
+    invalidate_field_dependency_graph([link_field.id])
+    handler = RowHandler()
+
+    with cascade_batch() as batch:
+        row_1 = handler.create_row(user, table, {f"field_{primary_field.id}": "a"})
+        row_2 = handler.create_row(user, table, {f"field_{primary_field.id}": "b"})
+        handler.update_row(user, table, row_1, {f"field_{primary_field.id}": "c"})
+
+        # Nested batches join the outer one.
+        with cascade_batch() as nested_batch:
+            assert nested_batch is batch
+
+        mock_apply_updates.assert_not_called()
+        assert list(batch.collectors.keys()) == [table.id]
+        assert get_field_cache() is batch.field_cache
+
+    mock_apply_updates.assert_called_once()
+    collector = batch.collectors[table.id]
+    assert collector._starting_row_ids == [row_1.id, row_2.id]
+    assert not collector.batched
+    assert get_current_cascade_batch() is None
+
+
+@pytest.mark.django_db
+@patch("baserow_dynamic_table.rows.handler.BATCH_SIZE", 1)
+@patch(
+    "baserow_dynamic_table.fields.dependencies.update_collector.FieldUpdateCollector"
+    ".apply_updates"
+)
+def test_import_rows_applies_the_updates_once(mock_apply_updates, data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    data_fixture.create_text_field(table=table, name="primary", primary=True)
+    data_fixture.create_formula_field(
+        table=table, formula="field('primary')", formula_type="text"
+    )
+
+    rows, report = RowHandler().import_rows(
+        user, table, [["a"], ["b"], ["c"]], validate=False, send_realtime_update=False
+    )
+
+    assert len(rows) == 3
+    assert report == {}
+    mock_apply_updates.assert_called_once()
+    assert get_current_cascade_batch() is None
+
+
+@pytest.mark.django_db
+def test_cascade_batch_is_discarded_on_errors(data_fixture):
+    table = data_fixture.create_database_table()
+
+    with pytest.raises(ValueError):
+        with cascade_batch():
+            get_field_update_collector(table, starting_row_ids=[1])
+            raise ValueError()
+
+    assert get_current_cascade_batch() is None
+    assert not get_field_update_collector(table).batched
+
+
+@pytest.mark.django_db
+def test_add_starting_rows_merges_the_rows(data_fixture):
+    table = data_fixture.create_database_table()
+
+    collector = FieldUpdateCollector(
+        table, starting_row_ids=[1, 2], deleted_m2m_rels_per_link_field={10: {1}}
+    )
+    collector.add_starting_rows([2, 3], {10: {2}, 11: {3}})
+    assert collector._starting_row_ids == [1, 2, 3]
+    assert collector._deleted_m2m_rels_per_link_field == {10: {1, 2}, 11: {3}}
+
+    collector.add_starting_rows(None)
+    assert collector._starting_row_ids is None
+    collector.add_starting_rows([4])
+    assert collector._starting_row_ids is None
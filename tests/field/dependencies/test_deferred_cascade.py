@@ -0,0 +1,188 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Value
+from django.test.utils import CaptureQueriesContext, override_settings
+
+import pytest
+
+from baserow_dynamic_table.fields.dependencies.deferred import (
+    get_pending_deferred_cascade_count,
+)
+from baserow_dynamic_table.fields.dependencies.update_collector import (
+    FieldUpdateCollector,
+)
+from baserow_dynamic_table.fields.field_cache import FieldCache
+from baserow_dynamic_table.fields.handler import FieldHandler
+from baserow_dynamic_table.fields.models import LinkRowField
+from baserow_dynamic_table.fields.tasks import run_deferred_cascade
+from baserow_dynamic_table.rows.handler import RowHandler
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+
+
+def _create_linked_tables(data_fixture):
+    user = data_fixture.create_user()
+    database = data_fixture.create_database_application(user=user)
+    first_table = data_fixture.create_database_table(database=database)
+    second_table = data_fixture.create_database_table(database=database)
+    first_table_primary_field = data_fixture.create_text_field(
+        name="primary", primary=True, table=first_table
+    )
+    data_fixture.create_text_field(name="primary", primary=True, table=second_table)
+    # noinspection PyTypeChecker
+    link_row_field: LinkRowField = FieldHandler().create_field(
+        user=user,
+        table=first_table,
+        type_name="link_row",
+        link_row_table=second_table,
+        name="link",
+    )
+    return first_table, second_table, first_table_primary_field, link_row_field
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_DEFERRED_CASCADE_MIN_ROWS=1)
+@patch("baserow_dynamic_table.fields.tasks.run_deferred_cascade.delay")
+def test_large_fan_outs_are_deferred_to_a_background_task(
+    mock_run_deferred_cascade, data_fixture, django_capture_on_commit_callbacks
+):
+    first_table, second_table, _, link_row_field = _create_linked_tables(
+        data_fixture
+    )
+    second_table_primary_field = second_table.field_set.get(primary=True)
+    first_table_model = first_table.get_model(attribute_names=True)
+    second_table_model = second_table.get_model(attribute_names=True)
+    second_table_row = second_table_model.objects.create(primary="a")
+    for i in range(2):
+        first_table_model.objects.create(primary=str(i)).link.add(
+            second_table_row.id
+        )
+
+    user = data_fixture.create_user()
+    FieldHandler().create_field(
+        user,
+        first_table,
+        "lookup",
+        name="lookup",
+        through_field_id=link_row_field.id,
+        target_field_id=second_table_primary_field.id,
+    )
+    first_table_model = first_table.get_model(attribute_names=True)
+    first_table_rows = list(first_table_model.objects.all())
+    assert [row.lookup for row in first_table_rows] == [
+        [{"id": second_table_row.id, "value": "a"}]
+    ] * 2
+    first_table_model.objects.update(needs_background_update=False)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RowHandler().update_row_by_id(
+            user,
+            second_table,
+            second_table_row.id,
+            {second_table_primary_field.db_column: "other"},
+        )
+
+    for row in first_table_rows:
+        row.refresh_from_db()
+        assert row.lookup == [{"id": second_table_row.id, "value": "a"}]
+        assert row.needs_background_update
+
+    mock_run_deferred_cascade.assert_called_once_with(
+        second_table.id,
+        [second_table_row.id],
+        [second_table_primary_field.id],
+        [first_table.id],
+        {},
+    )
+    assert get_pending_deferred_cascade_count(first_table.id) == 1
+
+    run_deferred_cascade(*mock_run_deferred_cascade.call_args.args)
+
+    for row in first_table_rows:
+        row.refresh_from_db()
+        assert row.lookup == [{"id": second_table_row.id, "value": "other"}]
+    assert get_pending_deferred_cascade_count(first_table.id) == 0
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_DEFERRED_CASCADE_MIN_ROWS=2)
+@patch("baserow_dynamic_table.fields.tasks.run_deferred_cascade.delay")
+def test_small_fan_outs_are_applied_right_away(
+    mock_run_deferred_cascade, data_fixture
+):
+    (
+        first_table,
+        second_table,
+        first_table_primary_field,
+        link_row_field,
+    ) = _create_linked_tables(data_fixture)
+    first_table_model = first_table.get_model(attribute_names=True)
+    second_table_model = second_table.get_model(attribute_names=True)
+    second_table_row = second_table_model.objects.create(primary="a")
+    first_table_row = first_table_model.objects.create(primary="1")
+    first_table_row.link.add(second_table_row.id)
+
+    update_collector = FieldUpdateCollector(
+        second_table, starting_row_ids=[second_table_row.id]
+    )
+    update_collector.add_field_with_pending_update_statement(
+        first_table_primary_field,
+        Value("other"),
+        via_path_to_starting_table=[link_row_field],
+    )
+    update_collector.apply_updates_and_get_updated_fields(
+        FieldCache(), starting_field_ids=[link_row_field.id]
+    )
+
+    assert not update_collector.deferred
+    first_table_row.refresh_from_db()
+    assert first_table_row.primary == "other"
+    mock_run_deferred_cascade.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_updates_can_be_applied_in_row_id_chunks(data_fixture):
+    field = data_fixture.create_text_field(name="field")
+    model = field.table.get_model(attribute_names=True)
+    rows = [model.objects.create(field=str(i)) for i in range(5)]
+
+    update_collector = FieldUpdateCollector(field.table)
+    update_collector.add_field_with_pending_update_statement(field, Value("other"))
+    update_collector.apply_updates_and_get_updated_fields(FieldCache(), chunk_size=2)
+
+    assert update_collector.update_report.statement_count == 1
+    assert update_collector.update_report.updated_rows == len(rows)
+    assert list(model.objects.values_list("field", flat=True)) == ["other"] * 5
+
+
+@pytest.mark.django_db
+def test_row_id_chunks_only_cover_the_rows_matching_the_filter(data_fixture):
+    field = data_fixture.create_text_field(name="field")
+    model = field.table.get_model(attribute_names=True)
+    rows = [model.objects.create(field=str(i)) for i in range(10)]
+
+    update_collector = FieldUpdateCollector(
+        field.table, starting_row_ids=[rows[0].id, rows[-1].id]
+    )
+    update_collector.add_field_with_pending_update_statement(field, Value("other"))
+    with CaptureQueriesContext(connection) as captured:
+        update_collector.apply_updates_and_get_updated_fields(
+            FieldCache(), chunk_size=1
+        )
+
+    update_queries = [
+        query
+        for query in captured.captured_queries
+        if query["sql"].startswith("UPDATE") and field.db_column in query["sql"]
+    ]
+    assert len(update_queries) == 2
+    assert update_collector.update_report.updated_rows == 2
+    assert list(model.objects.order_by("id").values_list("field", flat=True)) == (
+        ["other"] + [str(i) for i in range(1, 9)] + ["other"]
+    )
@@ -0,0 +1,179 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.test.utils import override_settings
+
+import pytest
+
+from baserow_dynamic_table.fields.dependencies.graph import (
+    get_field_dependency_graph,
+    invalidate_field_dependency_graph,
+)
+from baserow_dynamic_table.fields.dependencies.handler import FieldDependencyHandler
+from baserow_dynamic_table.fields.dependencies.models import FieldDependency
+from baserow_dynamic_table.fields.field_cache import FieldCache
+
+
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+def test_dependency_graph_returns_the_same_dependants_as_the_database(
+    data_fixture,
+):
+    table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table)
+    same_table_dependant = data_fixture.create_text_field(table=table)
+    link_field = data_fixture.create_link_row_field(link_row_table=table)
+    other_table_dependant = data_fixture.create_text_field(
+        table=link_field.link_row_table
+    )
+    FieldDependency.objects.create(
+        dependency=text_field, dependant=same_table_dependant
+    )
+    FieldDependency.objects.create(
+        dependency=text_field, dependant=other_table_dependant, via=link_field
+    )
+    FieldDependency.objects.create(
+        dependency=None,
+        broken_reference_field_name="a",
+        dependant=other_table_dependant,
+        via=link_field,
+    )
+    invalidate_field_dependency_graph(
+        [same_table_dependant.id, other_table_dependant.id]
+    )
+
+    def get_dependants(field_ids, associated_relations_changed):
+        return FieldDependencyHandler.get_dependant_fields_with_type(
+            table.id,
+            field_ids=field_ids,
+            associated_relations_changed=associated_relations_changed,
+            field_cache=FieldCache(),
+        )
+
+    for field_ids in [[text_field.id], [link_field.id], [text_field.id, 0]]:
+        for associated_relations_changed in [True, False]:
+            with override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=False):
+                expected = get_dependants(field_ids, associated_relations_changed)
+            with override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=True):
+                assert (
+                    get_dependants(field_ids, associated_relations_changed)
+                    == expected
+                )
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=True)
+def test_dependants_are_found_without_queries(data_fixture, django_assert_num_queries):
+    table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table)
+    dependant = data_fixture.create_text_field(table=table)
+    FieldDependency.objects.create(dependency=text_field, dependant=dependant)
+    invalidate_field_dependency_graph([dependant.id])
+
+    field_cache = FieldCache()
+    FieldDependencyHandler.get_dependant_fields_with_type(
+        table.id, [text_field.id], False, field_cache
+    )
+
+    with django_assert_num_queries(0):
+        [(found, _, _)] = FieldDependencyHandler.get_dependant_fields_with_type(
+            table.id, [text_field.id], False, field_cache
+        )
+        assert found.id == dependant.id
+        assert (
+            FieldDependencyHandler.get_dependant_fields_with_type(
+                table.id, [dependant.id], False, field_cache
+            )
+            == []
+        )
+
+
+def _count_dependant_edges(field_id):
+    return len(get_field_dependency_graph().get_dependant_edges([field_id], False))
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=True)
+def test_dependency_graph_forgets_rolled_back_changes(data_fixture):
+    table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table)
+    dependant = data_fixture.create_text_field(table=table)
+    FieldDependency.objects.create(dependency=text_field, dependant=dependant)
+    invalidate_field_dependency_graph([dependant.id])
+    assert _count_dependant_edges(dependant.id) == 0
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            FieldDependency.objects.create(dependency=dependant, dependant=text_field)
+            invalidate_field_dependency_graph([text_field.id])
+            assert _count_dependant_edges(dependant.id) == 1
+            raise ValueError()
+
+    assert _count_dependant_edges(dependant.id) == 0
+    assert _count_dependant_edges(text_field.id) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+@override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=True)
+def test_dependency_graph_knows_the_tables_with_dependants(data_fixture):
+    table = data_fixture.create_database_table()
+    independent_table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table)
+    link_field = data_fixture.create_link_row_field(link_row_table=table)
+    dependant = data_fixture.create_text_field(table=link_field.table)
+
+    assert not FieldDependencyHandler.table_has_dependants(table.id)
+    assert not FieldDependencyHandler.table_has_dependants(link_field.table_id)
+
+    FieldDependency.objects.create(
+        dependency=text_field, dependant=dependant, via=link_field
+    )
+    invalidate_field_dependency_graph([dependant.id])
+
+    assert FieldDependencyHandler.table_has_dependants(table.id)
+    # Changing the links of a row can change the dependant as well.
+    assert FieldDependencyHandler.table_has_dependants(link_field.table_id)
+    assert not FieldDependencyHandler.table_has_dependants(independent_table.id)
+
+    with override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=False):
+        assert FieldDependencyHandler.table_has_dependants(independent_table.id)
+
+
+def test_dependency_changes_dont_send_model_signals():
+    # The dependencies of deleted fields must be deleted with Django's fast delete,
+    # without loading them and sending a signal per dependency.
+    assert not post_save.has_listeners(FieldDependency)
+    assert not post_delete.has_listeners(FieldDependency)
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=True)
+def test_transaction_graph_only_queries_the_changed_dependants(
+    data_fixture, django_assert_num_queries
+):
+    table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table)
+    dependant = data_fixture.create_text_field(table=table)
+    other_dependant = data_fixture.create_text_field(table=table)
+    FieldDependency.objects.create(dependency=text_field, dependant=dependant)
+    invalidate_field_dependency_graph([dependant.id])
+    assert _count_dependant_edges(text_field.id) == 1
+
+    with transaction.atomic():
+        FieldDependency.objects.create(dependency=text_field, dependant=other_dependant)
+        invalidate_field_dependency_graph([other_dependant.id])
+        # Only the dependencies of the changed dependants are queried, the others
+        # come from the graph of the process.
+        with django_assert_num_queries(1) as captured:
+            assert _count_dependant_edges(text_field.id) == 2
+        assert '"dependant_id" IN' in captured.captured_queries[0]["sql"]
+
+        FieldDependency.objects.filter(dependant=dependant).delete()
+        invalidate_field_dependency_graph([dependant.id])
+        edges = get_field_dependency_graph().get_dependant_edges(
+            [text_field.id], False
+        )
+        assert [edge.dependant_id for edge in edges] == [other_dependant.id]
+        graph = get_field_dependency_graph()
+        assert graph.is_dependency_of(text_field.id, other_dependant.id, 1)
+        assert not graph.is_dependency_of(text_field.id, dependant.id, 1)
@@ -1,8 +1,16 @@
+from django.test.utils import override_settings
+
 import pytest
 
+from baserow_dynamic_table.fields.dependencies.circular_reference_checker import (
+    get_circular_dependencies,
+)
 from baserow_dynamic_table.fields.dependencies.exceptions import (
     CircularFieldDependencyError,
 )
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
 from baserow_dynamic_table.fields.dependencies.handler import FieldDependencyHandler
 from baserow_dynamic_table.fields.dependencies.models import FieldDependency
 from baserow_dynamic_table.fields.field_cache import FieldCache
@@ -316,3 +324,127 @@ def test_str_of_field_dependency_uniquely_identifies_it(
                 broken_reference_field_name="via",
             )
         )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("graph_enabled", [True, False])
+def test_circular_dependencies_are_checked_in_bulk(data_fixture, graph_enabled):
+    table = data_fixture.create_database_table()
+    a, b, c, d = [data_fixture.create_text_field(table=table) for _ in range(4)]
+    FieldDependency.objects.create(dependant=a, dependency=b)
+    FieldDependency.objects.create(dependant=b, dependency=c)
+    # A cycle which is not part of any candidate must not prevent the check from
+    # ending.
+    FieldDependency.objects.create(dependant=c, dependency=d)
+    FieldDependency.objects.create(dependant=d, dependency=c)
+    invalidate_field_dependency_graph([a.id, b.id, c.id, d.id])
+
+    with override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=graph_enabled):
+        assert get_circular_dependencies([]) == set()
+        assert get_circular_dependencies(
+            [(c.id, a.id), (b.id, a.id), (d.id, b.id), (a.id, d.id), (c.id, c.id)]
+        ) == {(c.id, a.id), (b.id, a.id), (d.id, b.id), (c.id, c.id)}
+        # Cycles formed by several candidates together are found as well.
+        e, f = [data_fixture.create_text_field(table=table) for _ in range(2)]
+        assert get_circular_dependencies([(e.id, f.id), (f.id, e.id)]) == {
+            (e.id, f.id),
+            (f.id, e.id),
+        }
+        # The existing dependencies of the replaced dependants are not followed.
+        assert get_circular_dependencies(
+            [(c.id, a.id)], replaced_dependencies={b.id: [d.id]}
+        ) == {(c.id, a.id)}
+        assert (
+            get_circular_dependencies([(c.id, a.id)], replaced_dependencies={b.id: []})
+            == set()
+        )
+
+    with override_settings(
+        BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=graph_enabled,
+        MAX_FIELD_REFERENCE_DEPTH=1,
+    ):
+        assert get_circular_dependencies([(c.id, a.id), (b.id, a.id)]) == {
+            (b.id, a.id)
+        }
+
+
+@pytest.mark.django_db
+def test_rebuilding_dependencies_in_bulk(data_fixture, django_assert_max_num_queries):
+    table = data_fixture.create_database_table()
+    first_formula_field = data_fixture.create_formula_field(
+        name="first",
+        table=table,
+        formula_type="text",
+        formula='field("missing")',
+        setup_dependencies=False,
+    )
+    second_formula_field = data_fixture.create_formula_field(
+        name="second",
+        table=table,
+        formula_type="text",
+        formula="field('first')",
+        setup_dependencies=False,
+    )
+    third_formula_field = data_fixture.create_formula_field(
+        name="third",
+        table=table,
+        formula_type="text",
+        formula="field('second')",
+        setup_dependencies=False,
+    )
+    fields = [first_formula_field, second_formula_field, third_formula_field]
+
+    cache = FieldCache()
+    FieldDependencyHandler.rebuild_dependencies_in_bulk(fields, cache)
+
+    assert first_formula_field.dependencies.get().broken_reference_field_name == (
+        "missing"
+    )
+    assert _unwrap_ids(second_formula_field.field_dependencies) == [
+        first_formula_field.id
+    ]
+    assert _unwrap_ids(third_formula_field.field_dependencies) == [
+        second_formula_field.id
+    ]
+
+    # The fields of the broken references are picked up as well.
+    missing_field = data_fixture.create_text_field(name="missing", table=table)
+    before_strs = {str(dep) for dep in FieldDependency.objects.all()}
+    with django_assert_max_num_queries(20):
+        FieldDependencyHandler.rebuild_dependencies_in_bulk(
+            [missing_field] + fields, cache
+        )
+    assert _unwrap_ids(first_formula_field.field_dependencies) == [missing_field.id]
+    assert {str(dep) for dep in FieldDependency.objects.all()} == (
+        before_strs - {f"{first_formula_field.id}__broken__missing"}
+    ) | {f"{first_formula_field.id}__depends_on__{missing_field.id}"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("graph_enabled", [True, False])
+def test_rebuilding_dependencies_in_bulk_with_a_circular_ref_will_raise(
+    data_fixture, graph_enabled
+):
+    first_formula_field = data_fixture.create_formula_field(
+        name="first",
+        formula_type="text",
+        formula='field("second")',
+        setup_dependencies=False,
+    )
+    second_formula_field = data_fixture.create_formula_field(
+        name="second",
+        table=first_formula_field.table,
+        formula_type="text",
+        formula="field('first')",
+        setup_dependencies=False,
+    )
+
+    # Both dependencies are fine on their own, only together they are circular.
+    with override_settings(
+        BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=graph_enabled
+    ), pytest.raises(CircularFieldDependencyError):
+        FieldDependencyHandler.rebuild_dependencies_in_bulk(
+            [first_formula_field, second_formula_field], FieldCache()
+        )
+
+    assert FieldDependency.objects.count() == 0
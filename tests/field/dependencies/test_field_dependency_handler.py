@@ -4,6 +4,9 @@ from pytest_unordered import unordered
 from baserow_dynamic_table.fields.dependencies.exceptions import (
     SelfReferenceFieldDependencyError,
 )
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
 from baserow_dynamic_table.fields.dependencies.handler import FieldDependencyHandler
 from baserow_dynamic_table.fields.dependencies.models import FieldDependency
 from baserow_dynamic_table.fields.field_cache import FieldCache
@@ -258,6 +261,7 @@ def test_get_dependant_fields_with_type(data_fixture):
     FieldDependency.objects.create(
         dependency=text_field_2, dependant=text_field_1_and_2_dependency_1
     )
+    invalidate_field_dependency_graph()
 
     field_cache = FieldCache()
     text_field_type = field_type_registry.get_by_model(text_field_1_dependency_1)
@@ -350,3 +350,146 @@ def test_update_statements_at_the_same_path_node_are_grouped_into_one(
         assert send_mock.call_args[1]["field"].id == first_table_primary_field.id
         assert send_mock.call_args[1]["user"] is None
         assert send_mock.call_args[1]["related_fields"] == [first_table_other_field]
+
+
+@pytest.mark.django_db
+def test_same_update_statements_of_consecutive_paths_are_merged_into_one(
+    api_client, data_fixture, django_assert_num_queries
+):
+    user = data_fixture.create_user()
+    database = data_fixture.create_database_application(user=user)
+    first_table = data_fixture.create_database_table(database=database)
+    second_table = data_fixture.create_database_table(database=database)
+    first_table_primary_field = data_fixture.create_text_field(
+        name="primary", primary=True, table=first_table
+    )
+    data_fixture.create_text_field(name="primary", primary=True, table=second_table)
+    # noinspection PyTypeChecker
+    link_a: LinkRowField = FieldHandler().create_field(
+        user=user,
+        table=first_table,
+        type_name="link_row",
+        link_row_table=second_table,
+        name="link a",
+    )
+    # noinspection PyTypeChecker
+    link_b: LinkRowField = FieldHandler().create_field(
+        user=user,
+        table=first_table,
+        type_name="link_row",
+        link_row_table=second_table,
+        name="link b",
+    )
+    first_table_model = first_table.get_model(attribute_names=True)
+    second_table_model = second_table.get_model(attribute_names=True)
+
+    second_table_row = second_table_model.objects.create(primary="a")
+    first_table_1_row = first_table_model.objects.create(primary="1")
+    first_table_2_row = first_table_model.objects.create(primary="2")
+    first_table_3_row = first_table_model.objects.create(primary="3")
+    first_table_1_row.link_a.add(second_table_row.id)
+    first_table_2_row.link_b.add(second_table_row.id)
+
+    field_cache = FieldCache()
+    update_collector = FieldUpdateCollector(
+        second_table, starting_row_ids=[second_table_row.id]
+    )
+    for link in [link_a, link_b]:
+        update_collector.add_field_with_pending_update_statement(
+            first_table_primary_field,
+            Value("other"),
+            via_path_to_starting_table=[link],
+        )
+    # Cache the models so we are only asserting about the update queries
+    field_cache.cache_model(first_table.get_model())
+    field_cache.cache_model(second_table.get_model())
+    with django_assert_num_queries(1):
+        update_collector.apply_updates_and_get_updated_fields(field_cache)
+
+    assert update_collector.update_report.statement_count == 1
+    assert update_collector.update_report.updated_rows == 2
+    assert update_collector.update_report.updated_rows_per_table == {
+        first_table.id: 2
+    }
+    first_table_1_row.refresh_from_db()
+    first_table_2_row.refresh_from_db()
+    first_table_3_row.refresh_from_db()
+    assert first_table_1_row.primary == "other"
+    assert first_table_2_row.primary == "other"
+    assert first_table_3_row.primary == "3"
+
+
+@pytest.mark.django_db
+def test_update_statements_skip_rows_whose_values_dont_change(data_fixture):
+    field = data_fixture.create_text_field(name="field")
+    model = field.table.get_model(attribute_names=True)
+    model.objects.create(field="a")
+    model.objects.create(field="other")
+    model.objects.create(field=None)
+
+    update_collector = FieldUpdateCollector(field.table)
+    update_collector.add_field_with_pending_update_statement(field, Value("other"))
+    update_collector.apply_updates_and_get_updated_fields(FieldCache())
+
+    # The row which is null is updated as well, because the comparison is null safe.
+    assert update_collector.update_report.statement_count == 1
+    assert update_collector.update_report.updated_rows == 2
+    assert list(model.objects.values_list("field", flat=True)) == ["other"] * 3
+
+    update_collector = FieldUpdateCollector(field.table)
+    update_collector.add_field_with_pending_update_statement(field, Value(None))
+    update_collector.apply_updates_and_get_updated_fields(FieldCache())
+    assert update_collector.update_report.updated_rows == 3
+
+    update_collector = FieldUpdateCollector(field.table)
+    update_collector.add_field_with_pending_update_statement(field, Value(None))
+    update_collector.apply_updates_and_get_updated_fields(FieldCache())
+    assert update_collector.update_report.updated_rows == 0
+
+
+@pytest.mark.django_db
+def test_explain_plans_the_updates_without_executing_them(data_fixture):
+    user = data_fixture.create_user()
+    database = data_fixture.create_database_application(user=user)
+    first_table = data_fixture.create_database_table(database=database)
+    second_table = data_fixture.create_database_table(database=database)
+    first_table_primary_field = data_fixture.create_text_field(
+        name="primary", primary=True, table=first_table
+    )
+    data_fixture.create_text_field(name="primary", primary=True, table=second_table)
+    # noinspection PyTypeChecker
+    link_row_field: LinkRowField = FieldHandler().create_field(
+        user=user,
+        table=first_table,
+        type_name="link_row",
+        link_row_table=second_table,
+        name="link",
+    )
+    first_table_model = first_table.get_model(attribute_names=True)
+    second_table_model = second_table.get_model(attribute_names=True)
+    second_table_row = second_table_model.objects.create(primary="a")
+    first_table_row = first_table_model.objects.create(primary="1")
+    first_table_row.link.add(second_table_row.id)
+
+    update_collector = FieldUpdateCollector(
+        second_table, starting_row_ids=[second_table_row.id]
+    )
+    update_collector.add_field_with_pending_update_statement(
+        first_table_primary_field,
+        Value("other"),
+        via_path_to_starting_table=[link_row_field],
+    )
+    explanation = update_collector.explain(FieldCache())
+
+    assert explanation.statement_count == 1
+    assert explanation.longest_via_path_ids == [link_row_field.id]
+    assert explanation.updated_field_ids == [first_table_primary_field.id]
+    [update] = explanation.updates
+    assert update.table_id == first_table.id
+    assert first_table_primary_field.db_column in update.columns
+    assert update.estimated_rows >= 0
+    assert explanation.as_dict()["estimated_rows_per_table"] == {
+        first_table.id: update.estimated_rows
+    }
+    first_table_row.refresh_from_db()
+    assert first_table_row.primary == "1"
@@ -18,6 +18,7 @@ from baserow_dynamic_table.fields.exceptions import (
     FieldWithSameNameAlreadyExists,
     IncompatibleFieldTypeForUniqueValues,
     IncompatiblePrimaryFieldTypeError,
+    InvalidFacetSamplePercentage,
     MaxFieldLimitExceeded,
     MaxFieldNameLengthExceeded,
     PrimaryFieldAlreadyExists,
@@ -1303,6 +1304,67 @@ def test_get_unique_row_values_single_select(data_fixture):
     assert values == ["Option 2", "Option 1"]
 
 
+@pytest.mark.django_db
+def test_get_facets(data_fixture):
+    table = data_fixture.create_database_table()
+    text_field = data_fixture.create_text_field(table=table, name="text")
+    number_field = data_fixture.create_number_field(table=table, name="number")
+    single_select_field = data_fixture.create_single_select_field(
+        table=table, name="single_select"
+    )
+    file_field = data_fixture.create_file_field(table=table, name="file")
+    option_1 = data_fixture.create_select_option(
+        field=single_select_field, value="Option 1"
+    )
+    option_2 = data_fixture.create_select_option(
+        field=single_select_field, value="Option 2"
+    )
+
+    model = table.get_model(attribute_names=True)
+    model.objects.create(text="a", number=1, singleselect=option_1)
+    model.objects.create(text="b", number=1, singleselect=option_2)
+    model.objects.create(text="b", number=2, singleselect=option_2)
+    model.objects.create(text="", number=None)
+    model.objects.create(text=None, number=2, singleselect=option_2)
+
+    handler = FieldHandler()
+    field_ids = [text_field.id, number_field.id, single_select_field.id]
+
+    with pytest.raises(IncompatibleFieldTypeForUniqueValues):
+        handler.get_facets(table, [text_field.id, file_field.id])
+
+    facets = handler.get_facets(table, field_ids)
+    assert facets == {
+        text_field.id: [("b", 2), ("a", 1)],
+        number_field.id: [("1", 2), ("2", 2)],
+        single_select_field.id: [("Option 2", 3), ("Option 1", 1)],
+    }
+
+    facets = handler.get_facets(table, field_ids, limit=1)
+    assert facets == {
+        text_field.id: [("b", 2)],
+        number_field.id: [("1", 2)],
+        single_select_field.id: [("Option 2", 3)],
+    }
+
+    queryset = model.objects.filter(number=2)
+    facets = handler.get_facets(table, field_ids, queryset=queryset)
+    assert facets == {
+        text_field.id: [("b", 1)],
+        number_field.id: [("2", 2)],
+        single_select_field.id: [("Option 2", 2)],
+    }
+
+    # A sample of 100% contains all the rows.
+    assert handler.get_facets(table, field_ids, sample_percentage=100) == (
+        handler.get_facets(table, field_ids)
+    )
+
+    for sample_percentage in [0, -1, 100.5]:
+        with pytest.raises(InvalidFacetSamplePercentage):
+            handler.get_facets(table, field_ids, sample_percentage=sample_percentage)
+
+
 @pytest.mark.django_db(transaction=True)
 def test_when_public_field_updated_number_of_queries_does_not_increase_with_amount_of_grid_views(
     data_fixture, django_assert_num_queries
@@ -1,5 +1,9 @@
+import time
 from datetime import datetime
+from unittest.mock import patch
 
+from django.core.cache import cache
+from django.test.utils import override_settings
 from django.utils import timezone
 
 import pytest
@@ -7,7 +11,16 @@ import pytz
 from freezegun import freeze_time
 
 from baserow_dynamic_table.fields.field_types import FormulaFieldType
-from baserow_dynamic_table.fields.tasks import run_periodic_fields_updates
+from baserow_dynamic_table.fields.periodic_updates import (
+    get_periodic_field_update_backlog,
+    get_periodic_field_update_shard_run,
+    mark_shard_as_queued,
+    record_shard_run,
+)
+from baserow_dynamic_table.fields.tasks import (
+    run_periodic_field_type_update_shard,
+    run_periodic_fields_updates,
+)
 from baserow.core.trash.handler import TrashHandler
 
 
@@ -370,3 +383,80 @@ def test_run_periodic_field_type_doesnt_update_trashed_workspace(data_fixture):
         assert getattr(row, f"field_{field.id}") == original_datetime
 
         assert FormulaFieldType().get_fields_needing_periodic_update().count() == 0
+
+
+@pytest.mark.django_db
+@override_settings(PERIODIC_FIELD_UPDATE_FAN_OUT=True)
+@patch("baserow_dynamic_table.fields.tasks.run_periodic_field_type_update_shard.delay")
+def test_run_periodic_fields_updates_fans_out_per_workspace(
+    mock_run_shard, data_fixture
+):
+    cache.clear()
+    a_day_ago = timezone.now() - timezone.timedelta(days=1)
+    workspace = data_fixture.create_workspace()
+    workspace_updated_first = data_fixture.create_workspace()
+    workspace_updated_first.now = a_day_ago
+    workspace_updated_first.save()
+    rows_and_fields = []
+    for w in [workspace, workspace_updated_first]:
+        database = data_fixture.create_database_application(workspace=w)
+        table = data_fixture.create_database_table(database=database)
+        field = data_fixture.create_formula_field(
+            table=table, formula="now()", date_include_time=True
+        )
+        rows_and_fields.append((table.get_model().objects.create(), field))
+
+    run_periodic_fields_updates()
+
+    formula_type = FormulaFieldType.type
+    assert [c.args for c in mock_run_shard.call_args_list] == [
+        (formula_type, workspace_updated_first.id, True),
+        (formula_type, workspace.id, True),
+    ]
+    assert get_periodic_field_update_backlog() == 2
+
+    # Shards which are still queued are not dispatched again.
+    mock_run_shard.reset_mock()
+    run_periodic_fields_updates()
+    mock_run_shard.assert_not_called()
+
+    with freeze_time("2023-02-27 10:30"):
+        run_periodic_field_type_update_shard(formula_type, workspace.id)
+
+    row, field = rows_and_fields[0]
+    row.refresh_from_db()
+    assert getattr(row, f"field_{field.id}") == datetime(
+        2023, 2, 27, 10, 30, 0, tzinfo=pytz.UTC
+    )
+    shard_run = get_periodic_field_update_shard_run(formula_type, workspace.id)
+    assert shard_run["updated_fields"] == 1
+    assert shard_run["failed_fields"] == 0
+    assert not shard_run["timed_out"]
+    assert get_periodic_field_update_shard_run(
+        formula_type, workspace_updated_first.id
+    ) is None
+    assert get_periodic_field_update_backlog() == 1
+
+    run_periodic_fields_updates()
+    assert [c.args for c in mock_run_shard.call_args_list] == [
+        (formula_type, workspace.id, True),
+    ]
+
+
+@pytest.mark.django_db
+def test_lost_periodic_field_update_shards_are_not_counted_twice():
+    cache.clear()
+    formula_type = FormulaFieldType.type
+
+    assert mark_shard_as_queued(formula_type, 1)
+    assert not mark_shard_as_queued(formula_type, 1)
+    assert get_periodic_field_update_backlog() == 1
+
+    # The queued mark of a lost task expires, after which the shard is dispatched
+    # again.
+    cache.delete(f"periodic_field_update_queued_{formula_type}_1")
+    assert mark_shard_as_queued(formula_type, 1)
+    assert get_periodic_field_update_backlog() == 1
+
+    record_shard_run(formula_type, 1, time.perf_counter(), 0, 0)
+    assert get_periodic_field_update_backlog() == 0
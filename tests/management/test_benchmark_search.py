@@ -0,0 +1,52 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+import pytest
+
+from baserow_dynamic_table.search.benchmark import percentile
+from baserow_dynamic_table.table.models import Table
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+def test_benchmark_search():
+    output = StringIO()
+
+    call_command(
+        "benchmark_search",
+        "--row-counts",
+        "5",
+        "--field-counts",
+        "2",
+        "--modes",
+        "compat",
+        "full-text-with-count",
+        "--queries",
+        "a",
+        "zzqxvbenchmark",
+        "--repeats",
+        "2",
+        stdout=output,
+    )
+
+    results = json.loads(output.getvalue())
+    assert results["modes"] == ["compat", "full-text-with-count"]
+    [result] = results["results"]
+    assert result["row_count"] == 5
+    assert result["field_count"] == 2
+    assert len(result["search_index_sizes"]) == 2
+    for mode in ["compat", "full-text-with-count"]:
+        mode_result = result["modes"][mode]
+        assert mode_result["p95_ms"] >= mode_result["p50_ms"] > 0
+        assert mode_result["queries"]["zzqxvbenchmark"]["rows_scanned"] >= 0
+    # The seeded tables are deleted afterwards.
+    assert not Table.objects_and_trash.filter(id=result["table_id"]).exists()
@@ -0,0 +1,44 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+import pytest
+
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
+from baserow_dynamic_table.fields.dependencies.models import FieldDependency
+
+
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+def test_explain_cascade(data_fixture):
+    table = data_fixture.create_database_table()
+    primary_field = data_fixture.create_text_field(table=table, primary=True)
+    link_field = data_fixture.create_link_row_field(link_row_table=table)
+    FieldDependency.objects.create(
+        dependency=primary_field, dependant=link_field, via=link_field
+    )
+    invalidate_field_dependency_graph([link_field.id])
+    model = table.get_model()
+    row = model.objects.create(**{f"field_{primary_field.id}": "a"})
+    output = StringIO()
+
+    call_command(
+        "explain_cascade",
+        table.id,
+        "--row-ids",
+        row.id,
+        "--field-ids",
+        primary_field.id,
+        stdout=output,
+    )
+
+    explanation = json.loads(output.getvalue())
+    assert explanation["statement_count"] == len(explanation["updates"])
+    assert explanation["updated_field_ids"] == [link_field.id]
+    # Nothing is changed by the dry run.
+    assert model.objects.get(id=row.id).needs_background_update == (
+        row.needs_background_update
+    )
@@ -0,0 +1,166 @@
+from django.test.utils import override_settings
+
+import pytest
+from pyinstrument import Profiler
+
+from baserow_dynamic_table.rows.cache import (
+    get_row_cache_epoch,
+    invalidate_table_in_row_cache,
+    local_row_cache,
+    row_cache_stats,
+)
+from baserow_dynamic_table.rows.handler import RowHandler
+
+
+@pytest.fixture(autouse=True)
+def clear_row_cache():
+    local_row_cache.clear()
+    row_cache_stats.reset()
+    yield
+    local_row_cache.clear()
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+def test_get_row_is_served_from_the_row_cache(data_fixture, django_assert_num_queries):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    row = model.objects.create(**{f"field_{field.id}": "Tesla"})
+
+    handler = RowHandler()
+    assert handler.get_row(table, row.id, model=model).id == row.id
+    assert row_cache_stats.misses == 1
+
+    with django_assert_num_queries(0):
+        cached_row = handler.get_row(table, row.id, model=model)
+
+    assert cached_row.id == row.id
+    assert getattr(cached_row, f"field_{field.id}") == "Tesla"
+    assert row_cache_stats.hits == 1
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+def test_updating_rows_invalidates_the_row_cache(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    row = model.objects.create(**{f"field_{field.id}": "Tesla"})
+
+    handler = RowHandler()
+    assert handler.get_row_names(table, [row.id]) == {row.id: "Tesla"}
+    assert getattr(handler.get_row(table, row.id, model=model), field.db_column) == (
+        "Tesla"
+    )
+
+    handler.update_rows(
+        user, table, [{"id": row.id, f"field_{field.id}": "Audi"}], model=model
+    )
+
+    assert handler.get_row_names(table, [row.id]) == {row.id: "Audi"}
+    assert getattr(handler.get_row(table, row.id, model=model), field.db_column) == (
+        "Audi"
+    )
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+def test_deleting_rows_invalidates_the_row_cache(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    model = table.get_model()
+    row = model.objects.create()
+
+    handler = RowHandler()
+    assert handler.has_row(table, row.id, model=model)
+
+    handler.delete_rows(user, table, [row.id], model=model)
+
+    assert not handler.has_row(table, row.id, model=model)
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+def test_cascading_updates_invalidate_the_row_cache_of_related_tables(data_fixture):
+    user = data_fixture.create_user()
+    table_a, table_b, link_field = data_fixture.create_two_linked_tables(user=user)
+    primary_b = table_b.field_set.get(primary=True)
+    lookup_field = data_fixture.create_formula_field(
+        table=table_a,
+        formula=f"join(lookup('{link_field.name}', '{primary_b.name}'), '')",
+    )
+
+    handler = RowHandler()
+    row_b = handler.create_row(user, table_b, {f"field_{primary_b.id}": "b"})
+    row_a = handler.create_row(user, table_a, {f"field_{link_field.id}": [row_b.id]})
+
+    model_a = table_a.get_model()
+    row = handler.get_row(table_a, row_a.id, model=model_a)
+    assert getattr(row, lookup_field.db_column) == "b"
+
+    handler.update_row_by_id(user, table_b, row_b.id, {f"field_{primary_b.id}": "c"})
+
+    row = handler.get_row(table_a, row_a.id, model=model_a)
+    assert getattr(row, lookup_field.db_column) == "c"
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+def test_row_cache_epoch_is_bumped_again_on_commit(
+    data_fixture, django_capture_on_commit_callbacks
+):
+    table = data_fixture.create_database_table()
+    epoch = get_row_cache_epoch(table.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        invalidate_table_in_row_cache(table.id)
+        # A concurrent read could cache the old row with this epoch before commit.
+        assert get_row_cache_epoch(table.id) == epoch + 1
+
+    assert get_row_cache_epoch(table.id) == epoch + 2
+
+
+@pytest.mark.django_db
+def test_row_cache_is_not_used_when_disabled(data_fixture):
+    table = data_fixture.create_database_table()
+    model = table.get_model()
+    row = model.objects.create()
+
+    RowHandler().get_row(table, row.id, model=model)
+    RowHandler().get_row(table, row.id, model=model)
+
+    assert row_cache_stats.hits == 0
+    assert row_cache_stats.misses == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+@override_settings(BASEROW_ROW_CACHE_ENABLED=True)
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_get_row_performance_hot_rows(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table, primary=True)
+    handler = RowHandler()
+    rows = handler.create_rows(
+        user, table, [{f"field_{field.id}": f"row {i}"} for i in range(1000)]
+    )
+    hot_row_ids = [row.id for row in rows[:20]]
+    model = table.get_model()
+
+    profiler = Profiler()
+    profiler.start()
+    for _ in range(500):
+        for row_id in hot_row_ids:
+            handler.get_row(table, row_id, model=model)
+        handler.get_row_names(table, hot_row_ids, model=model)
+    profiler.stop()
+
+    print(profiler.output_text(unicode=True, color=True))
+    print(row_cache_stats.as_dict())
+    assert row_cache_stats.hit_ratio > 0.9
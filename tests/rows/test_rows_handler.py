@@ -1,9 +1,12 @@
+import time
 from datetime import datetime
 from decimal import Decimal
+from statistics import median
 from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.test.utils import override_settings
 
 import pytest
 from freezegun import freeze_time
@@ -14,6 +17,10 @@ from baserow_dynamic_table.api.utils import (
     extract_field_ids_from_string,
     get_include_exclude_fields,
 )
+from baserow_dynamic_table.fields.dependencies.graph import (
+    invalidate_field_dependency_graph,
+)
+from baserow_dynamic_table.fields.dependencies.models import FieldDependency
 from baserow_dynamic_table.rows.exceptions import RowDoesNotExist
 from baserow_dynamic_table.rows.handler import RowHandler
 from baserow.core.exceptions import UserNotInWorkspace
@@ -919,6 +926,36 @@ def test_move_row(before_send_mock, send_mock, data_fixture):
     assert row_ids[2].id == row_3.id
 
 
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+@patch(
+    "baserow_dynamic_table.fields.field_types.LinkRowFieldType.row_of_dependency_moved"
+)
+@patch("baserow_dynamic_table.fields.field_types.TextFieldType.row_of_dependency_moved")
+def test_move_row_only_notifies_row_order_dependants(
+    text_moved_mock, link_row_moved_mock, data_fixture
+):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    primary_field = data_fixture.create_text_field(table=table, primary=True)
+    text_dependant = data_fixture.create_text_field(table=table)
+    link_field = data_fixture.create_link_row_field(link_row_table=table)
+    FieldDependency.objects.create(dependency=primary_field, dependant=text_dependant)
+    FieldDependency.objects.create(
+        dependency=primary_field, dependant=link_field, via=link_field
+    )
+    invalidate_field_dependency_graph([text_dependant.id, link_field.id])
+
+    handler = RowHandler()
+    row_1 = handler.create_row(user=user, table=table)
+    row_2 = handler.create_row(user=user, table=table)
+    handler.move_row(user, table, row_2, before_row=row_1)
+
+    text_moved_mock.assert_not_called()
+    link_row_moved_mock.assert_called()
+    assert link_row_moved_mock.call_args[0][0].id == link_field.id
+
+
 @pytest.mark.django_db
 @patch("baserow_dynamic_table.rows.signals.rows_deleted.send")
 @patch("baserow_dynamic_table.rows.signals.before_rows_delete.send")
@@ -1240,3 +1277,62 @@ def test_recalculate_row_orders(send_mock, data_fixture):
 
     send_mock.assert_called_once()
     assert send_mock.call_args[1]["table"].id == table.id
+
+
+@pytest.mark.django_db
+@patch("baserow_dynamic_table.rows.handler.FieldDependencyHandler")
+def test_writes_to_table_without_dependants_skip_the_cascade(
+    mock_dependency_handler, data_fixture
+):
+    mock_dependency_handler.table_has_dependants.return_value = False
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table)
+    handler = RowHandler()
+
+    row = handler.create_row(user, table, {f"field_{field.id}": "a"})
+    handler.update_row(user, table, row, {f"field_{field.id}": "b"})
+    handler.create_rows(user, table, [{f"field_{field.id}": "c"}])
+    handler.delete_row(user, table, row)
+
+    mock_dependency_handler.table_has_dependants.assert_called_with(table.id)
+    mock_dependency_handler.get_dependant_fields_with_type.assert_not_called()
+    assert table.get_model().objects.count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_single_row_write_performance_without_dependants(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    fields = [data_fixture.create_text_field(table=table) for _ in range(20)]
+    model = table.get_model()
+    handler = RowHandler()
+    repeats = 200
+
+    def measure(graph_enabled):
+        with override_settings(BASEROW_FIELD_DEPENDENCY_GRAPH_ENABLED=graph_enabled):
+            create_latencies, update_latencies = [], []
+            for i in range(repeats):
+                values = {f"field_{field.id}": f"Value {i}" for field in fields}
+                start = time.perf_counter()
+                row = handler.create_row(user, table, values, model=model)
+                create_latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                handler.update_row(user, table, row, values, model=model)
+                update_latencies.append(time.perf_counter() - start)
+        return median(create_latencies), median(update_latencies)
+
+    # Warm up the caches and the graph.
+    measure(True)
+    for graph_enabled in [False, True]:
+        create_latency, update_latency = measure(graph_enabled)
+        print(
+            f"graph enabled: {graph_enabled}, median create: "
+            f"{create_latency * 1000:.3f}ms, median update: "
+            f"{update_latency * 1000:.3f}ms"
+        )
@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import pytest
+
+from baserow_dynamic_table.rows.handler import RowHandler
+from baserow_dynamic_table.search.cache import (
+    get_search_cache_key,
+    normalize_search_query,
+    search_cache_stats,
+)
+from baserow_dynamic_table.search.handler import SearchModes
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    search_cache_stats.reset()
+    cache.clear()
+    yield
+
+
+def test_normalize_search_query():
+    assert normalize_search_query("  Tesla Model ") == "tesla model"
+    assert normalize_search_query("Tesla   Model") == "tesla   model"
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_SEARCH_CACHE_ENABLED=True)
+def test_search_results_are_cached_until_the_table_is_written(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    row_1 = model.objects.create(**{field.db_column: "tesla"})
+    model.objects.create(**{field.db_column: "amazon"})
+
+    def search(query, **kwargs):
+        return list(
+            model.objects.all()
+            .search_all_fields(query, search_mode=SearchModes.MODE_COMPAT, **kwargs)
+            .values_list("id", flat=True)
+        )
+
+    assert search("tesla") == [row_1.id]
+    assert search(" TESLA ") == [row_1.id]
+    assert search("tesla", only_search_by_field_ids=[field.id]) == [row_1.id]
+    assert search_cache_stats.misses == 2
+    assert search_cache_stats.hits == 1
+
+    # The cached ids are still filtered by the rest of the queryset.
+    assert (
+        model.objects.filter(id=0)
+        .search_all_fields("tesla", search_mode=SearchModes.MODE_COMPAT)
+        .count()
+        == 0
+    )
+    assert search_cache_stats.hits == 2
+
+    def get_key():
+        return get_search_cache_key(
+            table, SearchModes.MODE_COMPAT.value, "tesla", [field.id]
+        )
+
+    key = get_key()
+    row_2 = RowHandler().create_row(
+        user=user, table=table, model=model, values={field.db_column: "tesla 2"}
+    )
+
+    assert get_key() != key
+    assert search("tesla") == [row_1.id, row_2.id]
+    assert search_cache_stats.misses == 3
+
+
+@pytest.mark.django_db
+@override_settings(BASEROW_SEARCH_CACHE_ENABLED=True, BASEROW_SEARCH_CACHE_MAX_IDS=1)
+def test_searches_matching_too_many_rows_are_not_cached(data_fixture):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    model.objects.create(**{field.db_column: "tesla"})
+    model.objects.create(**{field.db_column: "tesla"})
+
+    for _ in range(2):
+        assert (
+            model.objects.all()
+            .search_all_fields("tesla", search_mode=SearchModes.MODE_COMPAT)
+            .count()
+            == 2
+        )
+
+    assert search_cache_stats.hits == 0
+    assert search_cache_stats.too_large == 2
@@ -1,11 +1,30 @@
-from unittest.mock import Mock
+import time
+from unittest.mock import Mock, patch
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
+from django.db.models import Value
+from django.test.utils import override_settings
 
 import pytest
 
+from baserow_dynamic_table.core.utils import Progress
 from baserow_dynamic_table.fields.handler import FieldHandler
+from baserow_dynamic_table.rows.handler import RowHandler
 from baserow_dynamic_table.search.handler import SearchHandler, SearchModes
+from baserow_dynamic_table.search.tasks import (
+    async_update_tsvector_columns_in_parallel,
+    async_update_tsvector_columns_range,
+    get_parallel_update_remaining_ranges_key,
+)
+from baserow_dynamic_table.table.models import RowCount
+from baserow_dynamic_table.table.constants import (
+    ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME,
+    TSV_ROW_COLUMN_NAME,
+    TSVECTOR_LAYOUT_COMBINED,
+    TSVECTOR_LAYOUT_PER_FIELD,
+)
 from baserow.core.trash.handler import TrashHandler
 
 
@@ -236,3 +255,606 @@ def test_querying_table_with_trashed_field_doesnt_include_its_tsv(
     assert len(requeried_rows_from_a) == 1
     m2m = getattr(requeried_rows_from_a[0], link_field.db_column)
     assert len(m2m.all()) == 1
+
+
+@pytest.mark.django_db
+@override_settings(TSV_UPDATE_CHUNK_SIZE=3)
+def test_split_update_into_chunks_by_ranges(data_fixture):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    rows = model.objects.bulk_create([model() for _ in range(10)])
+    # Create gaps in the ids to make sure chunks are based on rows, not id values.
+    model.objects.filter(id__in=[rows[2].id, rows[3].id, rows[7].id]).delete()
+
+    qs = model.objects.exclude(id=rows[9].id)
+    progress = Progress(100)
+    updated = SearchHandler.split_update_into_chunks_by_ranges(
+        qs,
+        {field.db_column: Value("updated")},
+        progress_builder=progress.create_child_builder(represents_progress=100),
+    )
+
+    assert updated == 6
+    assert progress.progress == 100
+    values = list(model.objects.order_by("id").values_list(field.db_column, flat=True))
+    assert values[:6] == ["updated"] * 6
+    assert values[6] != "updated"
+
+    assert SearchHandler.split_update_into_chunks_by_ranges(
+        model.objects.none(), {field.db_column: Value("updated")}
+    ) == 0
+
+
+@pytest.mark.django_db
+def test_get_row_id_ranges(data_fixture):
+    table = data_fixture.create_database_table()
+    assert SearchHandler.get_row_id_ranges(table, 3) == []
+
+    model = table.get_model()
+    rows = model.objects.bulk_create([model() for _ in range(10)])
+    first_id = rows[0].id
+
+    assert SearchHandler.get_row_id_ranges(table, 3) == [
+        (first_id, first_id + 3),
+        (first_id + 4, first_id + 7),
+        (first_id + 8, first_id + 9),
+    ]
+    assert SearchHandler.get_row_id_ranges(table, 20) == [
+        (first_id + i, first_id + i) for i in range(10)
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+def test_update_tsvector_columns_in_parallel(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.bulk_create(
+        [model(**{field.db_column: f"value {i}"}) for i in range(10)]
+    )
+
+    progress = Progress(100)
+    SearchHandler.update_tsvector_columns_in_parallel(
+        table,
+        concurrency=1,
+        progress_builder=progress.create_child_builder(represents_progress=100),
+    )
+
+    assert progress.progress == 100
+    model = table.get_model()
+    assert model.objects.all().pg_search("value").count() == 10
+    assert not model.objects.filter(
+        **{ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME: True}
+    ).exists()
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True, TSV_UPDATE_CONCURRENCY=2)
+@patch("baserow_dynamic_table.search.maintenance.request_table_vacuum")
+@patch("baserow_dynamic_table.search.tasks.async_update_tsvector_columns_range.delay")
+def test_async_update_tsvector_columns_in_parallel_finishes_after_the_last_range(
+    mock_update_range, mock_request_table_vacuum, data_fixture
+):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.bulk_create(
+        [model(**{field.db_column: f"value {i}"}) for i in range(10)]
+    )
+
+    async_update_tsvector_columns_in_parallel(table.id)
+
+    ranges = [c.args for c in mock_update_range.call_args_list]
+    assert len(ranges) == 2
+    token = ranges[0][-1]
+    assert cache.get(get_parallel_update_remaining_ranges_key(table.id, token)) == 2
+
+    async_update_tsvector_columns_range(*ranges[0])
+    mock_request_table_vacuum.assert_not_called()
+
+    async_update_tsvector_columns_range(*ranges[1])
+    mock_request_table_vacuum.assert_called_once()
+    assert cache.get(get_parallel_update_remaining_ranges_key(table.id, token)) is None
+    assert table.get_model().objects.all().pg_search("value").count() == 10
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+@patch("baserow_dynamic_table.search.maintenance.request_table_vacuum")
+def test_async_update_tsvector_columns_range_does_not_finish_an_expired_update(
+    mock_request_table_vacuum, data_fixture
+):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    rows = model.objects.bulk_create(
+        [model(**{field.db_column: f"value {i}"}) for i in range(2)]
+    )
+
+    # The count of the remaining ranges doesn't exist anymore.
+    with patch.object(
+        SearchHandler, "update_tsvector_columns_locked"
+    ) as mock_update_tsvector_columns_locked:
+        async_update_tsvector_columns_range(
+            table.id, rows[0].id, rows[0].id, None, "expired"
+        )
+        async_update_tsvector_columns_range(
+            table.id, rows[1].id, rows[1].id, None, "expired"
+        )
+
+    mock_update_tsvector_columns_locked.assert_not_called()
+    mock_request_table_vacuum.assert_not_called()
+    assert table.get_model().objects.all().pg_search("value").count() == 2
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True, TSV_UPDATE_CONCURRENCY=2)
+@patch("baserow_dynamic_table.search.tasks.async_update_tsvector_columns_range.delay")
+@patch(
+    "baserow_dynamic_table.search.tasks.async_update_tsvector_columns_in_parallel"
+    ".apply_async"
+)
+def test_async_update_tsvector_columns_in_parallel_is_rescheduled_if_locked(
+    mock_apply_async, mock_update_range, data_fixture
+):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.bulk_create(
+        [model(**{field.db_column: f"value {i}"}) for i in range(10)]
+    )
+
+    mock_lock = Mock()
+    mock_lock.return_value.acquire.return_value = False
+    with patch.object(cache, "lock", mock_lock, create=True):
+        async_update_tsvector_columns_in_parallel(table.id, [field.id])
+
+    mock_update_range.assert_not_called()
+    mock_apply_async.assert_called_once()
+    assert mock_apply_async.call_args.args[0] == (table.id, [field.id])
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_split_update_into_chunks_by_ranges_performance(data_fixture):
+    row_count = 5_000_000
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} (trashed, {field.db_column}) "
+            f"SELECT false, md5(i::text) FROM generate_series(1, %s) AS s(i)",
+            [row_count],
+        )
+
+    qs = model.objects.all()
+    chunk_size = settings.TSV_UPDATE_CHUNK_SIZE
+
+    # The previous OFFSET based approach to find the ids of every chunk.
+    start = time.perf_counter()
+    for i in range(0, row_count, chunk_size):
+        list(qs.order_by("id").values_list("id", flat=True)[i : i + chunk_size])
+    print(f"OFFSET chunking: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    SearchHandler.split_update_into_chunks_by_ranges(
+        qs, {field.db_column: Value("updated")}
+    )
+    print(f"Keyset chunked update: {time.perf_counter() - start:.2f}s")
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+def test_set_tsvector_layout(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    name_field = data_fixture.create_text_field(table=table, primary=True)
+    notes_field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.create(
+        **{name_field.db_column: "tesla", notes_field.db_column: "electric car"}
+    )
+    model.objects.create(
+        **{name_field.db_column: "electric", notes_field.db_column: "company"}
+    )
+
+    with pytest.raises(ValueError):
+        SearchHandler.set_tsvector_layout(table, "unknown")
+
+    SearchHandler.set_tsvector_layout(table, TSVECTOR_LAYOUT_COMBINED)
+    SearchHandler.update_tsvector_columns(
+        table, update_tsvectors_for_changed_rows_only=False
+    )
+
+    table.refresh_from_db()
+    assert table.tsvector_layout == TSVECTOR_LAYOUT_COMBINED
+    assert not table.field_set.filter(tsvector_column_created=True).exists()
+    model = table.get_model()
+    model._meta.get_field(TSV_ROW_COLUMN_NAME)
+    with pytest.raises(Exception):
+        model._meta.get_field(notes_field.tsv_db_column)
+
+    assert model.objects.pg_search("electric").count() == 2
+    assert model.objects.pg_search("electric car").count() == 1
+    assert model.objects.pg_search("car company").count() == 0
+    assert model.objects.pg_search("electric", [notes_field.id]).count() == 1
+    assert model.objects.pg_search("company", [name_field.id]).count() == 0
+    # The field markers must never match a search.
+    assert model.objects.pg_search(f"f{name_field.id}").count() == 0
+
+    SearchHandler.set_tsvector_layout(table, TSVECTOR_LAYOUT_PER_FIELD)
+    SearchHandler.update_tsvector_columns(
+        table, update_tsvectors_for_changed_rows_only=False
+    )
+
+    table.refresh_from_db()
+    assert table.tsvector_layout == TSVECTOR_LAYOUT_PER_FIELD
+    assert not table.field_set.filter(tsvector_column_created=False).exists()
+    model = table.get_model()
+    assert model.objects.pg_search("electric").count() == 2
+    assert model.objects.pg_search("electric", [notes_field.id]).count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.field_link_row
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+@pytest.mark.parametrize(
+    "original_layout", [TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED]
+)
+@pytest.mark.parametrize(
+    "target_layout", [TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED]
+)
+def test_search_data_follows_a_field_moved_between_tables(
+    data_fixture, original_layout, target_layout
+):
+    user = data_fixture.create_user()
+    database = data_fixture.create_database_application(user=user)
+    original_table = data_fixture.create_database_table(database=database)
+    target_table = data_fixture.create_database_table(database=database)
+    linked_table = data_fixture.create_database_table(database=database)
+    data_fixture.create_text_field(table=linked_table, primary=True)
+    link_field = data_fixture.create_link_row_field(
+        table=original_table, link_row_table=linked_table
+    )
+    original_table = SearchHandler.set_tsvector_layout(original_table, original_layout)
+    target_table = SearchHandler.set_tsvector_layout(target_table, target_layout)
+    SearchHandler.sync_tsvector_columns(original_table)
+    link_field.refresh_from_db()
+    assert link_field.tsvector_column_created == (
+        original_layout == TSVECTOR_LAYOUT_PER_FIELD
+    )
+
+    with patch.object(
+        SearchHandler, "entire_field_values_changed_or_created"
+    ) as mock_entire_field_values_changed_or_created:
+        FieldHandler().move_field_between_tables(link_field, target_table)
+
+    target_uses_per_field_layout = target_layout == TSVECTOR_LAYOUT_PER_FIELD
+    link_field.refresh_from_db()
+    assert link_field.tsvector_column_created == target_uses_per_field_layout
+    with connection.cursor() as cursor:
+        for table in [original_table, target_table]:
+            columns = [
+                column.name
+                for column in connection.introspection.get_table_description(
+                    cursor, table.get_database_table_name()
+                )
+            ]
+            assert (link_field.tsv_db_column in columns) == (
+                table == target_table and target_uses_per_field_layout
+            )
+
+    updated_table_ids = [
+        c.args[0].id
+        for c in mock_entire_field_values_changed_or_created.call_args_list
+    ]
+    expected_table_ids = [target_table.id]
+    if original_layout == TSVECTOR_LAYOUT_COMBINED:
+        expected_table_ids.append(original_table.id)
+    assert updated_table_ids == expected_table_ids
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+def test_combined_tsvector_excludes_trashed_fields(data_fixture):
+    user = data_fixture.create_user()
+    database = data_fixture.create_database_application(user=user)
+    table = data_fixture.create_database_table(user=user, database=database)
+    name_field = data_fixture.create_text_field(table=table, primary=True)
+    notes_field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.create(
+        **{name_field.db_column: "tesla", notes_field.db_column: "electric"}
+    )
+    SearchHandler.set_tsvector_layout(table, TSVECTOR_LAYOUT_COMBINED)
+    SearchHandler.update_tsvector_columns(
+        table, update_tsvectors_for_changed_rows_only=False
+    )
+
+    TrashHandler.trash(user, database.workspace, database, notes_field)
+
+    model = table.get_model()
+    assert model.objects.pg_search("tesla").count() == 1
+    assert model.objects.pg_search("electric").count() == 0
+
+    field = FieldHandler().create_field(user, table, "text", name="new")
+    assert not field.tsvector_column_created
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_tsvector_layouts_performance(data_fixture):
+    field_count = 200
+    row_count = 20_000
+    user = data_fixture.create_user()
+    results = {}
+
+    for layout in [TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED]:
+        table = data_fixture.create_database_table(user=user)
+        fields = [
+            data_fixture.create_text_field(table=table, primary=i == 0)
+            for i in range(field_count)
+        ]
+        SearchHandler.set_tsvector_layout(table, layout)
+        model = table.get_model()
+        columns = ", ".join(field.db_column for field in fields)
+        values = ", ".join(f"md5((i * {i})::text)" for i in range(field_count))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {model._meta.db_table} (trashed, {columns}) "
+                f"SELECT false, {values} FROM generate_series(1, %s) AS s(i)",
+                [row_count],
+            )
+
+        start = time.perf_counter()
+        SearchHandler.update_tsvector_columns(
+            table, update_tsvectors_for_changed_rows_only=False
+        )
+        write = time.perf_counter() - start
+
+        model = table.get_model()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        start = time.perf_counter()
+        for term in ["a1", "b2", "c3", "d4", "e5"]:
+            list(model.objects.pg_search(term).values_list("id", flat=True)[:100])
+        search = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for term in ["a1", "b2", "c3", "d4", "e5"]:
+            list(
+                model.objects.pg_search(term, [fields[1].id]).values_list(
+                    "id", flat=True
+                )[:100]
+            )
+        field_search = time.perf_counter() - start
+        results[layout] = (write, search, field_search)
+
+    for layout, (write, search, field_search) in results.items():
+        print(
+            f"{layout}: full update {write:.2f}s, search {search:.2f}s, "
+            f"single field search {field_search:.2f}s"
+        )
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+@pytest.mark.parametrize(
+    "layout", [TSVECTOR_LAYOUT_PER_FIELD, TSVECTOR_LAYOUT_COMBINED]
+)
+def test_search_top_k(data_fixture, layout):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    name_field = data_fixture.create_text_field(table=table, primary=True)
+    notes_field = data_fixture.create_text_field(table=table)
+    SearchHandler.set_tsvector_layout(table, layout)
+    model = table.get_model()
+    in_notes, in_name, no_match = model.objects.bulk_create(
+        [
+            model(**{name_field.db_column: "a", notes_field.db_column: "tesla"}),
+            model(**{name_field.db_column: "tesla", notes_field.db_column: "b"}),
+            model(**{name_field.db_column: "c", notes_field.db_column: "d"}),
+        ]
+    )
+    SearchHandler.update_tsvector_columns(
+        table, update_tsvectors_for_changed_rows_only=False
+    )
+
+    queryset = table.get_model().objects.all()
+    result = SearchHandler.search_top_k(queryset, "tesla", 10)
+    assert [row.id for row in result.rows] == [in_name.id, in_notes.id]
+    assert result.rows[0].search_rank > result.rows[1].search_rank
+    assert result.count is None
+
+    result = SearchHandler.search_top_k(
+        queryset, "tesla", 1, with_estimated_count=True
+    )
+    assert [row.id for row in result.rows] == [in_name.id]
+    assert result.count == RowCount(2, exact=True)
+
+    result = SearchHandler.search_top_k(queryset, "tesla", 10, [notes_field.id])
+    assert [row.id for row in result.rows] == [in_notes.id]
+
+    assert queryset.pg_search_ranked("tesla", max_candidates=1).count() == 1
+    assert queryset.pg_search_ranked("tesla", max_candidates=0).count() == 2
+    assert queryset.pg_search_ranked(" ").count() == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+@override_settings(USE_PG_FULLTEXT_SEARCH=True)
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_search_top_k_performance(data_fixture):
+    row_count = 1_000_000
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} (trashed, {field.db_column}) "
+            f"SELECT false, 'common ' || md5(i::text) "
+            f"FROM generate_series(1, %s) AS s(i)",
+            [row_count],
+        )
+    SearchHandler.update_tsvector_columns(
+        table, update_tsvectors_for_changed_rows_only=False
+    )
+    queryset = table.get_model().objects.all()
+
+    start = time.perf_counter()
+    results = queryset.search_all_fields(
+        "common", search_mode=SearchModes.MODE_FT_WITH_COUNT
+    ).order_by("order", "id")
+    results.count()
+    list(results[:20])
+    print(f"Full-text with count: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    SearchHandler.search_top_k(queryset, "common", 20)
+    print(f"Ranked top-k: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    SearchHandler.search_top_k(queryset, "common", 20, with_estimated_count=True)
+    print(f"Ranked top-k with estimated count: {time.perf_counter() - start:.2f}s")
+
+
+def _get_index_names(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+            [table.get_database_table_name()],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+@pytest.mark.django_db
+def test_trigram_search(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    text_field = data_fixture.create_text_field(table=table, primary=True)
+    number_field = data_fixture.create_number_field(table=table)
+    model = table.get_model()
+    tesla, audi = model.objects.bulk_create(
+        [
+            model(**{text_field.db_column: "Tesla Model 3", number_field.db_column: 3}),
+            model(**{text_field.db_column: "Audi 100%", number_field.db_column: 100}),
+        ]
+    )
+
+    SearchHandler.set_trigram_indexes_enabled(table, True)
+    assert text_field.trigram_index_name in _get_index_names(table)
+    assert number_field.trigram_index_name not in _get_index_names(table)
+
+    long_text_field = FieldHandler().create_field(
+        user, table, "long_text", name="notes"
+    )
+    assert long_text_field.trigram_index_name in _get_index_names(table)
+
+    def search(value, field_ids=None):
+        return list(
+            table.get_model()
+            .objects.search_all_fields(
+                value, field_ids, search_mode=SearchModes.MODE_TRIGRAM
+            )
+            .values_list("id", flat=True)
+        )
+
+    assert search("odel") == [tesla.id]
+    assert search("a") == [tesla.id, audi.id]
+    assert search("0%") == [audi.id]
+    assert search("abc", [number_field.id]) == []
+    assert search(str(audi.id), [number_field.id]) == [audi.id]
+
+    FieldHandler().update_field(user, text_field, new_type_name="number")
+    assert text_field.trigram_index_name not in _get_index_names(table)
+
+    table.refresh_from_db()
+    SearchHandler.set_trigram_indexes_enabled(table, False)
+    assert long_text_field.trigram_index_name not in _get_index_names(table)
+
+
+@pytest.mark.django_db
+@pytest.mark.disabled_in_ci
+# You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in
+# intellij by editing the run config for this test and adding --run-disabled-in-ci -s
+# to additional args.
+def test_trigram_search_performance(data_fixture):
+    row_count = 1_000_000
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} (trashed, {field.db_column}) "
+            f"SELECT false, md5(i::text) FROM generate_series(1, %s) AS s(i)",
+            [row_count],
+        )
+    queryset = table.get_model().objects.all()
+
+    start = time.perf_counter()
+    list(queryset.compat_search("abc12")[:20])
+    print(f"Compat search: {time.perf_counter() - start:.2f}s")
+
+    SearchHandler.set_trigram_indexes_enabled(table, True)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    start = time.perf_counter()
+    list(queryset.trigram_search("abc12")[:20])
+    print(f"Trigram search: {time.perf_counter() - start:.2f}s")
+
+
+@pytest.mark.django_db
+@override_settings(USE_PG_FULLTEXT_SEARCH=True, TSV_INLINE_UPDATE_MAX_ROWS=2)
+def test_small_row_writes_update_tsvectors_inline(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    field = data_fixture.create_text_field(table=table, primary=True)
+    model = table.get_model()
+    handler = RowHandler()
+
+    small_batch = handler.create_rows(
+        user=user,
+        table=table,
+        model=model,
+        rows_values=[{field.db_column: "tesla"}, {field.db_column: "amazon"}],
+    )
+    large_batch = handler.create_rows(
+        user=user,
+        table=table,
+        model=model,
+        rows_values=[{field.db_column: "apple"} for _ in range(3)],
+    )
+
+    assert [r.id for r in model.objects.pg_search("tesla")] == [small_batch[0].id]
+    assert model.objects.pg_search("apple").count() == 0
+    assert list(
+        model.objects.filter(**{ROW_NEEDS_BACKGROUND_UPDATE_COLUMN_NAME: True})
+        .order_by("id")
+        .values_list("id", flat=True)
+    ) == [r.id for r in large_batch]
+
+    handler.update_rows(
+        user=user,
+        table=table,
+        model=model,
+        rows_values=[{"id": small_batch[1].id, field.db_column: "google"}],
+    )
+
+    assert model.objects.pg_search("amazon").count() == 0
+    assert [r.id for r in model.objects.pg_search("google")] == [small_batch[1].id]
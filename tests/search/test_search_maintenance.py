@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import pytest
+from freezegun import freeze_time
+
+from baserow_dynamic_table.search.maintenance import (
+    PENDING_VACUUMS_CACHE_KEY,
+    RUNNING_STATE_MARGIN,
+    RUNNING_VACUUMS_CACHE_KEY,
+    TableVacuumStats,
+    get_pending_table_vacuums,
+    get_table_vacuum_stats,
+    request_table_vacuum,
+    run_pending_table_vacuums,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_pending_vacuums():
+    cache.delete(PENDING_VACUUMS_CACHE_KEY)
+    cache.delete(RUNNING_VACUUMS_CACHE_KEY)
+    yield
+
+
+@pytest.mark.django_db
+@override_settings(AUTO_VACUUM_AFTER_SEARCH_UPDATE=True)
+def test_request_table_vacuum(data_fixture):
+    table = data_fixture.create_database_table()
+    db_table = table.get_database_table_name()
+
+    with freeze_time("2023-02-27 10:00:00"):
+        request_table_vacuum(table)
+    with freeze_time("2023-02-27 10:00:05"):
+        request_table_vacuum(table)
+
+    pending = get_pending_table_vacuums()
+    assert list(pending.keys()) == [table.id]
+    assert pending[table.id]["db_table"] == db_table
+    # The time of the first request is kept.
+    assert pending[table.id]["requested_at"] == 1677492000.0
+    assert db_table in get_table_vacuum_stats([db_table])
+
+
+@pytest.mark.django_db
+@override_settings(AUTO_VACUUM_AFTER_SEARCH_UPDATE=False)
+def test_request_table_vacuum_disabled(data_fixture):
+    request_table_vacuum(data_fixture.create_database_table())
+
+    assert get_pending_table_vacuums() == {}
+
+
+@override_settings(TABLE_VACUUM_MIN_DEAD_TUPLES=100)
+@patch("baserow_dynamic_table.search.maintenance.vacuum_table")
+@patch("baserow_dynamic_table.search.maintenance.get_table_vacuum_stats")
+def test_run_pending_table_vacuums(mock_get_stats, mock_vacuum_table):
+    cache.set(
+        PENDING_VACUUMS_CACHE_KEY,
+        {
+            table_id: {
+                "db_table": f"database_table_{table_id}",
+                "requested_at": 100.0,
+                "dead_tuples": 0,
+            }
+            for table_id in range(1, 7)
+        },
+    )
+    mock_get_stats.return_value = {
+        "database_table_1": TableVacuumStats("database_table_1", 10, 500, None),
+        # Vacuumed by autovacuum after the request.
+        "database_table_2": TableVacuumStats("database_table_2", 10, 5000, 150.0),
+        # Not enough dead tuples.
+        "database_table_3": TableVacuumStats("database_table_3", 10, 50, None),
+        "database_table_4": TableVacuumStats("database_table_4", 10, 2000, 50.0),
+        "database_table_5": TableVacuumStats("database_table_5", 10, 1000, None),
+        # Table 6 has been deleted.
+    }
+
+    assert run_pending_table_vacuums(max_tables=2) == [4, 5]
+    assert [c.args[0] for c in mock_vacuum_table.call_args_list] == [
+        "database_table_4",
+        "database_table_5",
+    ]
+    assert list(get_pending_table_vacuums().keys()) == [1]
+
+    assert run_pending_table_vacuums(max_tables=2) == [1]
+    assert get_pending_table_vacuums() == {}
+
+
+@patch("baserow_dynamic_table.search.maintenance.vacuum_table")
+def test_run_pending_table_vacuums_only_runs_once_at_the_same_time(
+    mock_vacuum_table,
+):
+    cache.set(
+        PENDING_VACUUMS_CACHE_KEY,
+        {1: {"db_table": "database_table_1", "requested_at": 0.0, "dead_tuples": 0}},
+    )
+    cache.set(RUNNING_VACUUMS_CACHE_KEY, True)
+
+    assert run_pending_table_vacuums() == []
+    assert len(get_pending_table_vacuums()) == 1
+    mock_vacuum_table.assert_not_called()
+
+
+@override_settings(CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT=60)
+@patch("baserow_dynamic_table.search.maintenance._run_pending_table_vacuums")
+@patch("baserow_dynamic_table.search.maintenance.cache.add")
+def test_running_vacuums_flag_expires_after_the_hard_time_limit(
+    mock_cache_add, mock_run_pending_table_vacuums
+):
+    mock_cache_add.return_value = True
+    mock_run_pending_table_vacuums.return_value = []
+
+    run_pending_table_vacuums()
+
+    # The flag must not block the vacuums for long if the worker is killed.
+    mock_cache_add.assert_called_once_with(
+        RUNNING_VACUUMS_CACHE_KEY, True, 60 + RUNNING_STATE_MARGIN
+    )
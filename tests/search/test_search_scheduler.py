@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import pytest
+from freezegun import freeze_time
+
+from baserow_dynamic_table.search.scheduler import (
+    PENDING_TABLES_CACHE_KEY,
+    claim_pending_tsvector_update,
+    get_pending_update_cache_key,
+    get_tsvector_scheduler_metrics,
+    request_tsvector_update,
+    run_pending_tsvector_update,
+    tsvector_scheduler_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_scheduler_state():
+    tsvector_scheduler_stats.reset()
+    cache.delete(PENDING_TABLES_CACHE_KEY)
+    for table_id in [1, 2]:
+        cache.delete(get_pending_update_cache_key(table_id))
+    yield
+
+
+@override_settings(TSV_UPDATE_DEBOUNCE_SECONDS=5, TSV_UPDATE_MAX_DELAY_SECONDS=30)
+@patch("baserow_dynamic_table.search.tasks.run_debounced_tsvector_update.apply_async")
+def test_requests_are_debounced_and_merged(mock_apply_async):
+    with freeze_time("2023-02-27 10:00:00"):
+        request_tsvector_update(1, update_changed_rows_only=True)
+        request_tsvector_update(1, update_changed_rows_only=False, field_ids=[3])
+        request_tsvector_update(2, update_changed_rows_only=True)
+
+    with freeze_time("2023-02-27 10:00:03"):
+        request_tsvector_update(1, update_changed_rows_only=False, field_ids=[4, 3])
+        assert claim_pending_tsvector_update(1) == (None, 5)
+
+        metrics = get_tsvector_scheduler_metrics()
+        assert metrics["queue_depth"] == 2
+        assert metrics["oldest_pending_lag"] == 3
+        assert metrics["requests"] == 4
+        assert metrics["coalesced_requests"] == 2
+        assert metrics["tasks_scheduled"] == 2
+
+    assert mock_apply_async.call_count == 2
+    mock_apply_async.assert_any_call((1,), countdown=5)
+
+    with freeze_time("2023-02-27 10:00:08"):
+        pending, delay = claim_pending_tsvector_update(1)
+
+    assert delay == 0
+    assert pending.update_changed_rows
+    assert pending.update_all_rows
+    assert pending.field_ids == [3, 4]
+    assert pending.requests == 3
+    assert pending.lag == 8
+    assert claim_pending_tsvector_update(1) == (None, 0)
+    assert get_tsvector_scheduler_metrics()["queue_depth"] == 1
+
+    with freeze_time("2023-02-27 10:00:08"):
+        request_tsvector_update(1, update_changed_rows_only=False)
+        request_tsvector_update(1, update_changed_rows_only=False, field_ids=[3])
+        pending, _ = claim_pending_tsvector_update(1, force=True)
+
+    assert pending.update_all_rows
+    assert pending.field_ids is None
+    assert mock_apply_async.call_count == 3
+
+
+@override_settings(TSV_UPDATE_DEBOUNCE_SECONDS=5, TSV_UPDATE_MAX_DELAY_SECONDS=12)
+@patch("baserow_dynamic_table.search.tasks.run_debounced_tsvector_update.apply_async")
+def test_pending_update_is_claimed_after_the_max_delay(mock_apply_async):
+    for second in range(0, 12, 3):
+        with freeze_time(f"2023-02-27 10:00:{second:02}"):
+            request_tsvector_update(1, update_changed_rows_only=True)
+
+    with freeze_time("2023-02-27 10:00:11"):
+        assert claim_pending_tsvector_update(1) == (None, 1)
+
+    with freeze_time("2023-02-27 10:00:12"):
+        pending, delay = claim_pending_tsvector_update(1)
+
+    assert pending.requests == 4
+    assert mock_apply_async.call_count == 1
+
+
+@override_settings(
+    TSV_UPDATE_DEBOUNCE_SECONDS=5,
+    TSV_UPDATE_MAX_DELAY_SECONDS=30,
+    CELERY_SEARCH_UPDATE_HARD_TIME_LIMIT=60,
+)
+@patch("baserow_dynamic_table.search.tasks.run_debounced_tsvector_update.apply_async")
+def test_lost_scheduled_update_is_scheduled_again(mock_apply_async):
+    with freeze_time("2023-02-27 10:00:00"):
+        request_tsvector_update(1, update_changed_rows_only=True)
+
+    with freeze_time("2023-02-27 10:01:05"):
+        request_tsvector_update(1, update_changed_rows_only=True)
+        assert mock_apply_async.call_count == 1
+
+    # The task should have run after the debounce window, or been stopped by its
+    # time limit.
+    with freeze_time("2023-02-27 10:01:06"):
+        request_tsvector_update(1, update_changed_rows_only=True)
+        assert mock_apply_async.call_count == 2
+        request_tsvector_update(1, update_changed_rows_only=True)
+        assert mock_apply_async.call_count == 2
+
+        metrics = get_tsvector_scheduler_metrics()
+        assert metrics["queue_depth"] == 1
+        assert metrics["oldest_pending_lag"] == 66
+
+
+@pytest.mark.django_db
+@override_settings(
+    USE_PG_FULLTEXT_SEARCH=True,
+    TSV_UPDATE_DEBOUNCE_SECONDS=5,
+)
+@patch("baserow_dynamic_table.search.tasks.run_debounced_tsvector_update.apply_async")
+def test_run_pending_tsvector_update(mock_apply_async, data_fixture):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.create(**{field.db_column: "tesla"})
+
+    request_tsvector_update(table.id, update_changed_rows_only=True)
+    pending, _ = claim_pending_tsvector_update(table.id, force=True)
+    run_pending_tsvector_update(pending)
+
+    assert model.objects.pg_search("tesla").count() == 1
+    assert tsvector_scheduler_stats.updates_run == 1
@@ -0,0 +1,160 @@
+from unittest.mock import patch
+
+import pytest
+
+from baserow_dynamic_table.rows.handler import RowHandler
+from baserow_dynamic_table.table.handler import TableHandler
+from baserow_dynamic_table.table.models import TableRowCountDelta
+from baserow_dynamic_table.table.row_counts import (
+    flush_row_count_deltas,
+    get_pending_row_count_deltas,
+    record_row_count_change,
+)
+from baserow_dynamic_table.trash.handler import TrashHandler
+
+
+@pytest.mark.django_db
+def test_row_count_deltas_are_recorded_and_flushed(data_fixture):
+    user = data_fixture.create_user()
+    workspace = data_fixture.create_workspace(user=user)
+    database = data_fixture.create_database_application(workspace=workspace)
+    table = data_fixture.create_database_table(database=database, user=user)
+    table.row_count = 0
+    table.save()
+
+    handler = RowHandler()
+    rows = handler.create_rows(user, table, [{} for _ in range(5)])
+    handler.create_row(user, table, {})
+    assert get_pending_row_count_deltas([table.id]) == {table.id: 6}
+    assert TableHandler.get_total_row_count_of_workspace(workspace.id) == 6
+
+    handler.delete_rows(user, table, [row.id for row in rows[:2]])
+    handler.delete_row_by_id(user, table, rows[2].id)
+    assert get_pending_row_count_deltas([table.id]) == {table.id: 3}
+    assert TableHandler.get_total_row_count_of_workspace(workspace.id) == 3
+
+    TrashHandler.restore_item(user, "row", rows[2].id, parent_trash_item_id=table.id)
+    assert TableHandler.get_total_row_count_of_workspace(workspace.id) == 4
+
+    assert flush_row_count_deltas(batch_size=2) == 5
+    assert TableRowCountDelta.objects.count() == 0
+    table.refresh_from_db()
+    assert table.row_count == 4
+    assert TableHandler.get_total_row_count_of_workspace(workspace.id) == 4
+
+
+@pytest.mark.django_db
+def test_row_count_deltas_of_uncounted_tables_are_dropped(data_fixture):
+    table = data_fixture.create_database_table()
+    table.row_count = None
+    table.save()
+
+    record_row_count_change(table.id, 3)
+    record_row_count_change(table.id, 0)
+    assert TableRowCountDelta.objects.count() == 1
+
+    flush_row_count_deltas()
+
+    table.refresh_from_db()
+    assert table.row_count is None
+    assert TableRowCountDelta.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_count_rows_deletes_the_included_row_count_deltas(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    table.row_count = 0
+    table.save()
+
+    RowHandler().create_rows(user, table, [{} for _ in range(3)])
+    assert TableRowCountDelta.objects.filter(table=table).count() == 1
+
+    TableHandler.count_rows()
+
+    assert TableRowCountDelta.objects.filter(table=table).count() == 0
+    table.refresh_from_db()
+    assert table.row_count == 3
+
+    flush_row_count_deltas()
+    table.refresh_from_db()
+    assert table.row_count == 3
+
+
+@pytest.mark.django_db
+def test_count_rows_keeps_the_row_count_deltas_landing_during_the_count(
+    data_fixture,
+):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    table.row_count = 0
+    table.save()
+
+    # Reserves an id lower than the one of the delta included in the count, like
+    # a concurrent transaction which commits later.
+    reserved_delta = TableRowCountDelta.objects.create(table=table, delta=1)
+    reserved_delta_id = reserved_delta.id
+    reserved_delta.delete()
+    RowHandler().create_rows(user, table, [{} for _ in range(3)])
+
+    store_row_counts = TableHandler._store_row_counts
+
+    def create_deltas_and_store(*args):
+        # These rows and their deltas land after the table has been counted.
+        RowHandler().create_rows(user, table, [{}])
+        TableRowCountDelta.objects.create(id=reserved_delta_id, table=table, delta=1)
+        store_row_counts(*args)
+
+    with patch.object(
+        TableHandler, "_store_row_counts", side_effect=create_deltas_and_store
+    ):
+        TableHandler.count_rows()
+
+    table.refresh_from_db()
+    assert table.row_count == 3
+    assert get_pending_row_count_deltas([table.id]) == {table.id: 2}
+    assert TableRowCountDelta.objects.filter(id=reserved_delta_id).exists()
+
+    flush_row_count_deltas()
+    table.refresh_from_db()
+    assert table.row_count == 5
+
+
+@pytest.mark.django_db
+def test_count_rows_skips_the_tables_flushed_during_the_count(data_fixture):
+    user = data_fixture.create_user()
+    table = data_fixture.create_database_table(user=user)
+    table.row_count = 0
+    table.save()
+    other_table = data_fixture.create_database_table(user=user)
+    other_table.row_count = 2
+    other_table.save()
+    other_model = other_table.get_model()
+    other_model.objects.bulk_create([other_model() for _ in range(2)])
+
+    RowHandler().create_rows(user, table, [{} for _ in range(3)])
+
+    store_row_counts = TableHandler._store_row_counts
+
+    def create_deltas_flush_and_store(*args):
+        # This row lands after the table has been counted, and its delta is
+        # flushed together with the included one before the count is stored.
+        RowHandler().create_rows(user, table, [{}])
+        flush_row_count_deltas()
+        RowHandler().create_rows(user, other_table, [{}])
+        store_row_counts(*args)
+
+    with patch.object(
+        TableHandler, "_store_row_counts", side_effect=create_deltas_flush_and_store
+    ):
+        TableHandler.count_rows()
+
+    table.refresh_from_db()
+    assert table.row_count == 4
+    # The count of the tables which haven't been flushed is still stored.
+    other_table.refresh_from_db()
+    assert other_table.row_count == 2
+    assert other_table.row_count_updated_at is not None
+    assert get_pending_row_count_deltas([table.id, other_table.id]) == {
+        other_table.id: 1
+    }
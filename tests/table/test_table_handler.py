@@ -562,17 +562,98 @@ def test_count_rows_table_gets_deleted(data_fixture):
     assert table_deleted.row_count is None
 
 
+@pytest.mark.django_db
+def test_count_rows_estimates_large_tables(data_fixture):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.bulk_create([model(**{f"field_{field.id}": i}) for i in range(50)])
+
+    # Without statistics the table is always counted exactly.
+    TableHandler.count_rows(estimate_threshold=10)
+    table.refresh_from_db()
+    assert table.row_count == 50
+    assert table.row_count_is_estimate is False
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    TableHandler.count_rows(estimate_threshold=10)
+    table.refresh_from_db()
+    assert table.row_count > 10
+    assert table.row_count_is_estimate is True
+
+    TableHandler.count_rows(estimate_threshold=0)
+    table.refresh_from_db()
+    assert table.row_count == 50
+    assert table.row_count_is_estimate is False
+
+
+@pytest.mark.django_db
+def test_queryset_estimated_count(data_fixture):
+    table = data_fixture.create_database_table()
+    field = data_fixture.create_text_field(table=table)
+    model = table.get_model()
+    model.objects.bulk_create([model(**{f"field_{field.id}": i}) for i in range(50)])
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    row_count = model.objects.estimated_count(threshold=10)
+    assert row_count.exact is False
+    assert row_count.count > 10
+
+    # The planner expects the filter to only match a single row, which is below
+    # the threshold so the exact count must be returned.
+    row_count = model.objects.filter(**{f"field_{field.id}": "1"}).estimated_count(
+        threshold=10
+    )
+    assert row_count.exact is True
+    assert row_count.count == 1
+
+    assert model.objects.estimated_count(threshold=1000) == (50, True)
+
+    # Querysets which can't match any row are not sent to the planner.
+    assert model.objects.filter(id__in=[]).estimated_count(threshold=10) == (0, True)
+
+
 @pytest.mark.django_db
 def test_exception_is_raised_if_something_goes_wrong(data_fixture):
     data_fixture.create_database_table()
 
-    with patch("baserow_dynamic_table.table.models.Table.get_model") as mock:
+    with patch(
+        "baserow_dynamic_table.table.handler.TableHandler._count_rows_of_table"
+    ) as mock:
         mock.side_effect = Exception("Something went wrong")
 
         with pytest.raises(Exception):
             TableHandler().count_rows()
 
 
+@pytest.mark.django_db
+def test_count_rows_by_shard(data_fixture):
+    tables = [data_fixture.create_database_table() for _ in range(5)]
+    for i, table in enumerate(tables):
+        model = table.get_model()
+        model.objects.bulk_create([model() for _ in range(i)])
+
+    shards = TableHandler.get_row_count_shards(2)
+    assert shards == [
+        (tables[0].id, tables[1].id),
+        (tables[2].id, tables[3].id),
+        (tables[4].id, tables[4].id),
+    ]
+
+    assert (
+        TableHandler.count_rows(min_table_id=shards[1][0], max_table_id=shards[1][1])
+        == 2
+    )
+
+    for i, table in enumerate(tables):
+        table.refresh_from_db()
+        assert table.row_count == (i if i in (2, 3) else None)
+
+
 @pytest.mark.django_db
 @pytest.mark.disabled_in_ci
 # You must add --run-disabled-in-ci -s to pytest to run this test, you can do this in